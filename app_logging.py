@@ -0,0 +1,156 @@
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-logger overrides, e.g. "yilingsi_scraper=DEBUG,jobdb=WARNING".
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+# Empty means console only. Rotation renames the file, so in docker point this into a mounted directory.
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_BUFFER_LINES = int(os.getenv("LOG_BUFFER_LINES", "1000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; anything passed via `extra=` becomes a top-level field."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")})
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            entry["exc"] = exc
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` formatted lines for the dashboard log view."""
+
+    def __init__(self, capacity: int = LOG_BUFFER_LINES):
+        super().__init__()
+        self.lines: deque = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the listener falls behind and the queue is full, records are dropped."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve %-args and the traceback on the calling thread, leave formatting to the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_setup_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_ring: Optional[RingBufferHandler] = None
+
+
+def _apply_levels(levels: str):
+    for item in levels.split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def setup_logging(level: str = LOG_LEVEL, levels: str = LOG_LEVELS, fmt: str = LOG_FORMAT,
+                  log_file: str = LOG_FILE) -> None:
+    """Route every logger through a queue to console, optional rotating file and the ring buffer.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener, _ring
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+        handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+        if log_file:
+            parent = os.path.dirname(log_file)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            handlers.append(logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"))
+        _ring = RingBufferHandler()
+        handlers.append(_ring)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DroppingQueueHandler(log_queue))
+        root.setLevel(level.upper())
+        _apply_levels(levels)
+        # Third-party chatter that drowns the pipeline output at INFO.
+        for noisy in ("httpx", "urllib3", "selenium", "apscheduler.executors.default", "uvicorn.access"):
+            if logging.getLogger(noisy).level == logging.NOTSET:
+                logging.getLogger(noisy).setLevel(logging.WARNING)
+
+
+def forward_logging(log_queue) -> None:
+    """Send this process's records to `log_queue` (a multiprocessing queue) for the parent to log them."""
+    setup_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+
+
+def get_logger(name: str) -> logging.Logger:
+    setup_logging()
+    return logging.getLogger(name)
+
+
+def recent_logs(limit: int = 500) -> List[str]:
+    if _ring is None:
+        return []
+    lines = list(_ring.lines)
+    return lines[-limit:]
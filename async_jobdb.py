@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+from dotenv import load_dotenv
+
+from jobdb import scoring_worker
+
+load_dotenv()
+
+username = os.environ.get("DB_USERNAME")
+password = os.environ.get("PASSWORD")
+host = os.environ.get("HOST")
+port = os.environ.get("DB_PORT")
+dbname = os.environ.get("DBNAME")
+sslmode = os.environ.get("DB_SSLMODE", "require")
+
+DB_ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", "1"))
+DB_ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", "20"))
+DB_ASYNC_TIMEOUT = float(os.getenv("DB_ASYNC_TIMEOUT", "10"))
+DB_ASYNC_MAX_IDLE = float(os.getenv("DB_ASYNC_MAX_IDLE", "300"))
+# Transaction-mode poolers (pgbouncer, Supabase :6543) cannot keep prepared statements; set this to 0 there.
+DB_ASYNC_STATEMENT_CACHE = int(os.getenv("DB_ASYNC_STATEMENT_CACHE", "100"))
+# Seconds the dashboard's table-wide counts are reused: every session refreshing its stats at once would
+# otherwise queue that many full scans. 0 queries on every call.
+DB_ASYNC_STATS_TTL = float(os.getenv("DB_ASYNC_STATS_TTL", "5"))
+
+LIST_COLUMNS = "id, title, company, location, ai_score, ai_analysis, url, date_posted, source"
+
+ORDER_BY = {
+    "score_desc": "ORDER BY ai_score DESC, created_at DESC",
+    "score_asc": "ORDER BY ai_score ASC, created_at DESC",
+    "newest": "ORDER BY created_at DESC, ai_score DESC",
+    "oldest": "ORDER BY created_at ASC, ai_score DESC",
+}
+
+
+class StatsCache:
+    """Results of aggregate queries, shared for `ttl` seconds by every caller on one event loop.
+
+    Callers that arrive while the query runs await the same task, so a burst costs one query. A failed
+    query is not cached.
+    """
+
+    def __init__(self, ttl: float = DB_ASYNC_STATS_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, asyncio.Task]] = {}
+        self._loop = None
+
+    async def get(self, key: str, fetch) -> Dict:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._entries, self._loop = {}, loop
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            started, task = entry
+            failed = task.done() and (task.cancelled() or task.exception() is not None)
+            if failed or now - started >= self.ttl:
+                entry = None
+        if entry is None:
+            entry = self._entries[key] = (now, loop.create_task(fetch()))
+        # Shielded so one caller's cancellation does not cancel the query for the others.
+        return dict(await asyncio.shield(entry[1]))
+
+    def clear(self):
+        self._entries = {}
+
+
+async def _init_connection(conn):
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+class AsyncJobDatabase:
+    """asyncio counterpart of `JobDatabase` built on asyncpg, for dashboard callbacks and the API routes.
+
+    The pool is created on first use, inside the running event loop, and is bound to that loop.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, min_size: int = DB_ASYNC_POOL_MIN, max_size: int = DB_ASYNC_POOL_MAX):
+        self.dsn = dsn or os.getenv("DATABASE_URL") or None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool: Optional[asyncpg.Pool] = None
+        self._loop = None
+        self._lock = asyncio.Lock()
+        self.stats_cache = StatsCache()
+
+    async def connect(self) -> asyncpg.Pool:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncpg pools cannot be shared between event loops (e.g. successive asyncio.run calls).
+            self.pool = None
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        if self.pool is None:
+            async with self._lock:
+                if self.pool is None:
+                    kwargs = {} if self.dsn else dict(
+                        user=username, password=password, host=host,
+                        port=int(port) if port else None, database=dbname,
+                        ssl=None if sslmode == "disable" else sslmode,
+                    )
+                    self.pool = await asyncpg.create_pool(
+                        dsn=self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        timeout=DB_ASYNC_TIMEOUT,
+                        command_timeout=DB_ASYNC_TIMEOUT,
+                        max_inactive_connection_lifetime=DB_ASYNC_MAX_IDLE,
+                        statement_cache_size=DB_ASYNC_STATEMENT_CACHE,
+                        init=_init_connection,
+                        **kwargs,
+                    )
+        return self.pool
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _fetch(self, query: str, *args) -> List[Dict]:
+        pool = await self.connect()
+        rows = await pool.fetch(query, *args)
+        return [dict(r) for r in rows]
+
+    async def get_all_jobs(self, status: str = 'new', limit: int = 100) -> List[Dict]:
+        return await self._fetch('''
+            SELECT * FROM jobs
+            WHERE status = $1
+            ORDER BY created_at DESC
+            LIMIT $2
+        ''', status, limit)
+
+    async def get_jobs_by_score(self, min_score: int = 70, limit: int = 50) -> List[Dict]:
+        return await self._fetch('''
+            SELECT * FROM jobs
+            WHERE ai_score >= $1
+            ORDER BY ai_score DESC, created_at DESC
+            LIMIT $2
+        ''', min_score, limit)
+
+    async def list_jobs(self, min_score: int, max_score: int, limit: int, sort_by: str = "score_desc") -> List[Dict]:
+        order_clause = ORDER_BY.get(sort_by, ORDER_BY["score_desc"])
+        return await self._fetch(f'''
+            SELECT {LIST_COLUMNS}
+            FROM jobs
+            WHERE ai_score BETWEEN $1 AND $2
+            {order_clause}
+            LIMIT $3
+        ''', int(min_score), int(max_score), int(limit))
+
+    async def get_job(self, job_id: int) -> Optional[Dict]:
+        pool = await self.connect()
+        row = await pool.fetchrow("SELECT * FROM jobs WHERE id = $1", int(job_id))
+        return dict(row) if row else None
+
+    async def get_stats(self) -> Dict:
+        return await self.stats_cache.get("stats", self._get_stats)
+
+    async def _get_stats(self) -> Dict:
+        pool = await self.connect()
+        row = await pool.fetchrow('''
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE status = 'new') AS new,
+                   COUNT(*) FILTER (WHERE status = 'interested') AS interested,
+                   COUNT(*) FILTER (WHERE status = 'applied') AS applied
+            FROM jobs
+        ''')
+        return dict(row)
+
+    async def get_score_stats(self, status: str = 'new') -> Dict:
+        """Score distribution computed in the database instead of pulling every row into Python.
+
+        Shared through `stats_cache`, so it can be up to DB_ASYNC_STATS_TTL seconds old.
+        """
+        return await self.stats_cache.get(f"score_stats:{status}", lambda: self._get_score_stats(status))
+
+    async def _get_score_stats(self, status: str) -> Dict:
+        pool = await self.connect()
+        row = await pool.fetchrow('''
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE ai_score > 0) AS scored,
+                   COALESCE(ROUND(AVG(ai_score) FILTER (WHERE ai_score > 0), 1), 0) AS avg,
+                   COUNT(*) FILTER (WHERE ai_score >= 70) AS high,
+                   COUNT(*) FILTER (WHERE ai_score >= 40 AND ai_score < 70) AS medium,
+                   COUNT(*) FILTER (WHERE ai_score > 0 AND ai_score < 40) AS low
+            FROM jobs
+            WHERE status = $1
+        ''', status)
+        out = dict(row)
+        out["avg"] = float(out["avg"])
+        return out
+
+    async def get_runs(self, since: datetime, until: Optional[datetime] = None, kind: Optional[str] = None,
+                       limit: int = 5000) -> List[Dict]:
+        """Runs started in [since, until), oldest first; served by the started_at indexes on `runs`."""
+        args: list = [since, until or datetime.max.replace(tzinfo=since.tzinfo)]
+        where = "started_at >= $1 AND started_at < $2"
+        if kind:
+            args.append(kind)
+            where += " AND kind = $3"
+        args.append(int(limit))
+        return await self._fetch(f'''
+            SELECT * FROM runs
+            WHERE {where}
+            ORDER BY started_at
+            LIMIT ${len(args)}
+        ''', *args)
+
+    async def save_jobs_bulk(self, jobs: List[Dict]) -> Tuple[int, int]:
+        rows = {}
+        for job in jobs:
+            job_hash = hashlib.md5(f"{job['title']}{job['company']}{job['url']}".encode()).hexdigest()
+            rows[job_hash] = (
+                job_hash,
+                job['title'],
+                job.get('company', 'Unknown'),
+                job.get('location', 'Remote'),
+                job['url'],
+                job.get('salary', 'Not specified'),
+                job.get('description', ''),
+                job.get('date_posted', 'Unknown'),
+                json.dumps(job.get('tags', [])),
+                job['source'],
+                job.get('search_keyword', ''),
+                job['scraped_at'],
+            )
+        if not rows:
+            return 0, len(jobs)
+
+        columns = list(zip(*rows.values()))
+        pool = await self.connect()
+        inserted = await pool.fetch('''
+            INSERT INTO jobs (
+                job_hash, title, company, location, url,
+                salary, description, date_posted, tags,
+                source, search_keyword, scraped_at
+            )
+            SELECT h, t, c, l, u, s, d, dp, tg::jsonb, src, kw, sa
+            FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[],
+                        $7::text[], $8::text[], $9::text[], $10::text[], $11::text[], $12::text[])
+                AS v(h, t, c, l, u, s, d, dp, tg, src, kw, sa)
+            ON CONFLICT (job_hash) DO NOTHING
+            RETURNING job_hash
+        ''', *[list(col) for col in columns])
+        return len(inserted), len(jobs) - len(inserted)
+
+    async def update_job_score(self, job_id: int, score: int, analysis: str, worker: Optional[str] = None) -> bool:
+        """Store a score for a job `worker` holds; False once its lease went to another scorer."""
+        pool = await self.connect()
+        status = await pool.execute('''
+            UPDATE jobs
+            SET ai_score = $1, ai_analysis = $2,
+                scoring_state = 'done', claimed_at = NULL, last_scoring_error = NULL
+            WHERE id = $3 AND scoring_state = 'in_progress' AND claimed_by = $4
+        ''', int(score), analysis, int(job_id), worker or scoring_worker())
+        return status == "UPDATE 1"
+
+    async def update_job_scores(self, scores: List[Dict], worker: Optional[str] = None) -> int:
+        """Like update_job_score for many jobs in one statement; returns how many were still held."""
+        if not scores:
+            return 0
+        pool = await self.connect()
+        updated = await pool.fetch('''
+            UPDATE jobs
+            SET ai_score = v.score, ai_analysis = v.analysis,
+                scoring_state = 'done', claimed_at = NULL, last_scoring_error = NULL
+            FROM unnest($1::int[], $2::int[], $3::text[]) AS v(id, score, analysis)
+            WHERE jobs.id = v.id AND jobs.scoring_state = 'in_progress' AND jobs.claimed_by = $4
+            RETURNING jobs.id
+        ''', [int(s['id']) for s in scores], [int(s['score']) for s in scores],
+            [s.get('analysis', '') for s in scores], worker or scoring_worker())
+        return len(updated)
+
+    async def get_scoring_queue_depth(self) -> Dict[str, int]:
+        return await self.stats_cache.get("scoring_queue", self._get_scoring_queue_depth)
+
+    async def _get_scoring_queue_depth(self) -> Dict[str, int]:
+        rows = await self._fetch("SELECT scoring_state, COUNT(*) AS n FROM jobs WHERE status = 'new' GROUP BY scoring_state")
+        return {r["scoring_state"]: r["n"] for r in rows}
+
+    async def check(self) -> Tuple[bool, Dict]:
+        try:
+            pool = await self.connect()
+            await pool.fetchval("SELECT 1")
+            return True, {"db": "ok", "pool_size": pool.get_size(), "pool_idle": pool.get_idle_size()}
+        except Exception as e:
+            return False, {"db_error": str(e)}
+
+
+_default_db: Optional[AsyncJobDatabase] = None
+
+
+def get_async_database() -> AsyncJobDatabase:
+    global _default_db
+    if _default_db is None:
+        _default_db = AsyncJobDatabase()
+    return _default_db
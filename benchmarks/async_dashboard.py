@@ -0,0 +1,164 @@
+"""Latency of the async dashboard callbacks as concurrent users grow.
+
+    python -m benchmarks.async_dashboard                                   # sqlite stand-in, 2/10/50 users
+    python -m benchmarks.async_dashboard --backend postgres --rows 100000  # scratch schema on DATABASE_URL
+    python -m benchmarks.async_dashboard --max-growth 0                    # report only, never fail
+    python -m benchmarks.async_dashboard --think-ms 0                      # saturate: find the throughput cap
+
+Every simulated user calls the real callbacks (cards, stats, job detail) on one event loop, as Gradio does
+for concurrent sessions, with `async_jobdb`'s default database swapped for the benchmark's. Users pause
+about `--think-ms` between calls like people clicking around; with no pause the run measures throughput
+and p99 grows with the queue in front of the slowest resource instead.
+Reports p50/p95/p99 per concurrency level and how much p99 grew from the lowest level to the highest, and
+fails when it grew more than `--max-growth` (2x): p99 should stay flat as users are added. The table-wide
+counts behind the stats callback are shared for DB_ASYNC_STATS_TTL seconds, so their scan shows up in p99
+at a few users (few samples) rather than queueing once per user at many.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import platform
+from datetime import datetime
+from typing import Dict, List, Optional
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import PG_SCHEMA, _git_revision, _postgres_database
+from benchmarks.sqlite_db import AsyncSqliteJobDatabase, SqliteJobDatabase
+
+DEFAULT_USERS = [2, 10, 50]
+MAX_P99_GROWTH = 2.0
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    return samples[max(math.ceil(len(samples) * q) - 1, 0)]
+
+
+async def _user(callbacks, calls: int, think: float, rng: random.Random, samples: List[float]):
+    # Users arrive spread over one think time rather than all at once.
+    await asyncio.sleep(rng.uniform(0, think))
+    for i in range(calls):
+        callback = callbacks[i % len(callbacks)]
+        started = time.perf_counter()
+        await callback(rng)
+        samples.append((time.perf_counter() - started) * 1000)
+        if think:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+
+
+async def run_level(callbacks, users: int, calls: int, think: float, seed: int) -> Dict:
+    """Each of `users` concurrent users makes `calls` callbacks, pausing about `think` seconds in between."""
+    samples: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_user(callbacks, calls, think, random.Random(seed + u), samples) for u in range(users)))
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    return {
+        "users": users,
+        "calls": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "p99_ms": round(_percentile(samples, 0.99), 3),
+        "max_ms": round(samples[-1], 3),
+        "calls_per_s": round(len(samples) / elapsed, 1),
+    }
+
+
+def dashboard_callbacks(rows: int):
+    import dashboard
+    from gr_helper.render_jobs import render_job_cards_clickable_async
+
+    async def cards(rng):
+        await render_job_cards_clickable_async(rng.choice([0, 40, 70]), 100, rng.choice(["score_desc", "newest"]))
+
+    async def stats(rng):
+        await dashboard.fetch_stats()
+
+    async def detail(rng):
+        await dashboard.show_job_detail(rng.randint(1, rows))
+
+    return [cards, stats, detail]
+
+
+async def _bench(db, rows: int, users: List[int], calls: int, think: float) -> List[Dict]:
+    import async_jobdb
+
+    async_jobdb._default_db = db
+    callbacks = dashboard_callbacks(rows)
+    results = []
+    try:
+        # Warm up the imports and grow the pool to its working size, so connects are not timed.
+        await run_level(callbacks, max(users), len(callbacks), 0, seed=0)
+        for n in users:
+            results.append(await run_level(callbacks, n, calls, think, seed=n))
+            r = results[-1]
+            print(f"{n:>4} users  p50 {r['p50_ms']:>9.3f}ms  p95 {r['p95_ms']:>9.3f}ms  p99 {r['p99_ms']:>9.3f}ms  "
+                  f"{r['calls_per_s']:>8} calls/s")
+    finally:
+        await db.close()
+        async_jobdb._default_db = None
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="p99 of the async dashboard callbacks as concurrent users grow")
+    parser.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--rows", type=int, default=10_000, help="seeded jobs table size")
+    parser.add_argument("--users", type=int, nargs="+", default=DEFAULT_USERS)
+    parser.add_argument("--calls", type=int, default=30, help="callbacks per user at every concurrency level")
+    parser.add_argument("--think-ms", type=float, default=200, help="average pause between one user's calls")
+    parser.add_argument("--pool-max", type=int, default=None, help="asyncpg pool size (default DB_ASYNC_POOL_MAX)")
+    parser.add_argument("--max-growth", type=float, default=MAX_P99_GROWTH,
+                        help="fail when p99 at the most users is more than this many times p99 at the fewest (0: never)")
+    parser.add_argument("--output", default=f"bench-async-{datetime.now():%Y%m%dT%H%M%S}.json")
+    args = parser.parse_args(argv)
+
+    if args.backend == "postgres":
+        from async_jobdb import AsyncJobDatabase, DB_ASYNC_POOL_MAX
+
+        sync_db = _postgres_database(args.rows)
+        dsn = os.environ["DATABASE_URL"]
+        # asyncpg passes unknown DSN parameters on as server settings.
+        dsn += ("&" if "?" in dsn else "?") + f"search_path={PG_SCHEMA}"
+        db = AsyncJobDatabase(dsn=dsn, max_size=args.pool_max or DB_ASYNC_POOL_MAX)
+    else:
+        sync_db = SqliteJobDatabase(":memory:")
+        sync_db.seed(args.rows)
+        db = AsyncSqliteJobDatabase(sync_db)
+
+    try:
+        results = asyncio.run(_bench(db, args.rows, sorted(args.users), args.calls, args.think_ms / 1000))
+    finally:
+        sync_db.close()
+
+    growth = round(results[-1]["p99_ms"] / results[0]["p99_ms"], 2) if results and results[0]["p99_ms"] else None
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "rows": args.rows,
+        "think_ms": args.think_ms,
+        "results": results,
+        "p99_growth": growth,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"p99 growth {results[0]['users']} -> {results[-1]['users']} users: {growth}x")
+    print(f"Results written to {args.output}")
+
+    if args.max_growth and growth and growth > args.max_growth:
+        print(f"REGRESSION p99 grew {growth}x, more than --max-growth {args.max_growth}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Compare cascade scoring (triage, then full scoring for candidates) with single-stage scoring.
+
+    python -m benchmarks.cascade_eval                                  # all_jobs.json, LLM_BACKEND's model
+    LLM_BACKEND=record python -m benchmarks.cascade_eval               # live once, cached for reruns
+    python -m benchmarks.cascade_eval --synthetic 1000 --llm-latency 0.5
+    python -m benchmarks.cascade_eval --threshold 40 --triage-model gemini-2.0-flash-lite
+
+Both modes score the same fixture jobs; nothing is written to the database. Reports agreement of the
+cascade's scores with the single-stage ones and tokens, requests and wall time per 1,000 jobs for each.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import fixtures
+from benchmarks.run import PROFILE, _git_revision
+
+DEFAULT_FIXTURE = os.path.join(ROOT, "all_jobs.json")
+# The scale in the full scoring prompt; agreeing on the band is what matters for the dashboard.
+BANDS = [(90, "perfect"), (70, "strong"), (50, "decent"), (30, "weak"), (0, "not relevant")]
+
+
+def band(score: int) -> str:
+    return next(name for floor, name in BANDS if score >= floor)
+
+
+def load_jobs(path: Optional[str], synthetic: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    if synthetic:
+        jobs = fixtures.synthetic_jobs(synthetic, seed=11)
+    else:
+        with open(path or DEFAULT_FIXTURE, encoding="utf-8") as f:
+            jobs = json.load(f)
+    for i, job in enumerate(jobs, 1):
+        job.setdefault("id", i)
+    return jobs[:limit] if limit else jobs
+
+
+def _usage() -> Dict:
+    from job_agent import LLM_TOKENS, LLM_REQUEST_SECONDS
+
+    return {"tokens": LLM_TOKENS.snapshot(), "requests": LLM_REQUEST_SECONDS.snapshot()}
+
+
+def _by_stage(before: Dict, after: Dict) -> Dict[str, Dict[str, float]]:
+    """Token and request deltas, by stage."""
+    stages: Dict[str, Dict[str, float]] = {}
+    for key, value in after["tokens"].items():
+        labels = dict(part.split("=", 1) for part in key.split(","))
+        entry = stages.setdefault(labels["stage"], {"input_tokens": 0, "output_tokens": 0, "requests": 0})
+        entry[f"{labels['direction']}_tokens"] += value - before["tokens"].get(key, 0)
+    for key, value in after["requests"].items():
+        labels = dict(part.split("=", 1) for part in key.split(","))
+        entry = stages.setdefault(labels["stage"], {"input_tokens": 0, "output_tokens": 0, "requests": 0})
+        entry["requests"] += value["count"] - before["requests"].get(key, {}).get("count", 0)
+    return {stage: e for stage, e in stages.items() if any(e.values())}
+
+
+def run_mode(name: str, score: Callable[[List[Dict]], List[Dict]], jobs: List[Dict], chunk: int) -> Dict:
+    before = _usage()
+    started = time.perf_counter()
+    scores: Dict[int, Dict] = {}
+    failures = 0
+    for i in range(0, len(jobs), chunk):
+        try:
+            for s in score(jobs[i:i + chunk]):
+                try:
+                    scores[int(s["id"])] = s
+                except (KeyError, TypeError, ValueError):
+                    continue
+        except Exception as e:
+            failures += 1
+            print(f"{name}: batch {i // chunk + 1} failed: {e}")
+    elapsed = time.perf_counter() - started
+
+    stages = _by_stage(before, _usage())
+    per_1000 = 1000 / max(len(jobs), 1)
+    totals = {k: sum(s[k] for s in stages.values()) for k in ("input_tokens", "output_tokens", "requests")}
+    return {
+        "mode": name,
+        "jobs": len(jobs),
+        "scored": len(scores),
+        "failed_batches": failures,
+        "seconds": round(elapsed, 2),
+        "stages": stages,
+        "per_1000_jobs": {
+            "input_tokens": round(totals["input_tokens"] * per_1000),
+            "output_tokens": round(totals["output_tokens"] * per_1000),
+            "requests": round(totals["requests"] * per_1000, 1),
+            "seconds": round(elapsed * per_1000, 1),
+        },
+        "scores": scores,
+    }
+
+
+def agreement(single: Dict[int, Dict], cascade: Dict[int, Dict], min_score: int) -> Dict:
+    """How far the cascade's scores are from single-stage scoring, over the jobs both scored."""
+    ids = sorted(set(single) & set(cascade))
+    if not ids:
+        return {"compared": 0}
+    a = {i: int(single[i]["score"]) for i in ids}
+    b = {i: int(cascade[i]["score"]) for i in ids}
+    screened = {i for i in ids if str(cascade[i].get("analysis", "")).startswith("Screened out by triage")}
+    relevant = {i for i in ids if a[i] >= min_score}
+    kept = {i for i in ids if b[i] >= min_score}
+    return {
+        "compared": len(ids),
+        "screened": len(screened),
+        "band_agreement": round(sum(band(a[i]) == band(b[i]) for i in ids) / len(ids), 3),
+        "mean_abs_diff": round(sum(abs(a[i] - b[i]) for i in ids) / len(ids), 1),
+        "mean_abs_diff_full_scored": round(
+            sum(abs(a[i] - b[i]) for i in ids if i not in screened) / max(len(ids) - len(screened), 1), 1),
+        # Jobs single-stage scoring puts at or above min_score: how many the cascade still shows there.
+        f"recall_at_{min_score}": round(len(relevant & kept) / len(relevant), 3) if relevant else None,
+        f"precision_at_{min_score}": round(len(relevant & kept) / len(kept), 3) if kept else None,
+        "lost_by_triage": sorted((i for i in relevant & screened), key=lambda i: -a[i]),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import job_agent
+    from job_agent import JobMatcherAgent, TRIAGE_BATCH_SIZE, TRIAGE_THRESHOLD
+    from llm_backends import get_llm_backend, SyntheticBackend, LLM_BACKEND, LLM_MODEL
+
+    parser = argparse.ArgumentParser(description="Cascade vs single-stage scoring on a fixture set")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="JSON list of jobs, e.g. an export of the jobs table")
+    parser.add_argument("--synthetic", type=int, default=0, help="use this many generated jobs instead")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--backend", default=LLM_BACKEND, help="LLM_BACKEND for both modes")
+    parser.add_argument("--model", default=LLM_MODEL)
+    parser.add_argument("--triage-model", default=job_agent.TRIAGE_MODEL)
+    parser.add_argument("--threshold", type=int, default=TRIAGE_THRESHOLD, help="triage score that earns full scoring")
+    parser.add_argument("--batch-size", type=int, default=10, help="jobs per full scoring request")
+    parser.add_argument("--triage-batch-size", type=int, default=TRIAGE_BATCH_SIZE)
+    parser.add_argument("--min-score", type=int, default=70, help="score the dashboard treats as a match")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per call for the synthetic backend")
+    parser.add_argument("--output", default=f"cascade-eval-{datetime.now():%Y%m%dT%H%M%S}.json")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.fixture, args.synthetic, args.limit)
+    import langchain_core.messages  # noqa: F401 - imported by the first request; keep it out of the timings
+
+    def backend(model: str):
+        if args.backend == "synthetic":
+            return SyntheticBackend(latency=args.llm_latency)
+        return get_llm_backend(args.backend, model=model)
+
+    agent = JobMatcherAgent.__new__(JobMatcherAgent)
+    agent.user_profile = PROFILE
+    agent.llm = backend(args.model)
+    agent.triage_llm = agent.llm if args.triage_model == args.model else backend(args.triage_model)
+
+    single = run_mode("single", agent.score_jobs_batch, jobs, args.batch_size)
+    cascade = run_mode("cascade", lambda chunk: agent.score_jobs_cascade(chunk, args.batch_size, args.threshold),
+                       jobs, args.triage_batch_size)
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "fixture": f"synthetic:{args.synthetic}" if args.synthetic else args.fixture,
+        "backend": args.backend,
+        "model": args.model,
+        "triage_model": args.triage_model,
+        "threshold": args.threshold,
+        "agreement": agreement(single["scores"], cascade["scores"], args.min_score),
+        "modes": [dict(m, scores={str(k): v for k, v in m["scores"].items()}) for m in (single, cascade)],
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"{len(jobs)} jobs, backend {args.backend}, model {args.model}, triage {args.triage_model} "
+          f"at >= {args.threshold}")
+    for m in (single, cascade):
+        p = m["per_1000_jobs"]
+        print(f"{m['mode']:<8} per 1,000 jobs: {p['input_tokens']:>9,} in  {p['output_tokens']:>8,} out  "
+              f"{p['requests']:>6} requests  {p['seconds']:>8}s  (scored {m['scored']}/{m['jobs']})")
+    for key, value in report["agreement"].items():
+        print(f"  {key}: {value}")
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
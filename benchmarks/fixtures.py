@@ -0,0 +1,260 @@
+import os
+import json
+import glob
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+FIXTURES_DIR = os.getenv("BENCH_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+REMOTEOK_FIXTURE = os.path.join(FIXTURES_DIR, "remoteok.json")
+# Committed 104 result pages; `record-104` adds generated ones, saved snapshots with cards can be copied in.
+PAGES_104_DIR = os.path.join(FIXTURES_DIR, "104")
+# `_save_snapshot` writes here; any snapshot that still contains result cards is used as-is.
+SNAPSHOT_DIR = os.getenv("BENCH_SNAPSHOT_DIR", "snapshots")
+
+TITLES = ["Python Backend Intern", "Frontend Engineer Intern", "AI Engineer Intern", "Machine Learning Intern",
+          "Senior Backend Engineer", "Junior React Developer", "Data Analyst", "Sales Manager",
+          "Graduate Software Engineer", "Staff Platform Engineer", "Store Assistant", "DevOps Intern"]
+TAGS = ["python", "react", "javascript", "backend", "frontend", "machine learning", "ai", "sales", "devops",
+        "junior", "intern", "senior", "postgres", "docker"]
+WORDS = ("python postgres docker react api team build remote students graduate ship features learn mentor "
+         "customers data pipelines models cloud testing").split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def record_remoteok(path: str = REMOTEOK_FIXTURE) -> int:
+    """Save the live RemoteOK API response so later runs are offline. Needs network, run it by hand."""
+    import requests
+    from remote_ok_scrap import RemoteOkScraper
+
+    scraper = RemoteOkScraper()
+    response = requests.get(scraper.base_url, headers=scraper.headers, timeout=15)
+    response.raise_for_status()
+    payload = response.json()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    return len(payload)
+
+
+def synthetic_remoteok_payload(jobs: int = 500, seed: int = 7) -> List[Dict]:
+    """Shaped like the RemoteOK API: a legal notice first, then job objects."""
+    rng = random.Random(seed)
+    payload: List[Dict] = [{"legal": "API terms of service"}]
+    for i in range(jobs):
+        title = rng.choice(TITLES)
+        payload.append({
+            "id": str(100000 + i),
+            "slug": f"remote-{title.lower().replace(' ', '-')}-{100000 + i}",
+            "date": (datetime(2025, 1, 1) + timedelta(hours=i)).isoformat(),
+            "company": f"Company {rng.randint(1, 300)}",
+            "position": title,
+            "tags": rng.sample(TAGS, 4),
+            "description": _sentence(rng, 120),
+            "location": rng.choice(["Remote", "Worldwide", "Taiwan", "Europe"]),
+            "salary_min": rng.choice([0, 30000, 50000]),
+            "salary_max": rng.choice([0, 60000, 90000]),
+        })
+    return payload
+
+
+def load_remoteok_payload() -> List[Dict]:
+    if os.path.exists(REMOTEOK_FIXTURE):
+        with open(REMOTEOK_FIXTURE, encoding="utf-8") as f:
+            return json.load(f)
+    return synthetic_remoteok_payload()
+
+
+CARD_HTML = '''
+<div data-key="{key}"><div class="job-summary">
+  <div class="info"><div>
+    <div class="info-job text-break mb-2"><a href="https://www.104.com.tw/job/{key}">{title}</a></div>
+    <div class="info-company mb-1">{company}</div>
+    <div class="info-tags gray-deep-dark">
+      <span>{location}</span><span>{experience}</span><span>{education}</span><span><a>{salary}</a></span>
+    </div>
+    <div class="info-description text-gray-darker t4 text-break mt-2 position-relative info-description__line2">{description}</div>
+  </div></div>
+  <div class="col-auto date"><div>{date}</div></div>
+</div></div>
+'''
+
+PAGE_HTML = '''<html><body><div id="app"><div>
+<div class="container jb-container container-sidebar--rwd main pt-1 pt-md-5"><div><div class="col main"><div class="job">
+<div class="vue-recycle-scroller ready page-mode direction-vertical recycle-scroller">
+<div class="vue-recycle-scroller__item-wrapper">{cards}</div>
+</div></div></div></div></div></div></div></body></html>'''
+
+
+def synthetic_104_page(cards: int = 200, seed: int = 11) -> str:
+    rng = random.Random(seed)
+    items = []
+    for i in range(cards):
+        items.append(CARD_HTML.format(
+            key=f"8{i:06d}",
+            title=rng.choice(["AI工程師 實習", "前端工程師 實習", "後端工程師 實習", "機器學習 實習生", "行政助理"]),
+            company=f"公司 {rng.randint(1, 400)} 股份有限公司",
+            location=rng.choice(["台北市信義區", "新北市板橋區", "台中市西屯區", "新竹市東區"]),
+            experience="經歷不拘",
+            education=rng.choice(["大學", "碩士", "專科"]),
+            salary=rng.choice(["時薪190元", "月薪30,000~36,000元", "待遇面議"]),
+            description=_sentence(rng, 40),
+            date=f"{rng.randint(1, 12)}/{rng.randint(1, 28)}",
+        ))
+    return PAGE_HTML.format(cards="".join(items))
+
+
+def write_synthetic(force: bool = False) -> List[str]:
+    """Write the generated RemoteOK payload and 104 page into FIXTURES_DIR, keeping recorded files unless `force`."""
+    written = []
+    os.makedirs(PAGES_104_DIR, exist_ok=True)
+    if force or not os.path.exists(REMOTEOK_FIXTURE):
+        with open(REMOTEOK_FIXTURE, "w", encoding="utf-8") as f:
+            # One entry per line keeps diffs of the committed file readable.
+            f.write("[\n" + ",\n".join(json.dumps(e, ensure_ascii=False) for e in synthetic_remoteok_payload()) + "\n]\n")
+        written.append(REMOTEOK_FIXTURE)
+    page = os.path.join(PAGES_104_DIR, "synthetic_200_cards.html")
+    if force or not os.path.exists(page):
+        with open(page, "w", encoding="utf-8") as f:
+            f.write(synthetic_104_page())
+        written.append(page)
+    return written
+
+
+def load_104_pages() -> List[str]:
+    """HTML of 104 result pages: the committed fixture pages and saved snapshots that still contain cards,
+    else one synthetic page."""
+    from yilingsi_scraper import CARD_CHILD_SEL
+
+    pages = []
+    paths = sorted(glob.glob(os.path.join(PAGES_104_DIR, "*.html"))) + sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "*.html")))
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        if BeautifulSoup(html, "html.parser").select_one(CARD_CHILD_SEL) is not None:
+            pages.append(html)
+    return pages or [synthetic_104_page()]
+
+
+class FakeElement:
+    """Enough of selenium's WebElement, over a BeautifulSoup tag, for `collect_vrt_cards` and `extract_job_data`."""
+
+    def __init__(self, tag, driver: "FakeDriver"):
+        self.tag = tag
+        self.driver = driver
+
+    def find_elements(self, by, value) -> List["FakeElement"]:
+        if by == By.CSS_SELECTOR:
+            found = self.tag.select(value)
+        elif by == By.TAG_NAME:
+            found = self.tag.find_all(value)
+        else:
+            raise NotImplementedError(by)
+        return [FakeElement(t, self.driver) for t in found if self.driver.visible(t)]
+
+    def find_element(self, by, value) -> "FakeElement":
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(value)
+        return found[0]
+
+    @property
+    def text(self) -> str:
+        return self.tag.get_text("\n", strip=True)
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        if name == "outerHTML":
+            return str(self.tag)
+        value = self.tag.get(name)
+        return " ".join(value) if isinstance(value, list) else value
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def click(self):
+        pass
+
+
+class FakeDriver:
+    """A page whose result list is virtualised like 104's: only `window` cards exist in the DOM at a time,
+    and each scroll script moves the window down by one screen."""
+
+    def __init__(self, html: str, window: int = 20):
+        from yilingsi_scraper import CARD_CHILD_SEL
+
+        self.page_source = html
+        self.soup = BeautifulSoup(html, "html.parser")
+        self.cards = {id(t): i for i, t in enumerate(self.soup.select(CARD_CHILD_SEL))}
+        self.window = window
+        self.offset = 0
+
+    def visible(self, tag) -> bool:
+        i = self.cards.get(id(tag))
+        return i is None or self.offset <= i < self.offset + self.window
+
+    def find_elements(self, by, value) -> List[FakeElement]:
+        return FakeElement(self.soup, self).find_elements(by, value)
+
+    def find_element(self, by, value) -> FakeElement:
+        return FakeElement(self.soup, self).find_element(by, value)
+
+    def execute_script(self, script: str, *args):
+        if "scrollTop = 0" in script:
+            self.offset = 0
+        elif "scrollTop" in script or "scrollTo" in script:
+            self.offset = min(self.offset + self.window // 2, max(len(self.cards) - self.window, 0))
+
+    def get(self, url: str):
+        pass
+
+    def save_screenshot(self, path: str) -> bool:
+        return False
+
+    def quit(self):
+        pass
+
+
+def synthetic_jobs(count: int, seed: int = 5, prefix: str = "job") -> List[Dict]:
+    """Scraped-job dicts as the sources hand them to `save_jobs`."""
+    rng = random.Random(seed)
+    now = datetime.now().isoformat()
+    return [{
+        "title": f"{rng.choice(TITLES)} {i}",
+        "company": f"Company {rng.randint(1, 5000)}",
+        "location": rng.choice(["Remote", "Taipei", "Hsinchu"]),
+        "url": f"https://example.com/{prefix}/{i}",
+        "salary": "Not specified",
+        "description": _sentence(rng, 60),
+        "date_posted": f"{rng.randint(1, 12)}/{rng.randint(1, 28)}",
+        "tags": rng.sample(TAGS, 3),
+        "source": rng.choice(["RemoteOK", "104.com.tw"]),
+        "search_keyword": "python",
+        "scraped_at": now,
+    } for i in range(count)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record benchmark fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("record-remoteok", help=f"save the live RemoteOK payload to {REMOTEOK_FIXTURE}")
+    synthetic = sub.add_parser("write-synthetic", help=f"write generated fixtures into {FIXTURES_DIR}")
+    synthetic.add_argument("--force", action="store_true", help="overwrite recorded fixtures too")
+    args = parser.parse_args(argv)
+    if args.command == "record-remoteok":
+        print(f"Recorded {record_remoteok()} RemoteOK entries to {REMOTEOK_FIXTURE}")
+    elif args.command == "write-synthetic":
+        for path in write_synthetic(args.force):
+            print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,380 @@
+"""Offline benchmarks for the scrape -> save -> score -> dashboard hot paths.
+
+    python -m benchmarks.run                                   # sqlite stand-in, 1k/10k/100k rows
+    python -m benchmarks.run --backend postgres --sizes 10000  # scratch schema on DATABASE_URL
+    python -m benchmarks.run --save-baseline                   # record this machine's baseline
+    python -m benchmarks.run --only save_jobs render_cards     # a subset
+
+Nothing here touches the network: RemoteOK answers from benchmarks/data/remoteok.json, 104 from the pages
+in benchmarks/data/104 and saved snapshots, and the LLM is llm_backends.SyntheticBackend with configurable
+latency. The committed fixtures are generated (`python -m benchmarks.fixtures write-synthetic`); replace
+remoteok.json with `python -m benchmarks.fixtures record-remoteok` on a machine with network access.
+benchmarks/data/baseline.json was recorded on a 1 vCPU machine; re-record it where regressions are checked.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import warnings
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fixtures
+from benchmarks.sqlite_db import SqliteJobDatabase
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+BASELINE_PATH = os.getenv("BENCH_BASELINE", os.path.join(fixtures.FIXTURES_DIR, "baseline.json"))
+PG_SCHEMA = "job_agent_bench"
+PROFILE = {
+    "skills": ["Python", "JavaScript", "React", "Machine Learning", "AI Engineering"],
+    "preferences": {"job_type": "internship", "location": ["Remote", "Taiwan"], "min_relevance": 40},
+}
+
+
+def measure(fn: Callable, runs: int, setup: Optional[Callable] = None, warmup: int = 1) -> Dict:
+    """Call `fn` `warmup + runs` times; `setup` runs before each call and is not timed."""
+    samples = []
+    for i in range(warmup + runs):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        if i >= warmup:
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "runs": runs,
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[math.ceil(len(samples) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def bench_remoteok_filter(runs: int) -> Dict:
+    from remote_ok_scrap import RemoteOkScraper
+
+    payload = fixtures.load_remoteok_payload()
+    scraper = RemoteOkScraper()
+    keywords = ['AI Engineer', 'Frontend', 'Backend', 'Machine Learning', 'Python', 'React', 'Junior', 'intern']
+    with mock.patch("remote_ok_scrap.requests.get", return_value=_Response(payload)):
+        result = measure(lambda: scraper.scrape_jobs(keywords=keywords, min_keywords_match=2), runs)
+    return dict(result, items=len(payload) - 1)
+
+
+def _scraper(html: str, known=None):
+    from selenium.webdriver.support.ui import WebDriverWait
+    from yilingsi_scraper import Job104Scraper
+
+    scraper = Job104Scraper.__new__(Job104Scraper)
+    scraper.base_url = "https://www.104.com.tw/jobs/search/"
+    scraper.known = known
+    scraper.run_seen = None
+    scraper.driver = fixtures.FakeDriver(html)
+    scraper.wait = WebDriverWait(scraper.driver, 1)
+    return scraper
+
+
+def bench_collect_cards(runs: int) -> Dict:
+    from yilingsi_scraper import collect_vrt_cards
+
+    pages = fixtures.load_104_pages()
+    scrapers = [_scraper(html) for html in pages]
+
+    def run():
+        for s in scrapers:
+            collect_vrt_cards(s, scroll_pause=0)
+    # Includes the fixed 0.25s settle pause collect_vrt_cards takes once a scroll finds nothing new.
+    return dict(measure(run, runs), items=sum(len(s.driver.cards) for s in scrapers))
+
+
+def bench_collect_cards_incremental(runs: int, new_cards: int = 20) -> Dict:
+    """A daily run: only the first `new_cards` results of each page are not in the database yet."""
+    from known_jobs import BloomFilter, normalize_url
+    from yilingsi_scraper import CARD_CHILD_SEL, card_url, collect_vrt_cards
+
+    scrapers = []
+    for html in fixtures.load_104_pages():
+        s = _scraper(html)
+        window, s.driver.window = s.driver.window, len(s.driver.cards)
+        urls = [normalize_url(card_url(c)) for c in s.driver.find_elements("css selector", CARD_CHILD_SEL)]
+        s.driver.window = window
+        s.known = BloomFilter(len(urls))
+        s.known.update(urls[new_cards:])
+        scrapers.append(s)
+
+    collected = []
+
+    def run():
+        collected[:] = [len(collect_vrt_cards(s, scroll_pause=0)) for s in scrapers]
+    return dict(measure(run, runs), items=sum(len(s.driver.cards) for s in scrapers), collected=sum(collected))
+
+
+def bench_extract_cards(runs: int) -> Dict:
+    from yilingsi_scraper import CARD_CHILD_SEL
+
+    cards = []
+    for html in fixtures.load_104_pages():
+        s = _scraper(html)
+        s.driver.window = len(s.driver.cards)
+        cards += [(s, c) for c in s.driver.find_elements("css selector", CARD_CHILD_SEL)]
+
+    def run():
+        for s, card in cards:
+            s.extract_job_data(card, "bench")
+    return dict(measure(run, runs), items=len(cards))
+
+
+def bench_render_cards(runs: int, rows: int = 50) -> Dict:
+    from gr_helper.render_jobs import _clickable_cards_html
+
+    data = [{
+        "id": i, "title": f"Backend Engineer {i}", "company": f"Company {i}", "location": "Taipei",
+        "ai_score": 40 + i % 60, "ai_analysis": "Strong Python/ML match " * 6, "url": f"https://example.com/{i}",
+        "date_posted": "1/1", "source": "RemoteOK",
+    } for i in range(rows)]
+    return dict(measure(lambda: _clickable_cards_html(data), runs), items=rows)
+
+
+def _postgres_database(rows: int):
+    import psycopg2
+    import migrate
+    from jobdb import JobDatabase
+    from db_pool import ConnectionPool
+
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        raise SystemExit("--backend postgres needs DATABASE_URL")
+    options = f"-c search_path={PG_SCHEMA}"
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {PG_SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {PG_SCHEMA}")
+    conn.commit()
+    conn.close()
+
+    conn = psycopg2.connect(dsn, options=options)
+    migrate.migrate_up(conn, verbose=False)
+    migrate.seed_jobs(conn, rows)
+    conn.close()
+
+    db = JobDatabase.__new__(JobDatabase)
+    db.pool = ConnectionPool(dsn=dsn, options=options)
+
+    def requeue_for_scoring(count: int):
+        with db.connection() as c:
+            c.cursor().execute('''
+                UPDATE jobs SET scoring_state = 'pending', scoring_attempts = 0, ai_score = 0
+                WHERE id IN (SELECT id FROM jobs WHERE status = 'new' ORDER BY created_at DESC LIMIT %s)
+            ''', (count,))
+            c.commit()
+
+    def close():
+        JobDatabase.close(db)
+        conn = psycopg2.connect(dsn)
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {PG_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+    db.requeue_for_scoring = requeue_for_scoring
+    db.close = close
+    return db
+
+
+def open_database(backend: str, rows: int):
+    if backend == "postgres":
+        return _postgres_database(rows)
+    db = SqliteJobDatabase(os.getenv("BENCH_SQLITE_PATH", ":memory:"))
+    db.seed(rows)
+    return db
+
+
+def database_benchmarks(db, runs: int, llm_latency: float) -> Dict[str, Callable[[], Dict]]:
+    """Benchmarks that run against a seeded database, keyed by name."""
+    from gr_helper import render_jobs
+
+    batch = {"n": 0}
+
+    def fresh_jobs():
+        batch["n"] += 1
+        batch["jobs"] = fixtures.synthetic_jobs(200, seed=batch["n"], prefix=f"bench-{time.time_ns()}")
+
+    def bench_save(method):
+        return lambda: dict(measure(lambda: getattr(db, method)(batch["jobs"]), runs, setup=fresh_jobs), items=200)
+
+    def bench_score_pipeline():
+        from job_agent import JobMatcherAgent
+        from llm_backends import SyntheticBackend
+
+        agent = JobMatcherAgent.__new__(JobMatcherAgent)
+        agent.user_profile = PROFILE
+        agent.db = db
+        agent.llm = SyntheticBackend(latency=llm_latency)
+        agent.cascade = False
+        result = measure(lambda: agent.process_all_jobs(batch_size=10, max_batches=5), runs,
+                         setup=lambda: db.requeue_for_scoring(50))
+        return dict(result, items=50, llm_latency_s=llm_latency)
+
+    def bench_dashboard_queries():
+        render_jobs.db = db
+
+        def run():
+            render_jobs._fetch_jobs(70, 100, 50, "score_desc")
+            render_jobs._fetch_jobs(0, 100, 50, "newest")
+            db.get_jobs_by_score(min_score=70, limit=50)
+            db.get_stats()
+        return measure(run, runs)
+
+    def bench_dashboard_table():
+        import dashboard
+
+        dashboard.db_client = db
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # pandas wants SQLAlchemy for non-sqlite3 DBAPI connections
+            return measure(lambda: dashboard.top_jobs_table(min_score=70, limit=10, sort_by="newest"), runs)
+
+    return {
+        "save_jobs": bench_save("save_jobs"),
+        "save_jobs_bulk": bench_save("save_jobs_bulk"),
+        "score_pipeline": bench_score_pipeline,
+        "dashboard_queries": bench_dashboard_queries,
+        "dashboard_table": bench_dashboard_table,
+    }
+
+
+STATIC_BENCHMARKS = {
+    "remoteok_filter": bench_remoteok_filter,
+    "collect_cards": bench_collect_cards,
+    "collect_cards_incremental": bench_collect_cards_incremental,
+    "extract_cards": bench_extract_cards,
+    "render_cards": bench_render_cards,
+}
+DATABASE_BENCHMARKS = ["save_jobs", "save_jobs_bulk", "score_pipeline", "dashboard_queries", "dashboard_table"]
+
+
+def run_all(sizes: List[int], runs: int, backend: str, only: Optional[List[str]] = None,
+            llm_latency: float = 0.0) -> List[Dict]:
+    wanted = set(only or list(STATIC_BENCHMARKS) + DATABASE_BENCHMARKS)
+    results = []
+
+    for name, fn in STATIC_BENCHMARKS.items():
+        if name in wanted:
+            results.append(dict(fn(runs), name=name, size=None))
+            _print_result(results[-1])
+
+    if wanted & set(DATABASE_BENCHMARKS):
+        for rows in sizes:
+            started = time.perf_counter()
+            db = open_database(backend, rows)
+            print(f"-- {rows:,} rows seeded ({backend}) in {time.perf_counter() - started:.1f}s")
+            try:
+                for name, fn in database_benchmarks(db, runs, llm_latency).items():
+                    if name in wanted:
+                        results.append(dict(fn(), name=name, size=rows))
+                        _print_result(results[-1])
+            finally:
+                db.close()
+    return results
+
+
+def _key(result: Dict) -> str:
+    return f"{result['name']}@{result['size']}" if result.get("size") else result["name"]
+
+
+def _print_result(r: Dict):
+    print(f"{_key(r):<28} p50 {r['p50_ms']:>10.3f}ms  p95 {r['p95_ms']:>10.3f}ms  ({r['runs']} runs)")
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float, floor_ms: float) -> List[Dict]:
+    """Flag results whose p50 is more than `threshold` slower than the baseline (and by at least `floor_ms`)."""
+    previous = {_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get(_key(r))
+        if not old:
+            continue
+        r["baseline_p50_ms"] = old["p50_ms"]
+        r["change"] = round(r["p50_ms"] / old["p50_ms"] - 1, 3) if old["p50_ms"] else None
+        if r["p50_ms"] > old["p50_ms"] * (1 + threshold) and r["p50_ms"] - old["p50_ms"] >= floor_ms:
+            r["regression"] = True
+            regressions.append(r)
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the job agent hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="seeded jobs table sizes")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--only", nargs="+", choices=list(STATIC_BENCHMARKS) + DATABASE_BENCHMARKS)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the synthetic LLM waits per call")
+    parser.add_argument("--output", default=f"bench-{datetime.now():%Y%m%dT%H%M%S}.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown vs the baseline")
+    parser.add_argument("--floor-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.sizes, args.runs, args.backend, args.only, args.llm_latency)
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "backend": args.backend,
+        "results": results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.floor_ms)
+        report["baseline"] = args.baseline
+        report["regressions"] = [_key(r) for r in regressions]
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    for r in regressions:
+        print(f"REGRESSION {_key(r)}: p50 {r['baseline_p50_ms']:.3f}ms -> {r['p50_ms']:.3f}ms ({r['change']:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+import json
+import random
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from jobdb import JobDatabase, SCORING_LEASE_SECONDS, SCORING_MAX_ATTEMPTS, scoring_worker
+from async_jobdb import LIST_COLUMNS, ORDER_BY, StatsCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_hash TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    company TEXT,
+    location TEXT,
+    url TEXT,
+    salary TEXT,
+    description TEXT,
+    date_posted TEXT,
+    tags TEXT DEFAULT '[]',
+    source TEXT,
+    search_keyword TEXT,
+    scraped_at TEXT,
+    status TEXT DEFAULT 'new',
+    ai_score INTEGER DEFAULT 0,
+    ai_analysis TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    scoring_state TEXT NOT NULL DEFAULT 'pending',
+    claimed_at TIMESTAMP,
+    claimed_by TEXT,
+    scoring_attempts INTEGER NOT NULL DEFAULT 0,
+    last_scoring_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_score_created_idx ON jobs (ai_score DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_created_idx ON jobs (created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_status_created_idx ON jobs (status, created_at DESC);
+CREATE INDEX IF NOT EXISTS jobs_scoring_queue_idx ON jobs (created_at DESC)
+    WHERE status = 'new' AND scoring_state IN ('pending', 'in_progress');
+'''
+
+
+class _Cursor:
+    """psycopg2-flavoured cursor over sqlite3: `%s` placeholders, `::jsonb` casts and RealDictCursor rows."""
+
+    def __init__(self, conn: sqlite3.Connection, as_dict: bool):
+        self._cur = conn.cursor()
+        self._as_dict = as_dict
+        self.itersize = 0
+
+    def execute(self, sql: str, params=()):
+        self._cur.execute(sql.replace("%s", "?").replace("::jsonb", ""), tuple(params or ()))
+        return self
+
+    def _row(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    def __iter__(self):
+        return (self._row(r) for r in self._cur)
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    def close(self):
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Connection:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self, cursor_factory=None, name: Optional[str] = None) -> _Cursor:
+        return _Cursor(self._conn, as_dict=cursor_factory is not None)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+
+class SqliteJobDatabase(JobDatabase):
+    """`JobDatabase` on an SQLite file or `:memory:`, for offline benchmarks.
+
+    The inherited methods run unchanged through a cursor that speaks psycopg2's dialect; only the
+    queries built on Postgres-only SQL (SKIP LOCKED claims, ANY(), execute_values) are re-implemented.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self.pool = None
+
+    @contextmanager
+    def connection(self):
+        yield _Connection(self._conn)
+
+    def get_connection(self):
+        return _Connection(self._conn)
+
+    def return_connection(self, conn, discard: bool = False):
+        pass
+
+    def pool_stats(self) -> Dict:
+        return {"backend": "sqlite", "path": self.path}
+
+    def save_jobs_bulk(self, jobs: List[Dict], page_size: int = 500) -> tuple:
+        rows = {}
+        for job in jobs:
+            job_hash = self.generate_job_hash(job)
+            rows[job_hash] = (
+                job_hash, job['title'], job.get('company', 'Unknown'), job.get('location', 'Remote'), job['url'],
+                job.get('salary', 'Not specified'), job.get('description', ''), job.get('date_posted', 'Unknown'),
+                json.dumps(job.get('tags', [])), job['source'], job.get('search_keyword', ''), job['scraped_at'],
+            )
+        before = self._conn.total_changes
+        self._conn.executemany('''
+            INSERT INTO jobs (
+                job_hash, title, company, location, url, salary, description, date_posted, tags,
+                source, search_keyword, scraped_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job_hash) DO NOTHING
+        ''', list(rows.values()))
+        self._conn.commit()
+        new_jobs = self._conn.total_changes - before
+        return new_jobs, len(jobs) - new_jobs
+
+    def claim_unscored_jobs(self, limit: int = 10, worker: Optional[str] = None,
+                            lease_seconds: int = SCORING_LEASE_SECONDS,
+                            max_attempts: int = SCORING_MAX_ATTEMPTS) -> List[Dict]:
+        # One connection, one writer: no row locks to skip, so a select-then-update is equivalent.
+        expired = f"-{int(lease_seconds)} seconds"
+        cur = self._conn.cursor()
+        cur.execute('''
+            UPDATE jobs SET scoring_state = 'dead', claimed_at = NULL,
+                last_scoring_error = COALESCE(last_scoring_error, 'lease expired')
+            WHERE status = 'new' AND scoring_state = 'in_progress'
+              AND claimed_at < datetime('now', ?) AND scoring_attempts >= ?
+        ''', (expired, max_attempts))
+        ids = [r[0] for r in cur.execute('''
+            SELECT id FROM jobs
+            WHERE status = 'new'
+              AND (scoring_state = 'pending' OR (scoring_state = 'in_progress' AND claimed_at < datetime('now', ?)))
+            ORDER BY created_at DESC
+            LIMIT ?
+        ''', (expired, limit))]
+        if not ids:
+            self._conn.commit()
+            return []
+        marks = ",".join("?" * len(ids))
+        cur.execute(f'''
+            UPDATE jobs SET scoring_state = 'in_progress', claimed_at = CURRENT_TIMESTAMP, claimed_by = ?,
+                scoring_attempts = scoring_attempts + 1
+            WHERE id IN ({marks})
+        ''', (worker or scoring_worker(), *ids))
+        cur.execute(f"SELECT * FROM jobs WHERE id IN ({marks}) ORDER BY created_at DESC", ids)
+        columns = [d[0] for d in cur.description]
+        jobs = [dict(zip(columns, row)) for row in cur.fetchall()]
+        self._conn.commit()
+        return jobs
+
+    def fail_scoring(self, job_ids: List[int], error: str, max_attempts: int = SCORING_MAX_ATTEMPTS,
+                     worker: Optional[str] = None) -> int:
+        if not job_ids:
+            return 0
+        marks = ",".join("?" * len(job_ids))
+        cur = self._conn.execute(f'''
+            UPDATE jobs
+            SET scoring_state = CASE WHEN scoring_attempts >= ? THEN 'dead' ELSE 'pending' END,
+                claimed_at = NULL, last_scoring_error = ?
+            WHERE id IN ({marks}) AND scoring_state = 'in_progress' AND claimed_by = ?
+        ''', (max_attempts, error[:2000], *job_ids, worker or scoring_worker()))
+        self._conn.commit()
+        return cur.rowcount
+
+    def seed(self, rows: int, seed: int = 1):
+        """Same shape as `migrate.seed_jobs`: 31 days of history, mostly scored, a thin unscored recent tail."""
+        rng = random.Random(seed)
+        start = datetime.now() - timedelta(days=31)
+        step = timedelta(days=31) / max(rows, 1)
+
+        def generate():
+            for g in range(1, rows + 1):
+                s, t, a = rng.random(), rng.random(), rng.random()
+                pending = g > rows * 0.98
+                score = 0 if pending else (1 + int(t * 39) if a < 0.05 else 40 + int(t * 61))
+                yield (
+                    f"seed-{g}", f"Backend Engineer {g}", f"Company {g % 5000}", "Taipei",
+                    f"https://example.com/jobs/{g}", "Not specified", "python postgres docker " * 8, "Unknown",
+                    '["python"]', "RemoteOK" if g % 3 == 0 else "104.com.tw", "python", "",
+                    "new" if s < 0.85 else ("interested" if s < 0.95 else "applied"),
+                    score, "seeded", (start + step * g).strftime("%Y-%m-%d %H:%M:%S"),
+                    "pending" if pending else "done",
+                )
+
+        self._conn.executemany('''
+            INSERT INTO jobs (
+                job_hash, title, company, location, url, salary, description, date_posted, tags,
+                source, search_keyword, scraped_at, status, ai_score, ai_analysis, created_at, scoring_state
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', generate())
+        self._conn.execute("ANALYZE")
+        self._conn.commit()
+
+    def requeue_for_scoring(self, count: int):
+        """Put the newest `count` open jobs back in the queue so every scoring run has the same work."""
+        self._conn.execute('''
+            UPDATE jobs SET scoring_state = 'pending', scoring_attempts = 0, ai_score = 0
+            WHERE id IN (SELECT id FROM jobs WHERE status = 'new' ORDER BY created_at DESC LIMIT ?)
+        ''', (count,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class AsyncSqliteJobDatabase:
+    """The query API of `AsyncJobDatabase` the dashboard and tests use, over a `SqliteJobDatabase`, for offline runs.
+
+    sqlite3 blocks, so every query goes through one executor thread, the way its single connection would
+    serialise them anyway. It exercises the async callbacks end to end; latency under load is only
+    meaningful against Postgres.
+    """
+
+    def __init__(self, db: SqliteJobDatabase):
+        self.db = db
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="async-sqlite")
+        self.stats_cache = StatsCache()
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _rows(self, sql: str, params=()) -> List[Dict]:
+        cur = self.db._conn.execute(sql, params)
+        columns = [d[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    async def _run(self, sql: str, params=()) -> List[Dict]:
+        return await self._call(self._rows, sql, params)
+
+    async def list_jobs(self, min_score: int, max_score: int, limit: int, sort_by: str = "score_desc") -> List[Dict]:
+        order_clause = ORDER_BY.get(sort_by, ORDER_BY["score_desc"])
+        return await self._run(f'''
+            SELECT {LIST_COLUMNS} FROM jobs WHERE ai_score BETWEEN ? AND ? {order_clause} LIMIT ?
+        ''', (int(min_score), int(max_score), int(limit)))
+
+    async def get_job(self, job_id: int) -> Optional[Dict]:
+        rows = await self._run("SELECT * FROM jobs WHERE id = ?", (int(job_id),))
+        return rows[0] if rows else None
+
+    async def get_stats(self) -> Dict:
+        return await self.stats_cache.get("stats", self._get_stats)
+
+    async def _get_stats(self) -> Dict:
+        rows = await self._run('''
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE status = 'new') AS new,
+                   COUNT(*) FILTER (WHERE status = 'interested') AS interested,
+                   COUNT(*) FILTER (WHERE status = 'applied') AS applied
+            FROM jobs
+        ''')
+        return rows[0]
+
+    async def get_score_stats(self, status: str = 'new') -> Dict:
+        return await self.stats_cache.get(f"score_stats:{status}", lambda: self._get_score_stats(status))
+
+    async def _get_score_stats(self, status: str) -> Dict:
+        rows = await self._run('''
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE ai_score > 0) AS scored,
+                   COALESCE(ROUND(AVG(ai_score) FILTER (WHERE ai_score > 0), 1), 0) AS avg,
+                   COUNT(*) FILTER (WHERE ai_score >= 70) AS high,
+                   COUNT(*) FILTER (WHERE ai_score >= 40 AND ai_score < 70) AS medium,
+                   COUNT(*) FILTER (WHERE ai_score > 0 AND ai_score < 40) AS low
+            FROM jobs
+            WHERE status = ?
+        ''', (status,))
+        return dict(rows[0], avg=float(rows[0]["avg"]))
+
+    async def get_scoring_queue_depth(self) -> Dict[str, int]:
+        return await self.stats_cache.get("scoring_queue", self._get_scoring_queue_depth)
+
+    async def _get_scoring_queue_depth(self) -> Dict[str, int]:
+        rows = await self._run("SELECT scoring_state, COUNT(*) AS n FROM jobs WHERE status = 'new' GROUP BY scoring_state")
+        return {r["scoring_state"]: r["n"] for r in rows}
+
+    async def save_jobs_bulk(self, jobs: List[Dict]) -> Tuple[int, int]:
+        return await self._call(self.db.save_jobs_bulk, jobs)
+
+    async def update_job_score(self, job_id: int, score: int, analysis: str, worker: Optional[str] = None) -> bool:
+        return await self._call(self.db.update_job_score, job_id, score, analysis, worker)
+
+    async def update_job_scores(self, scores: List[Dict], worker: Optional[str] = None) -> int:
+        return sum([await self.update_job_score(s['id'], s['score'], s.get('analysis', ''), worker) for s in scores])
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,171 @@
+"""Import-time benchmark for the CLI entry points, from `python -X importtime` in fresh interpreters.
+
+    python -m benchmarks.startup                       # every entry point, 5 runs each
+    python -m benchmarks.startup --entry run_scraper   # one entry point
+    python -m benchmarks.startup --save-baseline
+
+Besides imports it times cold scorer construction (`cold:*`), with and without the LangChain agent.
+Fails when an entry point goes over its budget or regresses against the stored baseline.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import FIXTURES_DIR
+from benchmarks.run import compare, _git_revision
+
+BASELINE_PATH = os.getenv("BENCH_STARTUP_BASELINE", os.path.join(FIXTURES_DIR, "startup_baseline.json"))
+DEFAULT_BUDGET_MS = 1000
+# Import budgets in ms. The dashboard has to load Gradio to build its UI, which alone takes seconds.
+ENTRY_POINTS: Dict[str, float] = {
+    "run_scraper": DEFAULT_BUDGET_MS,
+    "run_scorer": DEFAULT_BUDGET_MS,
+    "cleanup_job": DEFAULT_BUDGET_MS,
+    "migrate": DEFAULT_BUDGET_MS,
+    "job_agent": DEFAULT_BUDGET_MS,
+    "scheduler": DEFAULT_BUDGET_MS,
+    "dashboard": 10_000,
+}
+
+_PROFILE = "{'skills': ['Python'], 'preferences': {'job_type': 'internship', 'location': ['Remote']}}"
+# Cold start of a scorer up to a usable chat model, timed in a fresh interpreter. No request is sent.
+SCENARIOS: Dict[str, Tuple[str, Optional[float]]] = {
+    "scorer_lean": (f"from job_agent import JobMatcherAgent\nJobMatcherAgent({_PROFILE}).llm", 3000),
+    "scorer_with_agent": (f"from job_agent import JobMatcherAgent\n"
+                          f"JobMatcherAgent({_PROFILE}, enable_tools=True).agent", None),
+}
+
+
+def import_profile(module: str) -> Dict[str, Dict[str, int]]:
+    """Self and cumulative import microseconds of every module loaded by `import <module>`."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", LOG_LEVEL="WARNING")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+    return profile
+
+
+def measure_scenario(name: str, code: str, runs: int) -> Dict:
+    # Gemini's client only checks that a key is set when it is constructed.
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    env.setdefault("GOOGLE_API_KEY", "startup-benchmark")
+    script = f"import time\n_t = time.perf_counter()\n{code}\nprint(time.perf_counter() - _t)"
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{name} failed:\n{proc.stderr[-2000:]}")
+        samples.append(float(proc.stdout.strip().splitlines()[-1]) * 1000)
+    samples.sort()
+    return {
+        "name": f"cold:{name}",
+        "size": None,
+        "runs": runs,
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[-1], 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+
+def measure_entry(module: str, runs: int, top: int = 10) -> Dict:
+    totals = []
+    self_times: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(runs):
+        profile = import_profile(module)
+        totals.append(profile[module]["cumulative_us"] / 1000)
+        for name, p in profile.items():
+            self_times[name].append(p["self_us"])
+    totals.sort()
+    heaviest = sorted(((statistics.median(v) / 1000, k) for k, v in self_times.items()), reverse=True)[:top]
+    return {
+        "name": f"import:{module}",
+        "size": None,
+        "runs": runs,
+        "p50_ms": round(statistics.median(totals), 3),
+        "p95_ms": round(totals[-1], 3),
+        "min_ms": round(totals[0], 3),
+        "modules": len(self_times),
+        "heaviest": [{"module": k, "self_ms": round(ms, 3)} for ms, k in heaviest],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the entry points")
+    parser.add_argument("--entry", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument("--scenario", nargs="*", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest modules to list per entry point")
+    parser.add_argument("--output", default=f"bench-startup-{datetime.now():%Y%m%dT%H%M%S}.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--floor-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+
+    results = []
+    over_budget = []
+    for module in args.entry:
+        r = measure_entry(module, args.runs, args.top)
+        r["budget_ms"] = ENTRY_POINTS[module]
+        results.append(r)
+        flag = "OVER BUDGET" if r["p50_ms"] > r["budget_ms"] else ""
+        if flag:
+            over_budget.append(r)
+        print(f"{module:<12} p50 {r['p50_ms']:>9.1f}ms  budget {r['budget_ms']:>7.0f}ms  {flag}")
+        for h in r["heaviest"]:
+            print(f"    {h['self_ms']:>8.1f}ms  {h['module']}")
+
+    for name in args.scenario:
+        code, budget = SCENARIOS[name]
+        r = measure_scenario(name, code, args.runs)
+        r["budget_ms"] = budget
+        results.append(r)
+        flag = "OVER BUDGET" if budget and r["p50_ms"] > budget else ""
+        if flag:
+            over_budget.append(r)
+        print(f"{r['name']:<24} p50 {r['p50_ms']:>9.1f}ms  budget {budget or '-':>7}ms  {flag}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.floor_ms)
+        report["regressions"] = [r["name"] for r in regressions]
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    for r in regressions:
+        print(f"REGRESSION {r['name']}: p50 {r['baseline_p50_ms']:.1f}ms -> {r['p50_ms']:.1f}ms ({r['change']:+.0%})")
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+import uuid
+import threading
+from datetime import datetime
+from typing import Dict, List, Set
+
+from app_logging import get_logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+SCRAPE_CHECKPOINT_PATH = os.getenv("SCRAPE_CHECKPOINT_PATH", os.path.join(DATA_DIR, "scrape_checkpoints.sqlite"))
+# --resume continues the latest unfinished run of the same sources and keywords that started within this many
+# hours; without one it starts a new run.
+SCRAPE_RUN_WINDOW_HOURS = float(os.getenv("SCRAPE_RUN_WINDOW_HOURS", "12"))
+SCRAPE_RESUME = os.getenv("SCRAPE_RESUME", "0") == "1"
+SCRAPE_CHECKPOINT_RETENTION_DAYS = int(os.getenv("SCRAPE_CHECKPOINT_RETENTION_DAYS", "7"))
+
+# Unit recorded when a whole source finished; every source gets this one.
+SOURCE_UNIT = "*"
+
+log = get_logger(__name__)
+
+
+class UnitDone:
+    """Yielded by a source between jobs: every job of `unit` (a keyword, a result page) has been yielded."""
+
+    __slots__ = ("unit",)
+
+    def __init__(self, unit: str):
+        self.unit = unit
+
+    def __repr__(self) -> str:
+        return f"UnitDone({self.unit!r})"
+
+
+def run_key(units: Dict[str, List[str]]) -> str:
+    """Stable name for a run over these sources, each with its keywords: "source=kw1|kw2;other"."""
+    return ";".join(name + ("=" + "|".join(sorted(kws)) if kws else "") for name, kws in sorted(units.items()))
+
+
+class CheckpointStore:
+    """Finished scrape units per run, in a local SQLite database running in WAL mode.
+
+    A unit is recorded only after its jobs were saved, so a crashed run loses at most the units in flight.
+    """
+
+    def __init__(self, path: str = SCRAPE_CHECKPOINT_PATH):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS scrape_runs (
+                id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                run_key TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS scrape_units (
+                run_id TEXT NOT NULL REFERENCES scrape_runs (id) ON DELETE CASCADE,
+                source TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                jobs INTEGER NOT NULL DEFAULT 0,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (run_id, source, unit)
+            );
+        ''')
+        columns = {row[1] for row in self._conn().execute("PRAGMA table_info(scrape_runs)")}
+        if "run_key" not in columns:
+            self._conn().execute("ALTER TABLE scrape_runs ADD COLUMN run_key TEXT NOT NULL DEFAULT ''")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def start_run(self, resume: bool = False, key: str = "", window_hours: float = SCRAPE_RUN_WINDOW_HOURS) -> str:
+        """Id of the run to record into: when resuming, the latest unfinished run with the same `key` inside
+        the window, else a new one.
+
+        `key` names what a run covers (see `run_key`), so a run of one keyword never resumes another's.
+        """
+        conn = self._conn()
+        now = time.time()
+        if resume:
+            row = conn.execute('''
+                SELECT id FROM scrape_runs
+                WHERE started_at >= ? AND finished_at IS NULL AND run_key = ?
+                ORDER BY started_at DESC LIMIT 1
+            ''', (now - window_hours * 3600, key)).fetchone()
+            if row:
+                log.info("Resuming scrape run %s", row[0])
+                return row[0]
+            log.info("No unfinished scrape run like this one in the last %.0fh, starting a new one", window_hours)
+        run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        conn.execute("INSERT INTO scrape_runs (id, started_at, run_key) VALUES (?, ?, ?)", (run_id, now, key))
+        return run_id
+
+    def completed(self, run_id: str) -> Dict[str, Set[str]]:
+        done: Dict[str, Set[str]] = {}
+        for source, unit in self._conn().execute("SELECT source, unit FROM scrape_units WHERE run_id = ?", (run_id,)):
+            done.setdefault(source, set()).add(unit)
+        return done
+
+    def mark(self, run_id: str, source: str, unit: str, jobs: int = 0):
+        self._conn().execute('''
+            INSERT OR REPLACE INTO scrape_units (run_id, source, unit, jobs, finished_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (run_id, source, unit, jobs, time.time()))
+
+    def finish_run(self, run_id: str):
+        self._conn().execute("UPDATE scrape_runs SET finished_at = ? WHERE id = ?", (time.time(), run_id))
+
+    def purge(self, older_than_days: int = SCRAPE_CHECKPOINT_RETENTION_DAYS) -> int:
+        cutoff = time.time() - older_than_days * 86400
+        return self._conn().execute("DELETE FROM scrape_runs WHERE started_at < ?", (cutoff,)).rowcount
+
+    def summary(self, run_id: str) -> Dict[str, Dict]:
+        rows = self._conn().execute('''
+            SELECT source, COUNT(*), COALESCE(SUM(jobs), 0) FROM scrape_units WHERE run_id = ? GROUP BY source
+        ''', (run_id,)).fetchall()
+        return {source: {"units": units, "jobs": jobs} for source, units, jobs in rows}
@@ -1,30 +1,38 @@
 from datetime import datetime, timedelta
 from jobdb import JobDatabase
+from run_lock import run_lock, LockHeld
+from app_logging import get_logger
+
+log = get_logger("cleanup_job")
 
 
 def main():
-    print("cleaning db ....")
+    log.info("cleaning db ....")
     
+    try:
+        with run_lock("cleanup"):
+            cleanup()
+    except LockHeld as e:
+        log.warning("Skipping: %s", e)
+
+def cleanup():
     db = JobDatabase()
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
     cutoff_date =  datetime.now() - timedelta(days=30)
     
-    cursor.execute('''
-        DELETE FROM jobs 
-        WHERE created_at < %s 
-        OR ai_score < 40
-        RETURNING id
-    ''', (cutoff_date,))
-    
-
-    deleted = cursor.fetchall()
-    conn.commit()
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            DELETE FROM jobs 
+            WHERE created_at < %s 
+            OR ai_score < 40
+            RETURNING id
+        ''', (cutoff_date,))
+        
+        deleted = cursor.fetchall()
+        conn.commit()
     
-    print(f"Deleted {len(deleted)} old low-quality jobs")
+    log.info("Deleted %d old low-quality jobs", len(deleted))
     
-    db.return_connection(conn)
     db.close()
     
 if __name__ == "__main__":
@@ -2,20 +2,35 @@ import traceback
 import gradio as gr
 import threading, time, json, io
 import pandas as pd
-import threading
 from typing import List
 from jobdb import JobDatabase
-from datetime import datetime
-from gr_helper.render_jobs import render_job_cards_clickable
+from datetime import datetime, timedelta, timezone
+from gr_helper.render_jobs import render_job_cards_clickable_async
+from async_jobdb import get_async_database
+from ingest_queue import IngestQueue, IngestWorker, validate_jobs
+from source_health import SourceHealth
+from metrics import registry as metrics_registry
+from memory_watch import MemoryWatchdog, track, top_allocators, scope_diffs, start_tracing, stop_tracing
+import profiling
+from profiling import profiled
+from app_logging import get_logger, recent_logs, DroppingQueueHandler
 import os
-from flask import request, jsonify
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.concurrency import run_in_threadpool
+import signal
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-_logs: List[str] = []
-_lock = threading.Lock()
+log = get_logger("dashboard")
 API_KEY = os.getenv("INGEST_API_KEY", "")
+DASHBOARD_READ_CONCURRENCY = int(os.getenv("DASHBOARD_READ_CONCURRENCY", "50"))
+
+# Trends tab: how far back to look, and how much slower than the week before a day must be to get flagged.
+RUN_TREND_DAYS = int(os.getenv("RUN_TREND_DAYS", "14"))
+RUN_REGRESSION_RATIO = float(os.getenv("RUN_REGRESSION_RATIO", "1.5"))
 
 DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -29,29 +44,25 @@ port = os.environ.get("DB_PORT")
 dbname = os.environ.get("DBNAME")
 
 db_client = None
+ingest_queue = IngestQueue()
 
 def get_db_client():
     global db_client
     if db_client is None:
         try:
             db_client = JobDatabase()
-            conn = db_client.get_connection()
-            if conn:
-                db_client.return_connection(conn)
-                _append_log("Database client initialized successfully")
-            else:
-                raise Exception("Could not get database connection")
+            with db_client.connection():
+                log.info("Database client initialized successfully")
         except Exception as e:
-            print(f"CRITICAL: JobDatabase init failed: {e}")
-            _append_log(f"CRITICAL: Database init failed: {str(e)}")
+            log.critical("Database init failed: %s", e)
             db_client = None
     return db_client
 
-def safe_fetch_stats():
+async def safe_fetch_stats():
     try:
-        return fetch_stats()
+        return await fetch_stats()
     except Exception as e:
-        _append_log(f"Error in fetch_stats: {str(e)}")
+        log.error("Error in fetch_stats: %s", e)
         return "### Database Stats\n\n- **Error loading stats**"
 
 def safe_get_logs():
@@ -60,37 +71,29 @@ def safe_get_logs():
     except Exception as e:
         return f"Error loading logs: {str(e)}"
 
-def safe_render_cards(min_score, limit, sort_by):
+async def safe_render_cards(min_score, limit, sort_by):
     try:
         min_score_int = int(min_score) if min_score is not None else 70
         limit_int = int(limit) if limit is not None else 10
         
-        return render_job_cards_clickable(min_score_int, 100, sort_by, limit_int)
+        return await render_job_cards_clickable_async(min_score_int, 100, sort_by, limit_int)
     except Exception as e:
         error_msg = f"Error rendering cards: {str(e)}"
-        _append_log(error_msg)
+        log.error(error_msg)
         return f"<div style='color: red; padding: 20px;'>{error_msg}</div>"
 
-def _append_log(msg: str):
-    with _lock:
-        _logs.append(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
-
 def get_logs() -> str:
-    with _lock :
-        return "\n".join(_logs[-500:]) or "No logs yet."
+    return "\n".join(recent_logs(500)) or "No logs yet."
     
     
         
-def fetch_stats() -> str:
-    client = get_db_client()
-    all_jobs =client.get_all_jobs(status='new', limit=1000) # type: ignore
-    scored = [j for j in all_jobs if (j.get('ai_score') or 0) > 0]
-    total = len(all_jobs)
-    scored_count = len(scored)
-    avg = round(sum(j.get('ai_score', 0) for j in scored)/ scored_count, 1) if scored_count else 0
-    high = len([j for j in scored if j['ai_score'] >= 70])
-    mid = len([j for j in scored if j['ai_score'] < 70])
-    low = len([j for j in scored if j['ai_score'] < 45])
+async def fetch_stats() -> str:
+    db = get_async_database()
+    st, queue = await asyncio.gather(db.get_score_stats(status='new'), db.get_scoring_queue_depth())
+    total = st['total']
+    scored_count = st['scored']
+    avg = st['avg']
+    high, mid, low = st['high'], st['medium'], st['low']
     
     md = (
         f"### Database Stats\n\n"
@@ -98,11 +101,102 @@ def fetch_stats() -> str:
         f"- Scored: **{scored_count}**\n"
         f"- Avg score: **{avg}**\n"
         f"- High(70+): **{high}**, Medium(40-69): **{mid}**, Low(<40): **{low}**\n"
+        f"- Scoring queue: **{queue.get('pending', 0)}** pending, **{queue.get('in_progress', 0)}** in progress, "
+        f"**{queue.get('dead', 0)}** dead (`run_scorer.py --requeue-dead` retries them)\n"
     )
-    _append_log(f"Stats refreshed: {total} jobs, {scored_count} scored")
+    log.info("Stats refreshed: %s jobs, %s scored", total, scored_count)
     
     return md
 
+def source_health_rows():
+    client = get_db_client()
+    if client is None:
+        return {}
+    return SourceHealth(client).summary()
+
+
+def source_health_md() -> str:
+    try:
+        rows = source_health_rows()
+    except Exception as e:
+        log.error("Error loading source health: %s", e)
+        return "### Sources\n\n- **Error loading source health**"
+    if not rows:
+        return "### Sources\n\n- No scrape runs recorded yet"
+    md = "### Sources\n\n| Source | Circuit | Success | Cards/page | Latency | Last jobs | Last error |\n|---|---|---|---|---|---|---|\n"
+    for name, r in rows.items():
+        state = r["state"]
+        if r.get("reopens_at"):
+            state += f" until {r['reopens_at']:%m-%d %H:%M}"
+        cards = f"{r['cards_per_page']:.1f}" if r.get("cards_per_page") is not None else "-"
+        latency = f"{r['avg_latency']:.0f}s" if r.get("avg_latency") is not None else "-"
+        error = (r.get("last_error") or "").replace("|", "/")[:80] if r.get("consecutive_failures") else ""
+        md += f"| {name} | {state} | {r['success_rate']:.0%} | {cards} | {latency} | {r['last_jobs']} | {error} |\n"
+    return md
+
+
+async def safe_source_health() -> str:
+    return await asyncio.to_thread(source_health_md)
+
+
+async def fetch_runs(days: int = RUN_TREND_DAYS, kind: str = "All") -> pd.DataFrame:
+    since = datetime.now(timezone.utc) - timedelta(days=int(days or RUN_TREND_DAYS))
+    rows = await get_async_database().get_runs(since, kind=None if kind == "All" else kind)
+    return pd.DataFrame(rows)
+
+
+def run_trends(runs: pd.DataFrame) -> pd.DataFrame:
+    """One row per day and kind of run: medians of the duration and each stage, totals of the counts.
+
+    `vs prior 7d` compares the day's median duration with the median over the seven days before it and
+    is flagged once it reaches RUN_REGRESSION_RATIO.
+    """
+    if runs.empty:
+        return pd.DataFrame()
+    runs = runs.copy()
+    runs["day"] = pd.to_datetime(runs["started_at"], utc=True).dt.tz_convert(None).dt.normalize()
+    stages = pd.DataFrame(list(runs["stages"]), index=runs.index).add_suffix("_s")
+    runs = runs.join(stages)
+    runs["tokens"] = runs["input_tokens"] + runs["output_tokens"]
+    runs["failed"] = (runs["status"] != "ok").astype(int)
+    runs["error_count"] = runs["errors"].map(len)
+
+    daily = runs.groupby(["day", "kind"]).agg(
+        runs=("id", "count"), failed=("failed", "sum"), median_s=("duration", "median"), max_s=("duration", "max"),
+        **{col: (col, "median") for col in stages.columns},
+        scraped=("scraped", "sum"), inserted=("inserted", "sum"), duplicates=("duplicates", "sum"),
+        scored=("scored", "sum"), llm_failures=("llm_failures", "sum"), tokens=("tokens", "sum"),
+        errors=("error_count", "sum"),
+    ).reset_index()
+
+    def vs_prior(row):
+        prior = runs[(runs["kind"] == row["kind"]) & (runs["day"] < row["day"])
+                     & (runs["day"] >= row["day"] - pd.Timedelta(days=7))]["duration"]
+        if prior.empty or not prior.median():
+            return ""
+        ratio = row["median_s"] / prior.median()
+        return f"{ratio - 1:+.0%}" + (" ⚠" if ratio >= RUN_REGRESSION_RATIO else "")
+
+    daily["vs prior 7d"] = daily.apply(vs_prior, axis=1)
+    daily["day"] = daily["day"].dt.strftime("%Y-%m-%d")
+    return daily.sort_values(["day", "kind"], ascending=[False, True]).round(1)
+
+
+@track("callback:safe_run_trends")
+@profiled("callback:safe_run_trends")
+async def safe_run_trends(days, kind):
+    try:
+        runs = await fetch_runs(days, kind)
+    except Exception as e:
+        log.error("Error loading run history: %s", e)
+        return pd.DataFrame({"error": [f"Error loading run history: {e}"]}), pd.DataFrame()
+    if runs.empty:
+        return pd.DataFrame({"info": ["No runs recorded in this range"]}), pd.DataFrame()
+    durations = runs[["started_at", "kind", "duration"]].copy()
+    durations["started_at"] = pd.to_datetime(durations["started_at"], utc=True).dt.tz_convert(None)
+    return run_trends(runs), durations
+
+
 def parse_date_posted(s: str):
     if not s or not isinstance(s, str):
         return None
@@ -121,7 +215,6 @@ def parse_date_posted(s: str):
                 
 def top_jobs_table(min_score: int = 70, limit: int = 10, sort_by: str = "score_desc", source_filter: str = "All"):
     client = get_db_client()
-    conn = client.get_connection() # type: ignore
     query = """
             SELECT id, title, company, location, ai_score, ai_analysis, url, date_posted, source 
             FROM jobs 
@@ -133,8 +226,8 @@ def top_jobs_table(min_score: int = 70, limit: int = 10, sort_by: str = "score_d
         query += " AND source = %s"
         params.append(source_filter) # type: ignore
         
-    df = pd.read_sql_query(query, conn, params=params) # type: ignore
-    client.return_connection(conn) # pyright: ignore[reportOptionalMemberAccess]
+    with client.connection() as conn: # type: ignore
+        df = pd.read_sql_query(query, conn, params=params) # type: ignore
     
     if df.empty:
         return pd.DataFrame([{"message":"No jobs match the criteria"}])
@@ -161,14 +254,13 @@ def top_jobs_table(min_score: int = 70, limit: int = 10, sort_by: str = "score_d
     out = out[['id','title','company','location','ai_score','ai_analysis','url','date_posted']]
     
     
-    _append_log(f"Displayed {len(out)} jobs (min_score={min_score}, sort={sort_by})")
+    log.info("Displayed %d jobs (min_score=%s, sort=%s)", len(out), min_score, sort_by)
     return out
 
 def export_csv():
     client = get_db_client()
-    conn = client.get_connection() # type: ignore
-    df = pd.read_sql_query("SELECT * FROM jobs", conn) # type: ignore
-    conn.close()
+    with client.connection() as conn: # type: ignore
+        df = pd.read_sql_query("SELECT * FROM jobs", conn) # type: ignore
     buffer = io.StringIO()
     df.to_csv(buffer, index=False)
     buffer.seek(0)
@@ -176,19 +268,13 @@ def export_csv():
 
     
     
-def show_job_detail(job_id:int):
-    client = get_db_client()
-    conn = client.get_connection() # type: ignore
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM jobs WHERE id = %s", (job_id,))
-    row = cursor.fetchone()
-        
-    client.return_connection(conn) # type: ignore
-    if not row:
+@track("callback:show_job_detail")
+@profiled("callback:show_job_detail")
+async def show_job_detail(job_id:int):
+    d = await get_async_database().get_job(int(job_id or 0))
+    if not d:
         return f"Job {job_id} not found"
 
-    d= dict(row)
     raw_posted = d.get("date_posted")
     try:
         parsed = parse_date_posted(raw_posted)   # type: ignore
@@ -216,102 +302,313 @@ def show_job_detail(job_id:int):
 
 with gr.Blocks(title="Job Info Dashboard") as demo:
     gr.Markdown("# Job Matcher — Dashboard")
-    with gr.Row():
-        with gr.Column(scale=2):
-            stats_md = gr.Markdown(fetch_stats)
+    with gr.Tabs():
+        with gr.Tab("Jobs"):
             with gr.Row():
-                batch_slider = gr.Slider(minimum=1, maximum=20, value=6, step=1, label="Batch size")
-                max_batches= gr.Number(value=20, precision=0, label="Max Batches")
+                with gr.Column(scale=2):
+                    stats_md = gr.Markdown("### Database Stats\n\n- Loading...")
+                    sources_md = gr.Markdown("### Sources\n\n- Loading...")
+                    with gr.Row():
+                        batch_slider = gr.Slider(minimum=1, maximum=20, value=6, step=1, label="Batch size")
+                        max_batches= gr.Number(value=20, precision=0, label="Max Batches")
+                    with gr.Row():
+                        run_btn = gr.Button("Run Now (background)")
+                        refresh_btn = gr.Button("Refresh stats")
+                        export_btn = gr.Button("Export CSV") 
+                    logs_area = gr.Textbox(label="Logs (latest)", value=safe_get_logs(), lines=12)
+                with gr.Column(scale=3):
+                    gr.Markdown("### Top Matches")
+                    top_min = gr.Slider(minimum=0, maximum=100, value=70, step=5, label="Min score")
+                    top_limit = gr.Number(value=10, precision=0, label="Limit")
+                    sort_dropdown = gr.Dropdown(choices=[
+                        ("Score (high → low)", "score_desc"),
+                        ("Score (low → high)", "score_asc"),
+                        ("Newest", "newest"),
+                        ("Oldest", "oldest")
+                    ], value="score_desc", label="Sort by")
+                    top_cards = gr.HTML("")
+                    with gr.Row():
+                        detail_id = gr.Number(value=0, precision=0, label="Job ID (show details)")
+                        show_btn = gr.Button("Show Job")
+                        detail_out = gr.Textbox(label="Job Detail", lines= 10)
+        with gr.Tab("Run trends"):
             with gr.Row():
-                run_btn = gr.Button("Run Now (background)")
-                refresh_btn = gr.Button("Refresh stats")
-                export_btn = gr.Button("Export CSV") 
-            logs_area = gr.Textbox(label="Logs (latest)", value=safe_get_logs(), lines=12)
-        with gr.Column(scale=3):
-            gr.Markdown("### Top Matches")
-            top_min = gr.Slider(minimum=0, maximum=100, value=70, step=5, label="Min score")
-            top_limit = gr.Number(value=10, precision=0, label="Limit")
-            sort_dropdown = gr.Dropdown(choices=[
-                ("Score (high → low)", "score_desc"),
-                ("Score (low → high)", "score_asc"),
-                ("Newest", "newest"),
-                ("Oldest", "oldest")
-            ], value="score_desc", label="Sort by")
-            top_cards = gr.HTML("")
-            with gr.Row():
-                detail_id = gr.Number(value=0, precision=0, label="Job ID (show details)")
-                show_btn = gr.Button("Show Job")
-                detail_out = gr.Textbox(label="Job Detail", lines= 10)
-                
-    
-    def refresh_cards(min_score, limit, sort_by) -> str:
-        return safe_render_cards( min_score,  limit,sort_by)
-    def refresh_all():
-        stats = safe_fetch_stats()
-        logs = safe_get_logs()
-        cards = safe_render_cards(
-            top_min.value, top_limit.value,sort_dropdown.value 
+                trend_days = gr.Number(value=RUN_TREND_DAYS, precision=0, label="Days")
+                trend_kind = gr.Dropdown(choices=["All", "scheduled", "keyword", "scrape", "score"], value="All", label="Run kind")
+                trend_btn = gr.Button("Refresh trends")
+            trend_plot = gr.LinePlot(x="started_at", y="duration", color="kind", title="Run duration (s)")
+            trend_table = gr.Dataframe(label="Per day", interactive=False)
+
+    @track("callback:refresh_cards")
+    @profiled("callback:refresh_cards")
+    async def refresh_cards(min_score, limit, sort_by) -> str:
+        return await safe_render_cards( min_score,  limit,sort_by)
+    @track("callback:refresh_all")
+    @profiled("callback:refresh_all")
+    async def refresh_all(min_score, limit, sort_by):
+        stats, cards, sources = await asyncio.gather(
+            safe_fetch_stats(),
+            safe_render_cards(min_score, limit, sort_by),
+            safe_source_health(),
         )
-        return stats, logs, cards
+        return stats, safe_get_logs(), cards, sources
     
-    demo.load(fn=refresh_all, inputs=None, outputs=[stats_md, logs_area, top_cards])
-    refresh_btn.click(fn=refresh_all, inputs=None, outputs=[stats_md, logs_area, top_cards])
+    # Read-only async callbacks are bounded by the asyncpg pool, not by Gradio worker slots.
+    card_inputs = [top_min, top_limit, sort_dropdown]
+    refresh_outputs = [stats_md, logs_area, top_cards, sources_md]
+    demo.load(fn=refresh_all, inputs=card_inputs, outputs=refresh_outputs, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
+    refresh_btn.click(fn=refresh_all, inputs=card_inputs, outputs=refresh_outputs, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
     export_btn.click(fn=export_csv, inputs=None, outputs=None)
     
     
-    top_min.change(fn=refresh_cards, inputs=[top_min, top_limit, sort_dropdown], outputs=top_cards)
-    top_limit.change(fn=refresh_cards, inputs=[top_min, top_limit, sort_dropdown], outputs=top_cards)
-    sort_dropdown.change(fn=refresh_cards, inputs=[top_min, top_limit, sort_dropdown], outputs=top_cards)
+    top_min.change(fn=refresh_cards, inputs=card_inputs, outputs=top_cards, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
+    top_limit.change(fn=refresh_cards, inputs=card_inputs, outputs=top_cards, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
+    sort_dropdown.change(fn=refresh_cards, inputs=card_inputs, outputs=top_cards, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
     
-    show_btn.click(fn=show_job_detail, inputs=detail_id, outputs=detail_out)
+    show_btn.click(fn=show_job_detail, inputs=detail_id, outputs=detail_out, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
+
+    trend_inputs = [trend_days, trend_kind]
+    trend_outputs = [trend_table, trend_plot]
+    demo.load(fn=safe_run_trends, inputs=trend_inputs, outputs=trend_outputs, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
+    trend_btn.click(fn=safe_run_trends, inputs=trend_inputs, outputs=trend_outputs, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
+    trend_kind.change(fn=safe_run_trends, inputs=trend_inputs, outputs=trend_outputs, concurrency_limit=DASHBOARD_READ_CONCURRENCY)
 
 
 
+ingest_worker = IngestWorker(ingest_queue, get_db_client)
+
 demo.queue(default_concurrency_limit=2, max_size=50)
-app = demo.app
 
 
-@app.route("/ingest/jobs", methods=["POST"])
-def ingest_jobs():
-    key= request.headers.get("X-API-KEY", "")
+# Plain FastAPI routes for machines (ingest, probes, scrapers). They never go through Gradio's
+# queue, so a slow dashboard callback cannot starve a health check and vice versa.
+API_DB_THREADS = int(os.getenv("API_DB_THREADS", "4"))
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "15"))
+
+_api_pool = ThreadPoolExecutor(max_workers=API_DB_THREADS, thread_name_prefix="api-db")
+_health_cache = {"at": 0.0, "ok": False, "detail": {}}
+_health_lock = asyncio.Lock()
+
+
+async def _run_blocking(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_api_pool, functools.partial(fn, *args, **kwargs))
+
+
+def _check_db():
+    client = get_db_client()
+    if client is None:
+        return False, {"db_error": "database client unavailable"}
+    return client.check()
+
+
+async def cached_health():
+    if time.monotonic() - _health_cache["at"] < HEALTH_CACHE_SECONDS:
+        return _health_cache["ok"], _health_cache["detail"]
+    async with _health_lock:
+        if time.monotonic() - _health_cache["at"] >= HEALTH_CACHE_SECONDS:
+            ok, detail = await _run_blocking(_check_db)
+            _health_cache.update(at=time.monotonic(), ok=ok, detail=detail)
+    return _health_cache["ok"], _health_cache["detail"]
+
+
+def _recycle():
+    # uvicorn shuts down gracefully on SIGTERM; the container's restart policy brings the dashboard back.
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+watchdog = MemoryWatchdog(on_recycle=_recycle)
+
+
+@asynccontextmanager
+async def _lifespan(_app):
+    ingest_worker.start()
+    watchdog.start()
+    yield
+    watchdog.stop()
+    ingest_worker.stop()
+    _api_pool.shutdown(wait=False)
+    await get_async_database().close()
+
+
+api = FastAPI(title="Job Info Dashboard API", lifespan=_lifespan)
+
+
+@api.post("/ingest/jobs")
+async def ingest_jobs(request: Request):
+    key = request.headers.get("X-API-KEY", "")
     if API_KEY and key != API_KEY:
-        return jsonify({"ok": False, "error": "unauthorized"}), 401
-    payload = request.get_json(force=True)
-    if not payload:
-        return jsonify({"ok": False, "error": "no json"}), 400
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not payload or not isinstance(payload, dict):
+        return JSONResponse({"ok": False, "error": "no json"}, status_code=400)
 
-    
-    jobs = payload.get("jobs") or []
-    if not isinstance(jobs, list):
-        return jsonify({"ok": False, "error": "jobs must be list"}), 400
-    
-    from datetime import datetime
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    out_path = os.path.join(DATA_DIR, f"ingest_{ts}.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(jobs, f, ensure_ascii=False, indent=2)
-    
-    return jsonify({"ok": True, "received": len(jobs)}), 200
+    jobs, errors = validate_jobs(payload.get("jobs") or [])
+    if not jobs:
+        return JSONResponse({"ok": False, "error": "no valid jobs", "details": errors[:20]}, status_code=400)
+
+    batch_id, duplicate = await _run_blocking(ingest_queue.enqueue, jobs, key=request.headers.get("Idempotency-Key") or None)
+    ingest_worker.notify()
+
+    return JSONResponse({
+        "ok": True, "batch_id": batch_id, "duplicate": duplicate,
+        "accepted": len(jobs), "rejected": len(errors), "errors": errors[:20]
+    }, status_code=202)
+
+
+@api.get("/health")
+async def health():
+    ok, detail = await cached_health()
+    return JSONResponse({"ok": ok, **detail}, status_code=200 if ok else 503)
+
+
+@api.get("/sources")
+async def sources_health():
+    try:
+        rows = await _run_blocking(source_health_rows)
+    except Exception as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=503)
+    return JSONResponse(json.loads(json.dumps({"ok": True, "sources": rows}, default=str)))
+
+
+@api.get("/runs")
+async def runs_history(days: int = RUN_TREND_DAYS, kind: str = "All"):
+    try:
+        runs = await fetch_runs(days, kind)
+    except Exception as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=503)
+    # to_json writes missing stages as null; JSONResponse rejects NaN.
+    return JSONResponse({
+        "ok": True,
+        "runs": json.loads(runs.to_json(orient="records", date_format="iso")),
+        "daily": json.loads(run_trends(runs).to_json(orient="records")),
+    })
+
+
+@api.get("/debug/memory")
+async def debug_memory(request: Request, limit: int = 20):
+    if API_KEY and request.headers.get("X-API-KEY", "") != API_KEY:
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    top = await _run_blocking(top_allocators, limit)
+    return JSONResponse({"ok": True, **watchdog.status(), "top": top, "scopes": scope_diffs()})
+
+
+@api.post("/debug/memory/tracemalloc")
+async def toggle_tracemalloc(request: Request, enabled: bool = True):
+    if API_KEY and request.headers.get("X-API-KEY", "") != API_KEY:
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    if enabled:
+        start_tracing()
+    else:
+        stop_tracing()
+    return JSONResponse({"ok": True, "tracemalloc": enabled})
+
+
+@api.get("/debug/profiles")
+async def debug_profiles(request: Request, limit: int = 50):
+    if API_KEY and request.headers.get("X-API-KEY", "") != API_KEY:
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    files = await _run_blocking(profiling.recent_profiles, limit)
+    return JSONResponse({"ok": True, "enabled": profiling.enabled(), "dir": profiling.PROFILE_DIR, "files": files})
+
+
+@api.post("/debug/profiling")
+async def toggle_profiling(request: Request, enabled: bool = True):
+    if API_KEY and request.headers.get("X-API-KEY", "") != API_KEY:
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    if enabled:
+        profiling.enable()
+    else:
+        profiling.disable()
+    return JSONResponse({"ok": True, "profiling": enabled})
+
+
+@api.post("/scoring/requeue-dead")
+async def requeue_dead(request: Request):
+    if API_KEY and request.headers.get("X-API-KEY", "") != API_KEY:
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    client = get_db_client()
+    if client is None:
+        return JSONResponse({"ok": False, "error": "database unavailable"}, status_code=503)
+    requeued = await _run_blocking(client.requeue_dead_jobs)
+    return JSONResponse({"ok": True, "requeued": requeued})
+
+
+@api.get("/metrics")
+async def metrics():
+    ok, _ = await cached_health()
+    depth = await _run_blocking(ingest_queue.depth)
+    lines = [
+        "# HELP job_agent_db_up Result of the last cached database health check.",
+        "# TYPE job_agent_db_up gauge",
+        f"job_agent_db_up {int(ok)}",
+        "# HELP job_agent_ingest_batches Ingest queue batches by state.",
+        "# TYPE job_agent_ingest_batches gauge",
+    ]
+    for state in ("pending", "in_progress", "done", "dead"):
+        lines.append(f'job_agent_ingest_batches{{state="{state}"}} {depth.get(state, 0)}')
+    if db_client is not None:
+        try:
+            scoring = await _run_blocking(db_client.scoring_queue_depth)
+        except Exception as e:
+            log.warning("Could not read the scoring queue depth: %s", e)
+            scoring = None
+        if scoring is not None:
+            lines += [
+                "# HELP job_agent_scoring_queue_jobs Open jobs in the scoring queue by state.",
+                "# TYPE job_agent_scoring_queue_jobs gauge",
+            ]
+            lines += [f'job_agent_scoring_queue_jobs{{state="{state}"}} {scoring.get(state, 0)}'
+                      for state in ("pending", "in_progress", "done", "dead")]
+        pool = db_client.pool_stats()
+        lines += [
+            "# HELP job_agent_db_pool Connection pool gauges (size, in_use, idle, max, saturation).",
+            "# TYPE job_agent_db_pool gauge",
+        ]
+        lines += [f'job_agent_db_pool{{stat="{k}"}} {pool[k]}' for k in ("size", "in_use", "idle", "max", "saturation")]
+        lines += [
+            "# HELP job_agent_db_pool_events_total Connection pool counters.",
+            "# TYPE job_agent_db_pool_events_total counter",
+        ]
+        lines += [f'job_agent_db_pool_events_total{{event="{k}"}} {pool[k]}'
+                  for k in ("checkouts", "waits", "timeouts", "created", "discarded", "preping_failures")]
+        lines += [
+            "# HELP job_agent_db_pool_wait_seconds_total Time spent waiting for a pooled connection.",
+            "# TYPE job_agent_db_pool_wait_seconds_total counter",
+            f"job_agent_db_pool_wait_seconds_total {pool['wait_seconds_total']:.6f}",
+        ]
+    # Pipeline stage, scraper and LLM metrics of runs started from this process (scheduler, Run Now).
+    lines += [
+        "# HELP job_agent_log_records_dropped_total Log records dropped because the log queue was full.",
+        "# TYPE job_agent_log_records_dropped_total counter",
+        f"job_agent_log_records_dropped_total {DroppingQueueHandler.dropped}",
+    ]
+    body = "\n".join(lines) + "\n" + metrics_registry.render_prometheus()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+app = gr.mount_gradio_app(
+    api, demo, path="/",
+    auth=(GRADIO_USER, GRADIO_PASS) if GRADIO_USER and GRADIO_PASS else None,
+    show_error=True,
+)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5001))
-    print(f"Starting application on port {port}")
-    print(f"Environment: HOST={os.getenv('HOST')}, DBNAME={os.getenv('DBNAME')}")
+    log.info("Starting application on port %s", port)
+    log.info("Environment: HOST=%s, DBNAME=%s", os.getenv('HOST'), os.getenv('DBNAME'))
 
     try:
         client = get_db_client()
         if client:
-            print("✅ Database client created successfully")
+            log.info("Database client created successfully")
         else:
-            print("Database client is None")
+            log.warning("Database client is None")
     except Exception as e:
-        print(f"Database initialization warning: {e}")
+        log.warning("Database initialization warning: %s", e)
     
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=port,
-        auth=(GRADIO_USER, GRADIO_PASS) if GRADIO_USER and GRADIO_PASS else None,
-        share=False,
-        show_error=True,
-        debug=False 
-    )
\ No newline at end of file
+    # log_config=None keeps uvicorn on the shared queue handler instead of its own stream handlers.
+    uvicorn.run(app, host="0.0.0.0", port=port, log_config=None)
@@ -0,0 +1,208 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_PREPING_IDLE = float(os.getenv("DB_POOL_PREPING_IDLE", "30"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool.
+
+    Checkout blocks up to `timeout` seconds when every connection is busy instead of failing at once.
+    Connections idle for more than `preping_idle` seconds are checked with `SELECT 1` before being handed
+    out, connections older than `max_lifetime` are recycled, and broken connections are dropped on return.
+    """
+
+    def __init__(self, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX, timeout: float = DB_POOL_TIMEOUT,
+                 max_lifetime: float = DB_POOL_MAX_LIFETIME, preping_idle: float = DB_POOL_PREPING_IDLE,
+                 **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = max(maxconn, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.preping_idle = preping_idle
+        self.connect_kwargs = connect_kwargs
+        self.connect_kwargs.setdefault("connect_timeout", DB_CONNECT_TIMEOUT)
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()
+        self._born: Dict[int, float] = {}
+        self._in_use = 0
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0, "waits": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+            "timeouts": 0, "created": 0, "discarded": 0, "preping_failures": 0,
+        }
+
+        for _ in range(min(minconn, self.maxconn)):
+            conn = self._connect()
+            with self._cond:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        # Connecting is slow, so only the bookkeeping holds the lock.
+        conn = psycopg2.connect(**self.connect_kwargs)
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._stats["created"] += 1
+        return conn
+
+    def _expired(self, conn) -> bool:
+        born = self._born.get(id(conn))
+        return bool(self.max_lifetime) and born is not None and time.monotonic() - born > self.max_lifetime
+
+    def _close(self, conn):
+        # Called with self._cond held.
+        self._born.pop(id(conn), None)
+        self._stats["discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _alive(self, conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["preping_failures"] += 1
+            return False
+
+    def getconn(self, timeout: Optional[float] = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            conn = None
+            idle_since = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        if self._expired(conn) or conn.closed:
+                            self._size -= 1
+                            self._close(conn)
+                            conn = None
+                            continue
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"no database connection available after {timeout:.1f}s "
+                                          f"({self._in_use}/{self.maxconn} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+                self._in_use += 1
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            elif idle_since is not None and time.monotonic() - idle_since >= self.preping_idle and not self._alive(conn):
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._close(conn)
+                    self._cond.notify()
+                continue
+
+            wait = time.monotonic() - started
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        if conn is None:
+            return
+        if not discard and not conn.closed:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed or self._expired(conn):
+                self._size -= 1
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            out = dict(self._stats)
+            out.update(
+                size=self._size,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                max=self.maxconn,
+                saturation=round(self._in_use / self.maxconn, 3),
+            )
+        return out
@@ -2,6 +2,10 @@ import sqlite3
 import json
 from typing import List
 from jobdb import JobDatabase
+from async_jobdb import get_async_database
+from app_logging import get_logger
+
+log = get_logger(__name__)
 
 db = None
 
@@ -11,7 +15,7 @@ def get_db():
         try:
             db = JobDatabase()
         except Exception as e:
-            print("WARNING: could not create DB in render_jobs:", e)
+            log.warning("could not create DB in render_jobs: %s", e)
             db = None
     return db
 
@@ -20,8 +24,6 @@ def _fetch_jobs( min_score: int, max_score: int, limit: int, sort_by: str = "sco
     if not client:
         return []
     
-    conn = client.get_connection()
-    cur = conn.cursor()
     query = """
         SELECT id, title, company, location, ai_score, ai_analysis, url, date_posted, source
         FROM jobs
@@ -42,35 +44,44 @@ def _fetch_jobs( min_score: int, max_score: int, limit: int, sort_by: str = "sco
     query += f" {order_clause} LIMIT %s"
     params.append(int(limit))
     
-    cur.execute(query, params)
-    columns = [desc[0] for desc in cur.description] # type: ignore
-    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    with client.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, params)
+        columns = [desc[0] for desc in cur.description] # type: ignore
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
     
-    client.return_connection(conn)
     return rows
 
 def get_job_by_id( job_id: int):
     client = get_db()
     if not client:
         return {}
-    conn = client.get_connection()
-    cur = conn.cursor()
-    
-    cur.execute("SELECT * FROM jobs WHERE id = %s", (int(job_id),))
-    row = cur.fetchone()
-    
-    if not row:
-        client.return_connection(conn)
-        return {}
- 
-    columns = [desc[0] for desc in cur.description] # type: ignore
-    job_dict = dict(zip(columns, row))
+    with client.connection() as conn:
+        cur = conn.cursor()
+        
+        cur.execute("SELECT * FROM jobs WHERE id = %s", (int(job_id),))
+        row = cur.fetchone()
+        
+        if not row:
+            return {}
+     
+        columns = [desc[0] for desc in cur.description] # type: ignore
+        job_dict = dict(zip(columns, row))
     
-    client.return_connection(conn)
     return job_dict
 
+async def _fetch_jobs_async(min_score: int, max_score: int, limit: int, sort_by: str = "score_desc"):
+    return await get_async_database().list_jobs(min_score, max_score, limit, sort_by)
+
+async def render_job_cards_clickable_async(min_score: int, max_score: int, sort_by: str, limit: int = 8) -> str:
+    rows = await _fetch_jobs_async(min_score, max_score, limit, sort_by)
+    return _clickable_cards_html(rows)
+
 def render_job_cards_clickable( min_score: int, max_score: int, sort_by: str,limit: int = 8) -> str:
     rows = _fetch_jobs(min_score, max_score, limit, sort_by)
+    return _clickable_cards_html(rows)
+
+def _clickable_cards_html(rows) -> str:
     if not rows:
         return "<div>No jobs found for this range.</div>"
     
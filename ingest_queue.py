@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app_logging import get_logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+INGEST_QUEUE_PATH = os.getenv("INGEST_QUEUE_PATH", os.path.join(DATA_DIR, "ingest_queue.sqlite"))
+INGEST_MAX_BATCH = int(os.getenv("INGEST_MAX_BATCH", "5000"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_LEASE_SECONDS = int(os.getenv("INGEST_LEASE_SECONDS", "300"))
+INGEST_DONE_RETENTION_DAYS = int(os.getenv("INGEST_DONE_RETENTION_DAYS", "7"))
+
+REQUIRED_FIELDS = ("title", "url")
+
+log = get_logger(__name__)
+
+
+def validate_jobs(jobs) -> Tuple[List[Dict], List[str]]:
+    """Split an ingest payload into jobs ready for `save_jobs_bulk` and human readable errors."""
+    if not isinstance(jobs, list):
+        return [], ["jobs must be list"]
+    if len(jobs) > INGEST_MAX_BATCH:
+        return [], [f"batch too large ({len(jobs)} > {INGEST_MAX_BATCH})"]
+
+    valid = []
+    errors = []
+    now = datetime.now().isoformat()
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            errors.append(f"jobs[{i}]: not an object")
+            continue
+        missing = [f for f in REQUIRED_FIELDS if not str(job.get(f) or "").strip()]
+        if missing:
+            errors.append(f"jobs[{i}]: missing {', '.join(missing)}")
+            continue
+        job = dict(job)
+        job.setdefault("company", "Unknown")
+        job.setdefault("source", "ingest")
+        job.setdefault("scraped_at", now)
+        if not isinstance(job.get("tags", []), list):
+            job["tags"] = []
+        valid.append(job)
+    return valid, errors
+
+
+def payload_key(jobs: List[Dict]) -> str:
+    body = json.dumps(jobs, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IngestQueue:
+    """Durable batch queue in a local SQLite database running in WAL mode.
+
+    Batches are keyed by an idempotency key, so a retried POST is accepted once. A claimed batch holds a
+    lease; if the worker dies before acking, the lease expires and the batch is delivered again, up to
+    `max_attempts` deliveries in all before it is moved to the dead state.
+    """
+
+    def __init__(self, path: str = INGEST_QUEUE_PATH, max_attempts: int = INGEST_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._local = threading.local()
+        self._setup()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _setup(self):
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS ingest_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                payload BLOB NOT NULL,
+                job_count INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leased_until REAL,
+                last_error TEXT,
+                result TEXT,
+                received_at REAL NOT NULL,
+                done_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS ingest_batches_state_idx ON ingest_batches (state, id);
+        ''')
+
+    def enqueue(self, jobs: List[Dict], key: Optional[str] = None) -> Tuple[int, bool]:
+        """Append a batch. Returns (batch_id, duplicate)."""
+        key = key or payload_key(jobs)
+        payload = zlib.compress(json.dumps(jobs, ensure_ascii=False, default=str).encode("utf-8"))
+        conn = self._conn()
+        cur = conn.execute('''
+            INSERT OR IGNORE INTO ingest_batches (idempotency_key, payload, job_count, received_at)
+            VALUES (?, ?, ?, ?)
+        ''', (key, payload, len(jobs), time.time()))
+        if cur.rowcount:
+            return cur.lastrowid, False # type: ignore
+        row = conn.execute("SELECT id FROM ingest_batches WHERE idempotency_key = ?", (key,)).fetchone()
+        return row[0], True
+
+    def claim(self, lease_seconds: int = INGEST_LEASE_SECONDS) -> Optional[Tuple[int, List[Dict]]]:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A batch whose lease ran out on its last attempt killed or hung every worker it went to.
+            conn.execute('''
+                UPDATE ingest_batches
+                SET state = 'dead', leased_until = NULL, last_error = COALESCE(last_error, 'lease expired')
+                WHERE state = 'in_progress' AND leased_until < ? AND attempts >= ?
+            ''', (now, self.max_attempts))
+            row = conn.execute('''
+                SELECT id, payload FROM ingest_batches
+                WHERE state = 'pending' OR (state = 'in_progress' AND leased_until < ? AND attempts < ?)
+                ORDER BY id
+                LIMIT 1
+            ''', (now, self.max_attempts)).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            conn.execute('''
+                UPDATE ingest_batches
+                SET state = 'in_progress', attempts = attempts + 1, leased_until = ?
+                WHERE id = ?
+            ''', (now + lease_seconds, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row[0], json.loads(zlib.decompress(row[1]).decode("utf-8"))
+
+    def ack(self, batch_id: int, result: Optional[Dict] = None):
+        self._conn().execute('''
+            UPDATE ingest_batches SET state = 'done', leased_until = NULL, done_at = ?, result = ?
+            WHERE id = ?
+        ''', (time.time(), json.dumps(result or {}), batch_id))
+
+    def nack(self, batch_id: int, error: str):
+        self._conn().execute('''
+            UPDATE ingest_batches
+            SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END,
+                leased_until = NULL, last_error = ?
+            WHERE id = ?
+        ''', (self.max_attempts, error[:2000], batch_id))
+
+    def depth(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT state, COUNT(*) FROM ingest_batches GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def purge_done(self, older_than_days: int = INGEST_DONE_RETENTION_DAYS) -> int:
+        cutoff = time.time() - older_than_days * 86400
+        cur = self._conn().execute("DELETE FROM ingest_batches WHERE state = 'done' AND done_at < ?", (cutoff,))
+        return cur.rowcount
+
+
+class IngestWorker:
+    """Background thread that drains the queue into Postgres via `JobDatabase.save_jobs_bulk`."""
+
+    def __init__(self, queue: IngestQueue, db_factory: Callable, poll_interval: float = 2.0):
+        self.queue = queue
+        self.db_factory = db_factory
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def notify(self):
+        self._wake.set()
+
+    def drain_once(self) -> bool:
+        db = self.db_factory()
+        if db is None:
+            return False
+        claimed = self.queue.claim()
+        if not claimed:
+            return False
+        batch_id, jobs = claimed
+        try:
+            new_jobs, duplicates = db.save_jobs_bulk(jobs)
+        except Exception as e:
+            log.warning("Ingest batch %s failed: %s", batch_id, e)
+            self.queue.nack(batch_id, str(e))
+            return False
+        self.queue.ack(batch_id, {"inserted": new_jobs, "duplicates": duplicates})
+        log.info("Ingest batch %s: inserted %d, duplicates %d", batch_id, new_jobs, duplicates)
+        return True
+
+    def _run(self):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if self.drain_once():
+                    continue
+                if time.time() - last_purge > 3600:
+                    self.queue.purge_done()
+                    last_purge = time.time()
+            except Exception as e:
+                log.exception("Ingest worker error: %s", e)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
@@ -0,0 +1,207 @@
+import os
+import time
+import queue
+import signal
+import logging
+import functools
+import traceback
+import multiprocessing
+import concurrent.futures
+from typing import Callable, Dict, Optional
+
+from apscheduler.executors.pool import BasePoolExecutor
+
+from metrics import registry
+from app_logging import get_logger, forward_logging
+
+# Scheduled jobs run in a fresh process each; 0 runs them on the scheduler's own threads as before.
+ISOLATE_JOBS = os.getenv("ISOLATE_JOBS", "1") == "1"
+JOB_TIMEOUT_MINUTES = float(os.getenv("JOB_TIMEOUT_MINUTES", "120"))
+# Resident memory of the job and everything it started (chromedriver, Chrome), summed.
+JOB_MAX_RSS_MB = float(os.getenv("JOB_MAX_RSS_MB", "2048"))
+JOB_KILL_GRACE_SECONDS = float(os.getenv("JOB_KILL_GRACE_SECONDS", "10"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+log = get_logger(__name__)
+
+JOB_PEAK_RSS_MB = registry.gauge("job_agent_job_peak_rss_mb", "Peak resident memory of the last isolated run of each job.")
+JOB_KILLS = registry.counter("job_agent_job_kills_total", "Isolated jobs killed, by job and reason.")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class JobKilled(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    """The job raised in its worker process; the message carries the worker's traceback."""
+
+
+def _session_rss(sid: int) -> Dict[int, int]:
+    """Resident bytes of every process in session `sid`, from /proc. Empty where there is no /proc."""
+    rss = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return rss
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Fields after the parenthesised command: state ppid pgrp session ... rss is the 24th field.
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # The leader itself counts before its setsid() has run.
+        if int(fields[3]) == sid or int(entry) == sid:
+            rss[int(entry)] = int(fields[21]) * _PAGE_SIZE
+    return rss
+
+
+def _kill_session(sid: int, sig: int = signal.SIGKILL):
+    for pid in _session_rss(sid) or [sid]:
+        try:
+            os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def _drain_logs(log_queue):
+    while True:
+        try:
+            record = log_queue.get_nowait()
+        except (queue.Empty, EOFError, OSError):
+            return
+        logging.getLogger(record.name).handle(record)
+
+
+def _terminate(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _join(proc, log_queue, seconds: float):
+    """Wait up to `seconds` for the process to exit, relaying its log records meanwhile."""
+    deadline = time.monotonic() + seconds
+    while proc.is_alive() and time.monotonic() < deadline:
+        _drain_logs(log_queue)
+        proc.join(0.2)
+
+
+def _child(conn, log_queue, func: Callable, args, kwargs):
+    # Own session, so the job, chromedriver and Chrome can be measured and killed as one.
+    os.setsid()
+    # SIGTERM unwinds the job, so scrapers quit their browsers (remote ones included) within the grace period.
+    signal.signal(signal.SIGTERM, _terminate)
+    forward_logging(log_queue)
+    try:
+        value = func(*args, **kwargs)
+        conn.send({"ok": True, "value": value, "metrics": registry.export()})
+    except BaseException as e:
+        conn.send({"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc(),
+                   "metrics": registry.export()})
+    finally:
+        conn.close()
+
+
+def run_isolated(func: Callable, args=(), kwargs: Optional[Dict] = None, name: Optional[str] = None,
+                 timeout_minutes: float = JOB_TIMEOUT_MINUTES, max_rss_mb: float = JOB_MAX_RSS_MB):
+    """Call func(*args, **kwargs) in a spawned process and return its result.
+
+    The process gets its own session. It is killed, with everything it started, once it runs past
+    `timeout_minutes` or the session's resident memory passes `max_rss_mb`; that raises JobKilled.
+    Its log records and metrics are replayed into this process. An exception in the job raises JobFailed.
+    """
+    name = name or getattr(func, "__name__", "job")
+    ctx = multiprocessing.get_context("spawn")
+    receiver, sender = ctx.Pipe(duplex=False)
+    log_queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(sender, log_queue, func, args, kwargs or {}), name=f"job:{name}")
+    proc.start()
+    sender.close()
+
+    started = time.monotonic()
+    peak = 0
+    result = None
+    killed = None
+    try:
+        while result is None and proc.is_alive():
+            _drain_logs(log_queue)
+            peak = max(peak, sum(_session_rss(proc.pid).values()))
+            if peak > max_rss_mb * 1024 * 1024:
+                killed = f"memory: {peak / 1024 / 1024:.0f} MB over the {max_rss_mb:.0f} MB limit"
+            elif time.monotonic() - started > timeout_minutes * 60:
+                killed = f"timeout: still running after {timeout_minutes:g} min"
+            if killed:
+                JOB_KILLS.inc(job=name, reason=killed.split(":", 1)[0])
+                log.error("Killing job %s (pid %d): %s", name, proc.pid, killed)
+                _kill_session(proc.pid, signal.SIGTERM)
+                break
+            if receiver.poll(JOB_POLL_SECONDS):
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    break
+        # The child can send its result and exit between the last poll and the is_alive() check.
+        if result is None and not killed and receiver.poll(0):
+            try:
+                result = receiver.recv()
+            except EOFError:
+                pass
+    finally:
+        _join(proc, log_queue, JOB_KILL_GRACE_SECONDS)
+        exited = not proc.is_alive()
+        # Whatever is left of the session (the job itself if it hung, orphaned browsers) goes now.
+        _kill_session(proc.pid)
+        proc.join()
+        # A process killed mid-write can leave half a record in the queue; only read it after its own exit.
+        if exited:
+            _drain_logs(log_queue)
+        receiver.close()
+        log_queue.close()
+        JOB_PEAK_RSS_MB.set(round(peak / 1024 / 1024, 1), job=name)
+
+    if result is not None:
+        registry.merge(result["metrics"])
+    if killed:
+        raise JobKilled(f"{name} killed ({killed})")
+    if result is None:
+        raise JobKilled(f"{name} died with exit code {proc.exitcode}")
+    log.info("Job %s %s in %.0fs (peak %.0f MB)", name, "finished" if result["ok"] else "failed",
+             time.monotonic() - started, peak / 1024 / 1024)
+    if not result["ok"]:
+        raise JobFailed(f"{result['error']}\n{result['traceback']}")
+    return result["value"]
+
+
+class _IsolatedJob:
+    """What APScheduler's run_job needs from a job, with the call routed through run_isolated."""
+
+    def __init__(self, job, limits: Dict):
+        self.id = job.id
+        self._jobstore_alias = job._jobstore_alias
+        self.misfire_grace_time = job.misfire_grace_time
+        self.func = functools.partial(run_isolated, job.func, name=job.id, **limits)
+        self.args = (tuple(job.args),)
+        self.kwargs = {"kwargs": dict(job.kwargs)}
+        self._name = str(job)
+
+    def __str__(self) -> str:
+        return self._name
+
+
+class IsolatedExecutor(BasePoolExecutor):
+    """APScheduler executor running every job in its own process (see run_isolated).
+
+    `max_workers` threads of the scheduler process only wait on their workers, so a hung browser or a
+    leaking session dies with its job instead of staying in the long-running scheduler.
+    """
+
+    def __init__(self, max_workers: int = 1, timeout_minutes: float = JOB_TIMEOUT_MINUTES,
+                 max_rss_mb: float = JOB_MAX_RSS_MB):
+        super().__init__(concurrent.futures.ThreadPoolExecutor(int(max_workers), thread_name_prefix="isolated-job"))
+        self.limits = {"timeout_minutes": timeout_minutes, "max_rss_mb": max_rss_mb}
+
+    def _do_submit_job(self, job, run_times):
+        super()._do_submit_job(_IsolatedJob(job, self.limits), run_times)
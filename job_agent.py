@@ -1,66 +1,141 @@
 import os
 import json
 from typing import List, Dict
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import create_agent
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from unified_run import JobDatabase
+from jobdb import DB_SAVE_SECONDS
+from metrics import registry, timed
+from profiling import profiled
+from llm_backends import get_llm_backend, LLM_BACKEND, LLM_MODEL
+from app_logging import get_logger
 from dotenv import load_dotenv
-from psycopg2.extras import RealDictCursor
 
 load_dotenv()
 
+MODEL_NAME = LLM_MODEL
+# Scoring calls the chat model directly; the LangChain agent is only for tool-using workflows.
+AGENT_TOOLS_ENABLED = os.getenv("AGENT_TOOLS_ENABLED", "0") == "1"
+# Cascade: a compact triage prompt gives coarse scores for large batches, and only jobs at or above
+# TRIAGE_THRESHOLD get the full prompt with analysis. Check agreement with `python -m benchmarks.cascade_eval`.
+SCORE_CASCADE = os.getenv("SCORE_CASCADE", "0") == "1"
+TRIAGE_MODEL = os.getenv("TRIAGE_MODEL", MODEL_NAME)
+TRIAGE_THRESHOLD = int(os.getenv("TRIAGE_THRESHOLD", "30"))
+TRIAGE_BATCH_SIZE = int(os.getenv("TRIAGE_BATCH_SIZE", "50"))
+TRIAGE_DESCRIPTION_CHARS = int(os.getenv("TRIAGE_DESCRIPTION_CHARS", "0"))
+
+log = get_logger(__name__)
+
+LLM_REQUEST_SECONDS = registry.histogram("job_agent_llm_request_seconds", "Latency of one scoring request to the LLM.")
+LLM_TOKENS = registry.counter("job_agent_llm_tokens_total", "Tokens reported by the LLM, by direction and stage.")
+LLM_ERRORS = registry.counter("job_agent_llm_errors_total", "Scoring requests that failed, by kind.")
+JOBS_SCORED = registry.counter("job_agent_jobs_scored_total", "Scores returned by the LLM.")
+TRIAGE_JOBS = registry.counter("job_agent_triage_jobs_total",
+                               "Jobs through the triage stage: candidate (full scoring), screened, or missed.")
+
+
+def _parse_json(text: str):
+    text = text.strip()
+    if text.startswith('```json'):
+        text = text.split('```json')[1].split('```')[0].strip()
+    elif text.startswith('```'):
+        text = text.split('```')[1].split('```')[0].strip()
+    return json.loads(text)
+
+
+def _job_tags(job: Dict) -> List:
+    tags = job.get('tags', [])
+    if isinstance(tags, str):
+        try:
+            tags = json.loads(tags)
+        except json.JSONDecodeError:
+            tags = []
+    return tags[:5] if tags else []
+
 class JobMatcherAgent:
-    def __init__(self, user_profile : Dict):
+    def __init__(self, user_profile : Dict, enable_tools: bool = AGENT_TOOLS_ENABLED,
+                 cascade: bool = SCORE_CASCADE):
         self.user_profile = user_profile
         self.db = JobDatabase()
         
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature = 0.2
-        )
+        self._llm = None
+        self._triage_llm = None
+        self.cascade = cascade
         
         self.tools=[]
-        
-        
-        self.agent = create_agent(self.llm, tools=self.tools)
+        self.enable_tools = enable_tools
+        self._agent = None
+
+    @property
+    def llm(self):
+        """Scoring backend, built on first use; LLM_BACKEND picks gemini, record, replay or synthetic."""
+        if self._llm is None:
+            self._llm = get_llm_backend(model=MODEL_NAME)
+        return self._llm
+
+    @llm.setter
+    def llm(self, backend):
+        self._llm = backend
+
+    @property
+    def triage_llm(self):
+        """Backend for the triage stage; the scoring backend itself unless TRIAGE_MODEL names another model."""
+        if self._triage_llm is None:
+            if TRIAGE_MODEL == MODEL_NAME:
+                self._triage_llm = self.llm
+            else:
+                self._triage_llm = get_llm_backend(LLM_BACKEND, model=TRIAGE_MODEL)
+        return self._triage_llm
+
+    @triage_llm.setter
+    def triage_llm(self, backend):
+        self._triage_llm = backend
+
+    @property
+    def agent(self):
+        """LangChain agent over `tools`, built on first use and only when tools are enabled."""
+        if not self.enable_tools or self.llm.chat_model is None:
+            return None
+        if self._agent is None:
+            from langchain.agents import create_agent
+            self._agent = create_agent(self.llm.chat_model, tools=self.tools)
+        return self._agent
         
     def get_unscored_jobs(self, limit: int = 10) -> List[Dict]:
-        """Get unscored jobs directly from DB"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute('''
-            SELECT * FROM jobs 
-            WHERE status = %s AND ai_score = 0
-            ORDER BY created_at DESC 
-            LIMIT %s
-        ''', ('new', limit))
+        """Claim unscored jobs from the DB scoring queue; other scorers will not get the same rows"""
+        jobs = self.db.claim_unscored_jobs(limit=limit)
         
-        jobs = [dict(row) for row in cursor.fetchall()]
-        self.db.return_connection(conn)
-        
-        print(f"Found {len(jobs)} unscored jobs")
+        log.info("Claimed %d unscored jobs", len(jobs))
         return jobs
     
+    def _invoke(self, llm, prompt: str, stage: str):
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        messages = [
+            SystemMessage(content="You are a job scoring assistant. Return only valid JSON."),
+            HumanMessage(content=prompt)
+        ]
+        try:
+            with timed(LLM_REQUEST_SECONDS, model=llm.model, stage=stage):
+                response = llm.invoke(messages, stage=stage)
+        except Exception:
+            LLM_ERRORS.inc(kind="request")
+            raise
+        usage = getattr(response, "usage_metadata", None) or {}
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), direction="input", stage=stage)
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), direction="output", stage=stage)
+        return response.content.strip() # type: ignore
+
     def score_jobs_batch(self, jobs: List[Dict]) -> List[Dict]:
         if not jobs:
             return []
         
         jobs_for_llm = []
         for job in jobs:
-            tags = job.get('tags', [])
-            if isinstance(tags, str):
-                try:
-                    tags = json.loads(tags)
-                except json.JSONDecodeError:
-                    tags = []
-            
             jobs_for_llm.append({
                 "id": job['id'],
                 "title": job['title'],
                 "company": job['company'],
                 "description": job.get('description', '')[:250],  
-                "tags": tags[:5] if tags else []
+                "tags": _job_tags(job)
             })
         
         prompt = f"""Score these {len(jobs)} jobs for this candidate:
@@ -87,46 +162,118 @@ RETURN ONLY THIS JSON (no markdown, no explanation):
 
 Keep each analysis under 50 words. Return JSON for ALL {len(jobs)} jobs."""
 
-        messages = [
-            SystemMessage(content="You are a job scoring assistant. Return only valid JSON."),
-            HumanMessage(content=prompt)
-        ]
-        response = self.llm.invoke(messages)
-        response_text = response.content.strip() # type: ignore
+        response_text = self._invoke(self.llm, prompt, "full")
         try:
-            if response_text.startswith('```json'):
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text.split('```')[1].split('```')[0].strip()
-            
-            scores = json.loads(response_text)
+            scores = _parse_json(response_text)
             
-            print(f"LLM scored {len(scores)} jobs")
+            JOBS_SCORED.inc(len(scores))
+            log.info("LLM scored %d jobs", len(scores))
             return scores
             
         except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
-            print(f"   Response was: {response_text[:200]}") # type: ignore
+            LLM_ERRORS.inc(kind="parse")
+            log.warning("JSON parse error: %s; response was: %s", e, response_text[:200]) # type: ignore
             return []
         except Exception as e:
-            print(f"LLM error: {e}")
+            LLM_ERRORS.inc(kind="other")
+            log.error("LLM error: %s", e)
             return []
+
+    def triage_jobs_batch(self, jobs: List[Dict]) -> Dict[int, int]:
+        """Coarse 0-100 scores, by job id, from one compact prompt without analysis.
+
+        Jobs the reply leaves out are missing from the result; an unusable reply returns {}. Scores outside
+        0-100 are clamped into it.
+        """
+        if not jobs:
+            return {}
+
+        jobs_for_llm = []
+        for job in jobs:
+            entry = {"id": job['id'], "title": job['title'], "company": job['company'], "tags": _job_tags(job)}
+            if TRIAGE_DESCRIPTION_CHARS:
+                entry["description"] = (job.get('description') or '')[:TRIAGE_DESCRIPTION_CHARS]
+            jobs_for_llm.append(entry)
+
+        prefs = self.user_profile['preferences']
+        prompt = f"""Coarsely rate how well each job fits a candidate.
+Candidate: {', '.join(self.user_profile['skills'])}; wants {prefs['job_type']} roles in {', '.join(prefs['location'])}.
+
+JOBS TO SCORE:
+{json.dumps(jobs_for_llm, ensure_ascii=False, separators=(',', ':'))}
+
+SCORING SCALE: 0-100 in steps of 10; tech roles using the candidate's skills high, retail/sales/non-tech 0-20.
+Return ONLY a JSON object of id to score for ALL {len(jobs)} jobs, e.g. {{"1": 70, "2": 10}}"""
+
+        response_text = self._invoke(self.triage_llm, prompt, "triage")
+        try:
+            parsed = _parse_json(response_text)
+            if isinstance(parsed, dict):
+                items = parsed.items()
+            else:
+                items = [(p['id'], p['score']) for p in parsed if isinstance(p, dict) and 'id' in p and 'score' in p]
+            return {int(job_id): min(max(int(score), 0), 100) for job_id, score in items}
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            LLM_ERRORS.inc(kind="triage_parse")
+            log.warning("Triage parse error: %s; response was: %s", e, response_text[:200])
+            return {}
+
+    def score_jobs_cascade(self, jobs: List[Dict], batch_size: int = 10,
+                           threshold: int = TRIAGE_THRESHOLD) -> List[Dict]:
+        """Triage `jobs` in one request, then score the candidates with score_jobs_batch in `batch_size` chunks.
+
+        Jobs triaged below `threshold` keep their coarse score, raised to at least 1 because 0 means unscored
+        to the stats and the cleaner. Jobs the triage reply missed, or all of them
+        when triage fails, go to full scoring, so a bad triage costs tokens but never drops a job.
+        """
+        try:
+            coarse = self.triage_jobs_batch(jobs)
+        except Exception as e:
+            log.warning("Triage failed, scoring all %d jobs in full: %s", len(jobs), e)
+            coarse = {}
+
+        scores, candidates = [], []
+        for job in jobs:
+            score = coarse.get(job['id'])
+            if score is not None and score < threshold:
+                scores.append({"id": job['id'], "score": max(score, 1),
+                               "analysis": f"Screened out by triage ({score}/100)"})
+            else:
+                candidates.append(job)
+        TRIAGE_JOBS.inc(len(scores), outcome="screened")
+        TRIAGE_JOBS.inc(sum(1 for job in candidates if job['id'] in coarse), outcome="candidate")
+        TRIAGE_JOBS.inc(sum(1 for job in candidates if job['id'] not in coarse), outcome="missed")
+        log.info("Triage: %d of %d jobs go to full scoring", len(candidates), len(jobs))
+
+        for i in range(0, len(candidates), batch_size):
+            try:
+                scores += self.score_jobs_batch(candidates[i:i + batch_size])
+            except Exception as e:
+                # The chunk comes back as missing from the response; the rest of the batch keeps its scores.
+                log.error("LLM error: %s", e)
+        return scores
     
+    @timed(DB_SAVE_SECONDS, method="save_scores")
     def save_scores_to_db(self, scores: List[Dict]) -> int:
-        """Save scores directly to database"""
+        """Save scores for jobs this scorer still holds; a job whose lease expired belongs to its new claimant."""
         saved = 0
+        lost = 0
         for score_data in scores:
             try:
-                self.db.update_job_score(
+                if self.db.update_job_score(
                     job_id=score_data['id'],
                     score=score_data['score'],
                     analysis=score_data['analysis']
-                )
-                saved += 1
+                ):
+                    saved += 1
+                else:
+                    lost += 1
             except Exception as e:
-                print(f"Error saving job {score_data.get('id')}: {e}")
+                log.error("Error saving job %s: %s", score_data.get('id'), e)
         
-        print(f"Saved {saved} scores to database")
+        if lost:
+            log.warning("Dropped %d scores for jobs whose lease expired and went to another scorer", lost)
+        log.info("Saved %d scores to database", saved)
         return saved
     
     def save_job_scores(self, scores: List[Dict]) -> int:
@@ -160,41 +307,57 @@ Keep each analysis under 50 words. Return JSON for ALL {len(jobs)} jobs."""
         return self.db.get_stats()
     
     
+    @profiled("process_all_jobs")
     def process_all_jobs(self, batch_size: int = 10, max_batches: int = 20):
-        print(f"\n{'='*60}")
-        print(f" Starting batch processing")
-        print(f"   Batch size: {batch_size}")
-        print(f"   Max batches: {max_batches}")
-        print(f"{'='*60}\n")
+        log.info("Starting batch processing (batch size %d, max batches %d)", batch_size, max_batches)
         
         total_scored = 0
         
         for batch_num in range(1, max_batches + 1):
-            print(f"Batch {batch_num}/{max_batches}")
+            log.info("Batch %d/%d", batch_num, max_batches)
             
-            jobs = self.get_unscored_jobs(limit=batch_size)
+            jobs = self.get_unscored_jobs(limit=TRIAGE_BATCH_SIZE if self.cascade else batch_size)
             
             if not jobs:
-                print(f"No more unscored jobs")
+                log.info("No more unscored jobs")
                 break
             
-            print(f"Found {len(jobs)} unscored jobs")
-    
-            scores = self.score_jobs_batch(jobs)
+            claimed_ids = {job['id'] for job in jobs}
+            try:
+                if self.cascade:
+                    scores = self.score_jobs_cascade(jobs, batch_size=batch_size)
+                else:
+                    scores = self.score_jobs_batch(jobs)
+            except Exception as e:
+                log.error("LLM error: %s", e)
+                self.db.fail_scoring(list(claimed_ids), f"LLM error: {e}")
+                continue
             
+            # Ignore ids the model made up; they may belong to jobs another scorer holds.
+            valid_scores = []
+            for score_data in scores:
+                try:
+                    score_data['id'] = int(score_data['id'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if score_data['id'] in claimed_ids:
+                    valid_scores.append(score_data)
+            scores = valid_scores
             if not scores:
-                print(f" Failed to get scores, skipping batch")
+                log.warning("Failed to get scores, releasing batch")
+                self.db.fail_scoring(list(claimed_ids), "LLM returned no usable scores")
                 continue
         
             saved = self.save_scores_to_db(scores)
             total_scored += saved
             
-            print(f"Batch complete\n")
+            missing = claimed_ids - {s['id'] for s in scores}
+            if missing:
+                self.db.fail_scoring(list(missing), "missing from LLM response")
+            
+            log.debug("Batch %d complete", batch_num)
         
-        print(f"{'='*60}")
-        print(f"Processing complete!")
-        print(f"Total jobs scored: {total_scored}")
-        print(f"{'='*60}\n")
+        log.info("Processing complete! Total jobs scored: %d", total_scored)
     
         self.show_statistics()
         
@@ -206,22 +369,19 @@ Keep each analysis under 50 words. Return JSON for ALL {len(jobs)} jobs."""
         scored = [j for j in all_jobs if j['ai_score'] > 0]
         
         if not scored:
-            print("No scored jobs yet")
+            log.info("No scored jobs yet")
             return
         
         high = [j for j in scored if j['ai_score'] >= 70]
         medium = [j for j in scored if 40 <= j['ai_score'] < 70]
         low = [j for j in scored if j['ai_score'] < 40]
         
-        print(" STATISTICS:")
-        print(f"   Total scored: {len(scored)}")
-        print(f"   High quality (70+): {len(high)} jobs")
-        print(f"   Medium quality (40-69): {len(medium)} jobs")
-        print(f"   Low quality (<40): {len(low)} jobs")
+        log.info("Statistics: %d scored, %d high (70+), %d medium (40-69), %d low (<40)",
+                 len(scored), len(high), len(medium), len(low))
         
         if scored:
             avg = sum(j['ai_score'] for j in scored) / len(scored)
-            print(f"   Average score: {avg:.1f}/100")
+            log.info("Average score: %.1f/100", avg)
     
 
 if __name__ == "__main__":
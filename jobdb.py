@@ -1,72 +1,96 @@
 import os
 import json
+import socket
+import threading
 import hashlib
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from dotenv import load_dotenv
+from db_pool import ConnectionPool
+from metrics import registry, timed
+from app_logging import get_logger
 
 load_dotenv()
 
+log = get_logger(__name__)
+
 username = os.environ.get("DB_USERNAME")
 password = os.environ.get("PASSWORD")
 host = os.environ.get("HOST")
 port = os.environ.get("DB_PORT")
 dbname = os.environ.get("DBNAME")
+sslmode = os.environ.get("DB_SSLMODE", "require")
+
+SCORING_LEASE_SECONDS = int(os.getenv("SCORING_LEASE_SECONDS", "600"))
+SCORING_MAX_ATTEMPTS = int(os.getenv("SCORING_MAX_ATTEMPTS", "3"))
+SOURCE_HEALTH_COLUMNS = ("source", "state", "consecutive_failures", "runs", "failures", "success_rate", "avg_latency",
+                         "cards_per_page", "last_jobs", "last_error", "last_success_at", "last_failure_at", "opened_at")
+
+RUN_COLUMNS = ("kind", "status", "host", "started_at", "finished_at", "duration", "stages", "scraped", "inserted",
+               "duplicates", "scored", "llm_failures", "input_tokens", "output_tokens", "errors")
+
+DB_SAVE_SECONDS = registry.histogram("job_agent_db_save_seconds", "Time to write a batch of jobs or scores.")
+JOBS_SAVED = registry.counter("job_agent_jobs_saved_total", "Scraped jobs written, by result.")
+
+
+def scoring_worker() -> str:
+    """Claimant id of this thread in the scoring queue: claims, scores and releases must all use the same one."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
 
 class JobDatabase:
     def __init__(self, database_url:Optional[str] = None):
-        self.pool=SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
-            dbname=dbname,
-            user=username,
-            password=password,
-            host=host,
-            port=port,
-            connect_timeout= 3,
-            sslmode="require"
-        )
-        
-        print("Connected to Supabase")
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Opened on first use, so constructing a JobDatabase costs nothing until a query runs."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        dbname=dbname,
+                        user=username,
+                        password=password,
+                        host=host,
+                        port=port,
+                        sslmode=sslmode
+                    )
+                    log.info("Connected to Supabase")
+        return self._pool
+
+    @pool.setter
+    def pool(self, pool):
+        self._pool = pool
     
     def get_connection(self):
-        if self.pool:
-            return self.pool.getconn()
-        return psycopg2.connect(
-            dbname=dbname,
-            user=username,
-            password=password,
-            host=host,
-            port=port,
-            connect_timeout=3,
-            sslmode="require"
-        )
+        return self.pool.getconn()
     
-    def return_connection(self,conn):
-        if not conn:
-            return
-        if self.pool:
-            try:
-                self.pool.putconn(conn)
-            except Exception:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-        else:
-            try:
-                conn.close()
-            except Exception:
-                pass
+    def return_connection(self, conn, discard: bool = False):
+        self.pool.putconn(conn, discard=discard)
+
+    def connection(self):
+        """Context manager that always gives the connection back to the pool, dropping it if it broke."""
+        return self.pool.connection()
+
+    def pool_stats(self) -> Dict:
+        return self.pool.stats()
     
     def generate_job_hash(self, job:Dict):
         unique_string = f"{job['title']}{job['company']}{job['url']}"
         return hashlib.md5(unique_string.encode()).hexdigest()
     
+    @timed(DB_SAVE_SECONDS, method="save_jobs")
     def save_jobs(self, jobs:List[Dict]) -> tuple:
-        conn = self.get_connection()
+        with self.connection() as conn:
+            new_jobs, duplicate_jobs = self._save_jobs(conn, jobs)
+        JOBS_SAVED.inc(new_jobs, result="new")
+        JOBS_SAVED.inc(duplicate_jobs, result="duplicate")
+        return new_jobs, duplicate_jobs
+
+    def _save_jobs(self, conn, jobs:List[Dict]) -> tuple:
         cursor = conn.cursor()
         
         new_jobs = 0
@@ -101,98 +125,256 @@ class JobDatabase:
                 ))
                 if cursor.rowcount > 0:
                     new_jobs += 1
-                    print(f"Job {i}/{len(jobs)}: {job['title'][:50]}...")
+                    log.debug("Job %d/%d: %s...", i, len(jobs), job['title'][:50])
                 else:
                     duplicate_jobs += 1
-                    print(f"Job {i}/{len(jobs)}: Duplicate - {job['title'][:50]}...")
+                    log.debug("Job %d/%d: Duplicate - %s...", i, len(jobs), job['title'][:50])
                     
             except Exception as e:
-                print(f"Job {i}/{len(jobs)}: Error - {job['title'][:50]}... - {e}")
+                log.warning("Job %d/%d: Error - %s... - %s", i, len(jobs), job['title'][:50], e)
         
         try:
             conn.commit()
-            print(f"Saved {new_jobs} new jobs, skipped {duplicate_jobs} duplicates")
+            log.info("Saved %d new jobs, skipped %d duplicates", new_jobs, duplicate_jobs)
         except Exception as e:
-            print(f"Commit failed: {e}")
+            log.error("Commit failed: %s", e)
             conn.rollback()
             new_jobs = 0
     
-        self.return_connection(conn)
         return new_jobs, duplicate_jobs
 
+    @timed(DB_SAVE_SECONDS, method="save_jobs_bulk")
+    def save_jobs_bulk(self, jobs: List[Dict], page_size: int = 500) -> tuple:
+        """Insert jobs with multi-row statements in one transaction.
+
+        Rows are deduplicated on job_hash, so replaying the same batch is harmless.
+        """
+        rows = {}
+        for job in jobs:
+            job_hash = self.generate_job_hash(job)
+            rows[job_hash] = (
+                job_hash,
+                job['title'],
+                job.get('company', 'Unknown'),
+                job.get('location', 'Remote'),
+                job['url'],
+                job.get('salary', 'Not specified'),
+                job.get('description', ''),
+                job.get('date_posted', 'Unknown'),
+                json.dumps(job.get('tags', [])),
+                job['source'],
+                job.get('search_keyword', ''),
+                job['scraped_at']
+            )
+        if not rows:
+            return 0, len(jobs)
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            inserted = execute_values(cursor, '''
+                INSERT INTO jobs (
+                    job_hash, title, company, location, url,
+                    salary, description, date_posted, tags,
+                    source, search_keyword, scraped_at
+                ) VALUES %s
+                ON CONFLICT (job_hash) DO NOTHING
+                RETURNING job_hash
+            ''', list(rows.values()), template="(%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s)",
+                page_size=page_size, fetch=True)
+            conn.commit()
+
+        new_jobs = len(inserted)
+        JOBS_SAVED.inc(new_jobs, result="new")
+        JOBS_SAVED.inc(len(jobs) - new_jobs, result="duplicate")
+        return new_jobs, len(jobs) - new_jobs
+
     def get_all_jobs(self, status: str = 'new', limit: int = 100) -> List[Dict]:
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute('''
-            SELECT * FROM jobs 
-            WHERE status = %s 
-            ORDER BY created_at DESC 
-            LIMIT %s
-        ''', (status, limit))
-        
-        jobs = [dict(row) for row in cursor.fetchall()]
-        self.return_connection(conn)
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            
+            cursor.execute('''
+                SELECT * FROM jobs 
+                WHERE status = %s 
+                ORDER BY created_at DESC 
+                LIMIT %s
+            ''', (status, limit))
+            
+            jobs = [dict(row) for row in cursor.fetchall()]
         
         return jobs
     
-    def update_job_score(self, job_id: int, score: int, analysis: str):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE jobs 
-            SET ai_score = %s, ai_analysis = %s
-            WHERE id = %s
-        ''', (score, analysis, job_id))
-        
-        conn.commit()
-        self.return_connection(conn)
+    def iter_jobs(self, status: Optional[str] = None, limit: Optional[int] = None, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream jobs through a server-side cursor so exports never hold the whole table in memory."""
+        query = 'SELECT * FROM jobs'
+        params: list = []
+        if status:
+            query += ' WHERE status = %s'
+            params.append(status)
+        query += ' ORDER BY created_at DESC'
+        if limit:
+            query += ' LIMIT %s'
+            params.append(limit)
+
+        with self.connection() as conn:
+            cursor = conn.cursor(name="iter_jobs", cursor_factory=RealDictCursor)
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            for row in cursor:
+                yield dict(row)
+            cursor.close()
+
+    def iter_known_urls(self, source: Optional[str] = None, days: Optional[int] = None,
+                        batch_size: int = 5000) -> Iterator[str]:
+        """Stream the URLs of stored jobs, optionally for one source and the last `days` days."""
+        query = "SELECT url FROM jobs WHERE url IS NOT NULL AND url <> ''"
+        params: list = []
+        if source:
+            query += ' AND source = %s'
+            params.append(source)
+        if days:
+            query += " AND created_at >= NOW() - %s * INTERVAL '1 day'"
+            params.append(days)
+
+        with self.connection() as conn:
+            cursor = conn.cursor(name="iter_known_urls")
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            for (url,) in cursor:
+                yield url
+            cursor.close()
+
+    def claim_unscored_jobs(self, limit: int = 10, worker: Optional[str] = None,
+                            lease_seconds: int = SCORING_LEASE_SECONDS,
+                            max_attempts: int = SCORING_MAX_ATTEMPTS) -> List[Dict]:
+        """Claim up to `limit` jobs for scoring, newest first.
+
+        Rows locked by another scorer are skipped, so concurrent scorers never get the same job. A claim
+        is a lease: if the scorer dies, the row becomes claimable again after `lease_seconds`. Rows whose
+        lease ran out `max_attempts` times are moved to the dead state instead.
+        """
+        worker = worker or scoring_worker()
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                UPDATE jobs
+                SET scoring_state = 'dead', claimed_at = NULL,
+                    last_scoring_error = COALESCE(last_scoring_error, 'lease expired')
+                WHERE status = 'new' AND scoring_state = 'in_progress'
+                  AND claimed_at < NOW() - %s * INTERVAL '1 second'
+                  AND scoring_attempts >= %s
+            ''', (lease_seconds, max_attempts))
+            cursor.execute('''
+                WITH picked AS (
+                    SELECT id FROM jobs
+                    WHERE status = 'new'
+                      AND (scoring_state = 'pending'
+                           OR (scoring_state = 'in_progress' AND claimed_at < NOW() - %s * INTERVAL '1 second'))
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE jobs
+                SET scoring_state = 'in_progress', claimed_at = NOW(), claimed_by = %s,
+                    scoring_attempts = jobs.scoring_attempts + 1
+                FROM picked
+                WHERE jobs.id = picked.id
+                RETURNING jobs.*
+            ''', (lease_seconds, limit, worker))
+            jobs = [dict(row) for row in cursor.fetchall()]
+            conn.commit()
+
+        jobs.sort(key=lambda j: j['created_at'], reverse=True)
+        return jobs
+
+    def fail_scoring(self, job_ids: List[int], error: str, max_attempts: int = SCORING_MAX_ATTEMPTS,
+                     worker: Optional[str] = None) -> int:
+        """Give jobs this worker still holds back to the queue, or dead-letter them once they used up their attempts."""
+        if not job_ids:
+            return 0
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE jobs
+                SET scoring_state = CASE WHEN scoring_attempts >= %s THEN 'dead' ELSE 'pending' END,
+                    claimed_at = NULL, last_scoring_error = %s
+                WHERE id = ANY(%s) AND scoring_state = 'in_progress' AND claimed_by = %s
+            ''', (max_attempts, error[:2000], list(job_ids), worker or scoring_worker()))
+            conn.commit()
+            return cursor.rowcount
+
+    def requeue_dead_jobs(self) -> int:
+        """Give dead-lettered jobs a fresh set of attempts (`run_scorer.py --requeue-dead`)."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE jobs
+                SET scoring_state = 'pending', scoring_attempts = 0, last_scoring_error = NULL
+                WHERE scoring_state = 'dead'
+            ''')
+            conn.commit()
+            return cursor.rowcount
+
+    def scoring_queue_depth(self) -> Dict[str, int]:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT scoring_state, COUNT(*) FROM jobs WHERE status = 'new' GROUP BY scoring_state")
+            return {state: count for state, count in cursor.fetchall()}
+
+    def update_job_score(self, job_id: int, score: int, analysis: str, worker: Optional[str] = None) -> bool:
+        """Store a score for a job this worker holds; False once its lease went to another scorer."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE jobs 
+                SET ai_score = %s, ai_analysis = %s,
+                    scoring_state = 'done', claimed_at = NULL, last_scoring_error = NULL
+                WHERE id = %s AND scoring_state = 'in_progress' AND claimed_by = %s
+            ''', (score, analysis, job_id, worker or scoring_worker()))
+            
+            conn.commit()
+            return cursor.rowcount == 1
     
     def update_job_status(self, job_id: int, status: str):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE jobs SET status = %s WHERE id = %s
-        ''', (status, job_id))
-        
-        conn.commit()
-        self.return_connection(conn)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE jobs SET status = %s WHERE id = %s
+            ''', (status, job_id))
+            
+            conn.commit()
     
     def get_jobs_by_score(self, min_score: int = 70, limit: int = 50) -> List[Dict]:
-        conn = self.get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute('''
-            SELECT * FROM jobs 
-            WHERE ai_score >= %s
-            ORDER BY ai_score DESC, created_at DESC
-            LIMIT %s
-        ''', (min_score, limit))
-        
-        jobs = [dict(row) for row in cursor.fetchall()]
-        self.return_connection(conn)
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            
+            cursor.execute('''
+                SELECT * FROM jobs 
+                WHERE ai_score >= %s
+                ORDER BY ai_score DESC, created_at DESC
+                LIMIT %s
+            ''', (min_score, limit))
+            
+            jobs = [dict(row) for row in cursor.fetchall()]
         
         return jobs
     
     def get_stats(self) -> Dict:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM jobs')
-        total = cursor.fetchone()[0] # type: ignore
-        
-        cursor.execute('SELECT COUNT(*) FROM jobs WHERE status = %s', ('new',))
-        new = cursor.fetchone()[0] # type: ignore
-        
-        cursor.execute('SELECT COUNT(*) FROM jobs WHERE status = %s', ('interested',))
-        interested = cursor.fetchone()[0] # type: ignore
-        
-        cursor.execute('SELECT COUNT(*) FROM jobs WHERE status = %s', ('applied',))
-        applied = cursor.fetchone()[0] # type: ignore
-        
-        self.return_connection(conn)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT COUNT(*) FROM jobs')
+            total = cursor.fetchone()[0] # type: ignore
+            
+            cursor.execute('SELECT COUNT(*) FROM jobs WHERE status = %s', ('new',))
+            new = cursor.fetchone()[0] # type: ignore
+            
+            cursor.execute('SELECT COUNT(*) FROM jobs WHERE status = %s', ('interested',))
+            interested = cursor.fetchone()[0] # type: ignore
+            
+            cursor.execute('SELECT COUNT(*) FROM jobs WHERE status = %s', ('applied',))
+            applied = cursor.fetchone()[0] # type: ignore
         
         return {
             'total': total,
@@ -201,33 +383,63 @@ class JobDatabase:
             'applied': applied
         }
     
+    def get_source_health(self) -> Dict[str, Dict]:
+        with self.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('SELECT * FROM source_health ORDER BY source')
+            return {row['source']: dict(row) for row in cursor.fetchall()}
+
+    def save_source_health(self, health: Dict):
+        columns = [c for c in SOURCE_HEALTH_COLUMNS if c in health]
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                INSERT INTO source_health ({', '.join(columns)}, updated_at)
+                VALUES ({', '.join(['%s'] * len(columns))}, NOW())
+                ON CONFLICT (source) DO UPDATE SET
+                    {', '.join(f'{c} = EXCLUDED.{c}' for c in columns if c != 'source')}, updated_at = NOW()
+            ''', [health[c] for c in columns])
+            conn.commit()
+
+    def record_run(self, run: Dict) -> int:
+        values = [Json(run[c]) if c in ("stages", "errors") else run.get(c) for c in RUN_COLUMNS]
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                INSERT INTO runs ({', '.join(RUN_COLUMNS)})
+                VALUES ({', '.join(['%s'] * len(RUN_COLUMNS))})
+                RETURNING id
+            ''', values)
+            run_id = cursor.fetchone()[0] # type: ignore
+            conn.commit()
+        return run_id
+
     def check(self) -> Tuple[bool, Dict]:
         try:
-            conn = self.get_connection()
-            cur = conn.cursor()
-            cur.execute("SELECT 1")
-            cur.fetchone()
-            cur.close()
-            self.pool.putconn(conn)
-            return True, {"db": "ok"}
+            with self.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT 1")
+                cur.fetchone()
+                cur.close()
+            return True, {"db": "ok", "pool": self.pool_stats()}
         except Exception as e:
             return False, {"db_error": str(e)}
             
     def close(self):
-        if getattr(self, "pool", None):
+        if getattr(self, "_pool", None):
             try:
-                self.pool.closeall()
+                self._pool.closeall() # type: ignore
             except Exception as e:
-                print("Error closing pool:", e)
+                log.warning("Error closing pool: %s", e)
         
 def get_database(database_url: Optional[str] = None):
     db_url = database_url or os.getenv('DATABASE_URL')
     
     if db_url and db_url.startswith('postgresql://'):
-        print("Using PostgreSQL (Supabase)")
+        log.info("Using PostgreSQL (Supabase)")
         return JobDatabase(database_url=db_url)
     else:
-        print("Using SQLite (local)")
+        log.info("Using SQLite (local)")
         from unified_run import JobDatabase as SQLiteDB
         return SQLiteDB()
     
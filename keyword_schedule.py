@@ -0,0 +1,131 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from metrics import registry
+from app_logging import get_logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+SCRAPE_YIELD_PATH = os.getenv("SCRAPE_YIELD_PATH", os.path.join(DATA_DIR, "scrape_yield.sqlite"))
+SCRAPE_ADAPTIVE = os.getenv("SCRAPE_ADAPTIVE", "1") == "1"
+SCRAPE_MIN_INTERVAL_HOURS = float(os.getenv("SCRAPE_MIN_INTERVAL_HOURS", "6"))
+SCRAPE_MAX_INTERVAL_HOURS = float(os.getenv("SCRAPE_MAX_INTERVAL_HOURS", "168"))
+# Aim for about this many new jobs per scrape of a keyword.
+SCRAPE_TARGET_NEW_JOBS = float(os.getenv("SCRAPE_TARGET_NEW_JOBS", "5"))
+# Weight of the latest run in the smoothed yield rate.
+SCRAPE_YIELD_ALPHA = float(os.getenv("SCRAPE_YIELD_ALPHA", "0.5"))
+SCRAPE_YIELD_RETENTION_DAYS = int(os.getenv("SCRAPE_YIELD_RETENTION_DAYS", "90"))
+# A keyword's first run has no previous run to measure from; count it as one day, the old cron cadence.
+FIRST_RUN_HOURS = 24
+
+# Yield key for sources that are scraped as a whole rather than per keyword.
+ALL_KEYWORDS = "*"
+
+log = get_logger(__name__)
+
+SCRAPE_INTERVAL_HOURS = registry.gauge("job_agent_scrape_interval_hours", "Adaptive scrape interval per source and keyword.")
+
+
+class YieldTracker:
+    """New-job yield per (source, keyword), and the scrape interval it implies.
+
+    The rate of new jobs per hour is smoothed over runs; the interval is the time it takes to collect
+    SCRAPE_TARGET_NEW_JOBS at that rate, kept within [SCRAPE_MIN_INTERVAL_HOURS, SCRAPE_MAX_INTERVAL_HOURS].
+    Runs that find nothing pull the rate down geometrically, so a dry keyword backs off to the maximum in a few runs.
+    """
+
+    def __init__(self, path: str = SCRAPE_YIELD_PATH, min_hours: float = SCRAPE_MIN_INTERVAL_HOURS,
+                 max_hours: float = SCRAPE_MAX_INTERVAL_HOURS, target: float = SCRAPE_TARGET_NEW_JOBS,
+                 alpha: float = SCRAPE_YIELD_ALPHA):
+        self.path = path
+        self.min_hours = min_hours
+        self.max_hours = max_hours
+        self.target = target
+        self.alpha = alpha
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS keyword_yield (
+                source TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                rate REAL NOT NULL,
+                interval_hours REAL NOT NULL,
+                last_run REAL NOT NULL,
+                runs INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, keyword)
+            );
+            CREATE TABLE IF NOT EXISTS keyword_runs (
+                source TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                run_at REAL NOT NULL,
+                hours REAL NOT NULL,
+                scraped INTEGER NOT NULL,
+                new_jobs INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS keyword_runs_key_idx ON keyword_runs (source, keyword, run_at);
+        ''')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _clamp(self, hours: float) -> float:
+        return min(max(hours, self.min_hours), self.max_hours)
+
+    def record(self, source: str, keyword: str, new_jobs: int, scraped: int = 0, now: Optional[float] = None) -> float:
+        """Store one run's yield and return the keyword's new interval in hours."""
+        now = now or time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT rate, last_run FROM keyword_yield WHERE source = ? AND keyword = ?",
+                           (source, keyword)).fetchone()
+        if row:
+            hours = max((now - row[1]) / 3600, 1 / 60)
+            rate = self.alpha * (new_jobs / hours) + (1 - self.alpha) * row[0]
+        else:
+            hours = FIRST_RUN_HOURS
+            rate = new_jobs / hours
+        interval = self._clamp(self.target / rate if rate > 0 else self.max_hours)
+
+        conn.execute('''
+            INSERT INTO keyword_yield (source, keyword, rate, interval_hours, last_run, runs)
+            VALUES (?, ?, ?, ?, ?, 1)
+            ON CONFLICT (source, keyword) DO UPDATE SET
+                rate = excluded.rate, interval_hours = excluded.interval_hours,
+                last_run = excluded.last_run, runs = runs + 1
+        ''', (source, keyword, rate, interval, now))
+        conn.execute('''
+            INSERT INTO keyword_runs (source, keyword, run_at, hours, scraped, new_jobs) VALUES (?, ?, ?, ?, ?, ?)
+        ''', (source, keyword, now, hours, scraped, new_jobs))
+        SCRAPE_INTERVAL_HOURS.set(interval, source=source, keyword=keyword)
+        log.info("%s / %s: %d new of %d in %.1fh, next scrape in %.1fh", source, keyword, new_jobs, scraped, hours, interval)
+        return interval
+
+    def interval_hours(self, source: str, keyword: str) -> float:
+        row = self._conn().execute("SELECT interval_hours FROM keyword_yield WHERE source = ? AND keyword = ?",
+                                   (source, keyword)).fetchone()
+        return self._clamp(row[0]) if row else self.min_hours
+
+    def next_due(self, source: str, keyword: str) -> float:
+        """Epoch seconds when the keyword should be scraped next; never-scraped keywords are due now."""
+        row = self._conn().execute("SELECT last_run, interval_hours FROM keyword_yield WHERE source = ? AND keyword = ?",
+                                   (source, keyword)).fetchone()
+        return row[0] + self._clamp(row[1]) * 3600 if row else 0.0
+
+    def summary(self) -> List[Dict]:
+        rows = self._conn().execute('''
+            SELECT source, keyword, rate, interval_hours, last_run, runs FROM keyword_yield ORDER BY source, keyword
+        ''').fetchall()
+        return [{"source": s, "keyword": k, "new_per_day": round(r * 24, 2), "interval_hours": round(i, 1),
+                 "last_run": lr, "runs": n} for s, k, r, i, lr, n in rows]
+
+    def purge(self, older_than_days: int = SCRAPE_YIELD_RETENTION_DAYS) -> int:
+        cutoff = time.time() - older_than_days * 86400
+        return self._conn().execute("DELETE FROM keyword_runs WHERE run_at < ?", (cutoff,)).rowcount
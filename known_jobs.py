@@ -0,0 +1,90 @@
+import os
+import math
+import hashlib
+import threading
+from typing import Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from app_logging import get_logger
+
+KNOWN_JOBS_ENABLED = os.getenv("KNOWN_JOBS_ENABLED", "1") == "1"
+# Only recent rows matter: results are newest first, and the cleanup job drops rows after 30 days anyway.
+KNOWN_JOBS_DAYS = int(os.getenv("KNOWN_JOBS_DAYS", "60"))
+KNOWN_JOBS_ERROR_RATE = float(os.getenv("KNOWN_JOBS_ERROR_RATE", "0.0001"))
+
+log = get_logger(__name__)
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """Tracking parameters and fragments differ between listings of the same job; drop them."""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+class BloomFilter:
+    """Fixed-size set of strings with no false negatives and `error_rate` false positives at `capacity`.
+
+    100k URLs at 0.01% take about 240 KB, against tens of MB for the URLs themselves.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = KNOWN_JOBS_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class SeenSet:
+    """URLs found during this run, shared by scraper workers on different threads."""
+
+    def __init__(self):
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def add_new(self, key: str) -> bool:
+        """Add `key`; False if it was already there, so exactly one worker keeps each job."""
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            return True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def load_known_jobs(db, source: Optional[str] = None, days: Optional[int] = KNOWN_JOBS_DAYS,
+                    error_rate: float = KNOWN_JOBS_ERROR_RATE) -> BloomFilter:
+    """Bloom filter of the normalised URLs already in the jobs table, sized with room for this run's finds."""
+    urls = [normalize_url(u) for u in db.iter_known_urls(source=source, days=days)]
+    known = BloomFilter(max(len(urls) * 2, 1024), error_rate)
+    known.update(u for u in urls if u)
+    log.info("Loaded %d known job URLs (%d KB filter)", len(known), len(known.bits) // 1024)
+    return known
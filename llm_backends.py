@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import zlib
+import random
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import registry
+from app_logging import get_logger
+
+load_dotenv()
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+# gemini: live calls. record: live calls through the cache (hits are free). replay: cache only.
+# synthetic: canned scores, no network.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.sqlite"))
+LLM_REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "error")  # error | synthetic
+LLM_SYNTHETIC_LATENCY = float(os.getenv("LLM_SYNTHETIC_LATENCY", "0"))
+LLM_SYNTHETIC_JITTER = float(os.getenv("LLM_SYNTHETIC_JITTER", "0"))
+LLM_SYNTHETIC_ERROR_RATE = float(os.getenv("LLM_SYNTHETIC_ERROR_RATE", "0"))
+LLM_SYNTHETIC_TRUNCATE_RATE = float(os.getenv("LLM_SYNTHETIC_TRUNCATE_RATE", "0"))
+LLM_SYNTHETIC_SEED = int(os.getenv("LLM_SYNTHETIC_SEED", "0"))
+# Points a synthetic triage score can be off from the job's full score, so a cascade can disagree.
+LLM_SYNTHETIC_TRIAGE_NOISE = float(os.getenv("LLM_SYNTHETIC_TRIAGE_NOISE", "15"))
+
+log = get_logger(__name__)
+
+LLM_CACHE = registry.counter("job_agent_llm_cache_total", "LLM response cache lookups, by result.")
+
+
+class LLMBackendError(Exception):
+    pass
+
+
+class CacheMiss(LLMBackendError):
+    pass
+
+
+def _message_dicts(messages) -> List[Dict]:
+    return [{"type": getattr(m, "type", type(m).__name__), "content": m.content} for m in messages]
+
+
+def prompt_key(model: str, messages) -> str:
+    body = json.dumps([model, _message_dicts(messages)], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _ai_message(content: str, input_tokens: int, output_tokens: int):
+    from langchain_core.messages import AIMessage
+
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+    return AIMessage(content=content, usage_metadata=usage) # type: ignore
+
+
+class ResponseCache:
+    """Prompt-hash -> response store in a local SQLite file, responses zlib-compressed.
+
+    Keys cover the model name and every message, so changing the prompt template invalidates old entries.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content BLOB NOT NULL,
+                input_tokens INTEGER NOT NULL DEFAULT 0,
+                output_tokens INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )
+        ''')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT content, input_tokens, output_tokens FROM responses WHERE key = ?", (key,)).fetchone()
+        LLM_CACHE.inc(result="hit" if row else "miss")
+        if not row:
+            return None
+        content, input_tokens, output_tokens = row
+        return _ai_message(zlib.decompress(content).decode("utf-8"), input_tokens, output_tokens)
+
+    def put(self, key: str, model: str, response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        self._conn().execute('''
+            INSERT OR REPLACE INTO responses (key, model, content, input_tokens, output_tokens, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (key, model, zlib.compress(str(response.content).encode("utf-8"), 6),
+              usage.get("input_tokens", 0), usage.get("output_tokens", 0), time.time()))
+
+    def stats(self) -> Dict:
+        count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM responses").fetchone()
+        return {"path": self.path, "entries": count, "compressed_bytes": size}
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model: str = LLM_MODEL, temperature: float = LLM_TEMPERATURE):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        self.model = model
+        self.chat_model = ChatGoogleGenerativeAI(model=model, temperature=temperature)
+
+    def invoke(self, messages, stage: str = "full"):
+        return self.chat_model.invoke(messages)
+
+
+class RecordingBackend:
+    """Read-through cache in front of a live backend: repeated prompts are answered from disk."""
+
+    name = "record"
+
+    def __init__(self, inner, cache: ResponseCache):
+        self.inner = inner
+        self.cache = cache
+        self.model = inner.model
+        self.chat_model = getattr(inner, "chat_model", None)
+
+    def invoke(self, messages, stage: str = "full"):
+        key = prompt_key(self.model, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = self.inner.invoke(messages, stage=stage)
+        self.cache.put(key, self.model, response)
+        return response
+
+
+class ReplayBackend:
+    """Answers only from the cache; a prompt that was never recorded raises CacheMiss or goes to `fallback`."""
+
+    name = "replay"
+    chat_model = None
+
+    def __init__(self, cache: ResponseCache, model: str = LLM_MODEL, fallback=None):
+        self.cache = cache
+        self.model = model
+        self.fallback = fallback
+
+    def invoke(self, messages, stage: str = "full"):
+        cached = self.cache.get(prompt_key(self.model, messages))
+        if cached is not None:
+            return cached
+        if self.fallback is not None:
+            return self.fallback.invoke(messages, stage=stage)
+        raise CacheMiss("prompt not in the replay cache; record it first with LLM_BACKEND=record")
+
+
+class SyntheticBackend:
+    """Scores the jobs in a scoring prompt without a model.
+
+    A job's score depends only on its id, title and company, so the same job scores the same in any batch.
+    The "triage" stage answers with an id -> score object rounded to tens, off from the full score by up to
+    `triage_noise` points (fixed per job and seed), as a smaller model would be. Latency,
+    failures and truncated (unparseable) replies are drawn from a generator seeded by the prompt and how
+    often it was sent before, so a retried batch can succeed while a whole run stays reproducible for a seed.
+    """
+
+    name = "synthetic"
+    chat_model = None
+
+    def __init__(self, latency: float = LLM_SYNTHETIC_LATENCY, jitter: float = LLM_SYNTHETIC_JITTER,
+                 error_rate: float = LLM_SYNTHETIC_ERROR_RATE, truncate_rate: float = LLM_SYNTHETIC_TRUNCATE_RATE,
+                 seed: int = LLM_SYNTHETIC_SEED, model: str = "synthetic",
+                 triage_noise: float = LLM_SYNTHETIC_TRIAGE_NOISE):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.seed = seed
+        self.model = model
+        self.triage_noise = triage_noise
+        self.calls = 0
+        self._attempts: Dict[str, int] = {}
+
+    @staticmethod
+    def _jobs(prompt: str) -> List[Dict]:
+        start, end = prompt.find("JOBS TO SCORE:"), prompt.find("SCORING SCALE")
+        if start < 0 or end < 0:
+            return []
+        try:
+            jobs = json.loads(prompt[start + len("JOBS TO SCORE:"):end])
+        except json.JSONDecodeError:
+            return []
+        return [j for j in jobs if isinstance(j, dict) and "id" in j]
+
+    @staticmethod
+    def _score(job: Dict) -> Tuple[int, str]:
+        identity = {k: job.get(k) for k in ("id", "title", "company")}
+        digest = hashlib.sha256(json.dumps(identity, sort_keys=True, ensure_ascii=False).encode()).digest()
+        score = digest[0] * 101 // 256
+        return score, f"Synthetic score for {str(job.get('title') or '')[:40]}"
+
+    def _triage_score(self, job: Dict) -> int:
+        score = self._score(job)[0]
+        if self.triage_noise:
+            score += random.Random(f"{self.seed}:triage:{job.get('id')}").uniform(-self.triage_noise, self.triage_noise)
+        return min(max(int(round(score, -1)), 0), 100)
+
+    def invoke(self, messages, stage: str = "full"):
+        self.calls += 1
+        prompt = "\n".join(str(m.content) for m in messages)
+        key = prompt_key(self.model, messages)
+        attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        delay = max(self.latency + rng.uniform(-self.jitter, self.jitter), 0)
+        if delay:
+            time.sleep(delay)
+        if rng.random() < self.error_rate:
+            raise LLMBackendError("synthetic LLM error")
+
+        if stage == "triage":
+            scores = {str(job["id"]): self._triage_score(job) for job in self._jobs(prompt)}
+        else:
+            scores = []
+            for job in self._jobs(prompt):
+                score, analysis = self._score(job)
+                scores.append({"id": job["id"], "score": score, "analysis": analysis})
+        content = json.dumps(scores, ensure_ascii=False)
+        if rng.random() < self.truncate_rate:
+            content = content[:rng.randint(1, max(len(content) - 1, 1))]
+        return _ai_message(content, len(prompt) // 4, len(content) // 4)
+
+
+def get_llm_backend(backend: str = LLM_BACKEND, model: str = LLM_MODEL):
+    """Build the scoring LLM selected by LLM_BACKEND."""
+    log.info("LLM backend: %s (model %s)", backend, model)
+    if backend == "gemini":
+        return GeminiBackend(model)
+    if backend == "record":
+        return RecordingBackend(GeminiBackend(model), ResponseCache())
+    if backend == "replay":
+        fallback = SyntheticBackend() if LLM_REPLAY_MISS == "synthetic" else None
+        return ReplayBackend(ResponseCache(), model, fallback=fallback)
+    if backend == "synthetic":
+        return SyntheticBackend()
+    raise ValueError(f"unknown LLM_BACKEND {backend!r}")
@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import asyncio
+import functools
+import threading
+import tracemalloc
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from metrics import registry
+from app_logging import get_logger
+
+MEMORY_SAMPLE_SECONDS = float(os.getenv("MEMORY_SAMPLE_SECONDS", "30"))
+# Log a warning (with the top allocators when tracing) above this RSS; recycle the process above the second.
+MEMORY_WARN_MB = float(os.getenv("MEMORY_WARN_MB", "1024"))
+MEMORY_RECYCLE_MB = float(os.getenv("MEMORY_RECYCLE_MB", "0"))  # 0 never recycles
+# tracemalloc slows allocation down and every tracked scope takes two snapshots, so it is opt-in.
+TRACEMALLOC_ENABLED = os.getenv("TRACEMALLOC_ENABLED", "0") == "1"
+# Diffs group by the allocating line, which needs one frame; more only help when reading raw snapshots.
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+TRACEMALLOC_TOP = int(os.getenv("TRACEMALLOC_TOP", "20"))
+# Diffs kept per scope (pipeline stage or dashboard callback).
+TRACEMALLOC_HISTORY = int(os.getenv("TRACEMALLOC_HISTORY", "5"))
+
+log = get_logger(__name__)
+
+PROCESS_RSS_MB = registry.gauge("job_agent_process_rss_mb", "Resident memory of this process, sampled by the watchdog.")
+PROCESS_PEAK_RSS_MB = registry.gauge("job_agent_process_peak_rss_mb", "Peak resident memory of this process.")
+SCOPE_RSS_GROWTH_MB = registry.histogram(
+    "job_agent_scope_rss_growth_mb", "RSS growth over one pipeline stage or dashboard callback.",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000))
+SCOPE_TRACED_GROWTH = registry.gauge("job_agent_scope_traced_growth_bytes",
+                                     "Traced allocations still held after the last run of a scope (tracemalloc on).")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_diffs: Dict[str, deque] = {}
+_diffs_lock = threading.Lock()
+_ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+
+
+def rss_bytes() -> int:
+    """Current resident memory; the peak from getrusage where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def start_tracing(frames: int = TRACEMALLOC_FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        log.info("tracemalloc started (%d frames)", frames)
+
+
+def stop_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        log.info("tracemalloc stopped")
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_ignore)
+
+
+def _format(stats, limit: int) -> List[Dict]:
+    out = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        entry = {"where": f"{frame.filename}:{frame.lineno}", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        if hasattr(stat, "size_diff"):
+            entry.update(diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+        out.append(entry)
+    return out
+
+
+def top_allocators(limit: int = TRACEMALLOC_TOP) -> List[Dict]:
+    """Lines holding the most traced memory right now; empty unless tracemalloc is on."""
+    if not tracemalloc.is_tracing():
+        return []
+    return _format(_snapshot().statistics("lineno"), limit)
+
+
+def scope_diffs() -> Dict[str, List[Dict]]:
+    with _diffs_lock:
+        return {scope: list(runs) for scope, runs in _diffs.items()}
+
+
+class track:
+    """Measure what one pipeline stage or dashboard callback leaves behind.
+
+        with track("stage:scrape"): ...
+
+        @track("callback:refresh_all")
+        async def refresh_all(...): ...
+
+    RSS growth always goes to a histogram. With tracemalloc on, the allocations still held afterwards are
+    diffed against a snapshot from before and the top lines kept per scope. Scopes that overlap (concurrent
+    callbacks) see each other's allocations.
+    """
+
+    def __init__(self, scope: str, limit: int = TRACEMALLOC_TOP):
+        self.scope = scope
+        self.limit = limit
+        self._rss = 0
+        self._before: Optional[tracemalloc.Snapshot] = None
+
+    def __enter__(self):
+        self._rss = rss_bytes()
+        self._before = _snapshot() if tracemalloc.is_tracing() else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        SCOPE_RSS_GROWTH_MB.observe(max(rss_bytes() - self._rss, 0) / 1024 / 1024, scope=self.scope)
+        if self._before is None or not tracemalloc.is_tracing():
+            return False
+        stats = _snapshot().compare_to(self._before, "lineno")
+        growth = sum(s.size_diff for s in stats)
+        SCOPE_TRACED_GROWTH.set(growth, scope=self.scope)
+        entry = {"at": time.strftime("%Y-%m-%d %H:%M:%S"), "growth_kb": round(growth / 1024, 1),
+                 "top": _format(stats, self.limit)}
+        with _diffs_lock:
+            _diffs.setdefault(self.scope, deque(maxlen=TRACEMALLOC_HISTORY)).append(entry)
+        return False
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(self.scope, self.limit):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(self.scope, self.limit):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class MemoryWatchdog:
+    """Samples this process's RSS on a daemon thread.
+
+    Above `warn_mb` it logs a warning, with the top allocators when tracemalloc is on, once per crossing.
+    Above `recycle_mb` it calls `on_recycle` once and sets `recycle`, so the process can shut down cleanly
+    and be restarted by its supervisor before the OOM killer gets to it.
+    """
+
+    def __init__(self, warn_mb: float = MEMORY_WARN_MB, recycle_mb: float = MEMORY_RECYCLE_MB,
+                 interval: float = MEMORY_SAMPLE_SECONDS, on_recycle: Optional[Callable[[], None]] = None):
+        self.warn_mb = warn_mb
+        self.recycle_mb = recycle_mb
+        self.interval = interval
+        self.on_recycle = on_recycle
+        self.recycle = threading.Event()
+        self.peak_mb = 0.0
+        self.last_mb = 0.0
+        self._warned = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MemoryWatchdog":
+        if TRACEMALLOC_ENABLED:
+            start_tracing()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                log.warning("Memory sample failed: %s", e)
+            self._stop.wait(self.interval)
+
+    def sample(self) -> float:
+        mb = rss_bytes() / 1024 / 1024
+        self.last_mb = mb
+        self.peak_mb = max(self.peak_mb, mb)
+        PROCESS_RSS_MB.set(round(mb, 1))
+        PROCESS_PEAK_RSS_MB.set(round(self.peak_mb, 1))
+
+        if self.warn_mb and mb >= self.warn_mb and not self._warned:
+            self._warned = True
+            top = "; ".join(f"{t['where']} {t['size_kb']:.0f} KB" for t in top_allocators(5))
+            log.warning("RSS %.0f MB is over MEMORY_WARN_MB=%.0f%s", mb, self.warn_mb,
+                        f"; top allocators: {top}" if top else "; set TRACEMALLOC_ENABLED=1 to see allocators")
+        elif self.warn_mb and mb < self.warn_mb * 0.9:
+            self._warned = False
+
+        if self.recycle_mb and mb >= self.recycle_mb and not self.recycle.is_set():
+            log.error("RSS %.0f MB is over MEMORY_RECYCLE_MB=%.0f; recycling the process", mb, self.recycle_mb)
+            self.recycle.set()
+            if self.on_recycle:
+                self.on_recycle()
+        return mb
+
+    def status(self) -> Dict:
+        return {
+            "rss_mb": round(rss_bytes() / 1024 / 1024, 1),
+            "peak_rss_mb": round(self.peak_mb, 1),
+            "warn_mb": self.warn_mb,
+            "recycle_mb": self.recycle_mb,
+            "recycling": self.recycle.is_set(),
+            "tracemalloc": tracemalloc.is_tracing(),
+            "traced_mb": round(tracemalloc.get_traced_memory()[0] / 1024 / 1024, 1) if tracemalloc.is_tracing() else None,
+        }
@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app_logging import get_logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+RUN_SUMMARY_DIR = os.getenv("RUN_SUMMARY_DIR", os.path.join(DATA_DIR, "runs"))
+
+# Scraper stages take minutes and single extractions take milliseconds, so the default buckets span both.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+log = get_logger(__name__)
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _snapshot_key(key: LabelKey) -> str:
+    return ",".join(f"{k}={v}" for k, v in key) or "total"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.6f}".rstrip("0")
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {_snapshot_key(k): v for k, v in sorted(self._values.items())}
+
+    def export(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, values: Dict[LabelKey, float]):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def merge(self, values: Dict[LabelKey, float]):
+        with self._lock:
+            self._values.update(values)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, Dict] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = {"counts": [0] * len(self.buckets), "count": 0, "sum": 0.0, "max": 0.0}
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                s["counts"][i] += 1
+            s["count"] += 1
+            s["sum"] += value
+            s["max"] = max(s["max"], value)
+
+    def time(self, **labels) -> "timed":
+        return timed(self, **labels)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted((k, dict(v, counts=list(v["counts"]))) for k, v in self._series.items())
+        for key, s in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, s["counts"]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {s['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(s['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {s['count']}")
+        return lines
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                _snapshot_key(k): {
+                    "count": s["count"],
+                    "sum": round(s["sum"], 3),
+                    "avg": round(s["sum"] / s["count"], 4) if s["count"] else 0,
+                    "max": round(s["max"], 3),
+                }
+                for k, s in sorted(self._series.items())
+            }
+
+    def export(self) -> Dict[LabelKey, Dict]:
+        with self._lock:
+            return {k: dict(s, counts=list(s["counts"])) for k, s in self._series.items()}
+
+    def merge(self, series: Dict[LabelKey, Dict]):
+        with self._lock:
+            for key, other in series.items():
+                s = self._series.get(key)
+                if s is None:
+                    self._series[key] = dict(other, counts=list(other["counts"]))
+                    continue
+                s["counts"] = [a + b for a, b in zip(s["counts"], other["counts"])]
+                s["count"] += other["count"]
+                s["sum"] += other["sum"]
+                s["max"] = max(s["max"], other["max"])
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines += metric.render() # type: ignore
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return {m.name: m.snapshot() for m in metrics} # type: ignore
+
+
+    def export(self) -> List[Dict]:
+        """Raw state of every metric, picklable, for merge() in another process."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [{"type": m.type, "name": m.name, "help": m.help, "buckets": getattr(m, "buckets", None),
+                 "values": m.export()} for m in metrics] # type: ignore
+
+    def merge(self, exported: List[Dict]):
+        """Fold another process's export() in: counters and histograms add up, gauges take its values."""
+        for m in exported:
+            if m["type"] == Histogram.type:
+                metric = self.histogram(m["name"], m["help"], buckets=m["buckets"])
+                if metric.buckets != tuple(m["buckets"]):
+                    log.warning("Not merging %s: bucket bounds differ", m["name"])
+                    continue
+            else:
+                metric = self._get(Gauge if m["type"] == Gauge.type else Counter, m["name"], m["help"])
+            metric.merge(m["values"]) # type: ignore
+
+
+registry = MetricsRegistry()
+
+
+class timed:
+    """Observe elapsed seconds into a histogram, as a context manager or a decorator.
+
+        with timed("job_agent_stage_seconds", stage="scrape"): ...
+
+        @timed("job_agent_extract_job_seconds")
+        def extract_job_data(...): ...
+    """
+
+    def __init__(self, histogram, help: str = "", **labels):
+        self.histogram = histogram if isinstance(histogram, Histogram) else registry.histogram(histogram, help)
+        self.labels = labels
+        self.elapsed = 0.0
+        self._started: Optional[float] = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._started # type: ignore
+        self.histogram.observe(self.elapsed, **self.labels)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.histogram.observe(time.perf_counter() - started, **self.labels)
+        return wrapper
+
+
+STAGE_SECONDS = registry.histogram("job_agent_stage_seconds", "Wall time of each pipeline stage.")
+
+
+class _Stage(timed):
+    """timed() into STAGE_SECONDS, plus what the stage leaves behind in memory (memory_watch.track)."""
+
+    def __init__(self, name: str):
+        super().__init__(STAGE_SECONDS, stage=name)
+        from memory_watch import track
+        self._memory = track(f"stage:{name}")
+
+    def __enter__(self):
+        self._memory.__enter__()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self._memory.__exit__(exc_type, exc, tb)
+
+
+def stage(name: str) -> timed:
+    return _Stage(name)
+
+
+def write_run_summary(run: str, extra: Optional[Dict] = None, directory: str = RUN_SUMMARY_DIR) -> Optional[str]:
+    """Dump every metric of this process as `<directory>/<run>-<timestamp>.json` and print a stage table."""
+    summary = {
+        "run": run,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        **(extra or {}),
+        "metrics": registry.snapshot(),
+    }
+    stages = summary["metrics"].get(STAGE_SECONDS.name, {})
+    if stages:
+        log.info("%-24s %5s %9s", "stage", "runs", "seconds")
+        for labels, s in stages.items():
+            log.info("%-24s %5d %9.1f", labels.split('=', 1)[-1], s['count'], s['sum'])
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{run}-{datetime.now():%Y%m%dT%H%M%S}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    except OSError as e:
+        log.warning("Could not write run summary: %s", e)
+        return None
+    log.info("Run summary written to %s", path)
+    return path
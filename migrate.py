@@ -0,0 +1,409 @@
+import os
+import re
+import sys
+import time
+import json
+import hashlib
+import argparse
+import statistics
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATIONS_DIR = os.getenv("MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"))
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+MIGRATE_LOCK_KEY = 804_213_377  # pg_advisory_lock key, keeps two deploys from migrating at once
+BENCH_SCHEMA = "migrate_bench"
+
+# The queries the app runs most, with the parameters they are usually called with.
+HOT_QUERIES: List[Tuple[str, str, tuple]] = [
+    ("claim_unscored_jobs", '''
+        SELECT id FROM jobs
+        WHERE status = 'new'
+          AND (scoring_state = 'pending'
+               OR (scoring_state = 'in_progress' AND claimed_at < NOW() - %s * INTERVAL '1 second'))
+        ORDER BY created_at DESC
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ''', (600, 10)),
+    ("get_jobs_by_score", '''
+        SELECT * FROM jobs
+        WHERE ai_score >= %s
+        ORDER BY ai_score DESC, created_at DESC
+        LIMIT %s
+    ''', (70, 50)),
+    ("cards_score_desc", '''
+        SELECT id, title, company, location, ai_score, ai_analysis, url, date_posted, source
+        FROM jobs
+        WHERE ai_score BETWEEN %s AND %s
+        ORDER BY ai_score DESC, created_at DESC
+        LIMIT %s
+    ''', (70, 100, 50)),
+    ("cards_newest", '''
+        SELECT id, title, company, location, ai_score, ai_analysis, url, date_posted, source
+        FROM jobs
+        WHERE ai_score BETWEEN %s AND %s
+        ORDER BY created_at DESC, ai_score DESC
+        LIMIT %s
+    ''', (0, 100, 50)),
+    ("get_all_jobs", '''
+        SELECT * FROM jobs
+        WHERE status = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    ''', ('new', 100)),
+    ("cleanup_candidates", '''
+        SELECT id FROM jobs
+        WHERE created_at < NOW() - INTERVAL '30 days'
+        OR ai_score < 40
+    ''', ()),
+]
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    path: str
+    sql: str
+    checksum: str
+    transactional: bool
+
+
+def connect(dsn: Optional[str] = None):
+    dsn = dsn or os.getenv("DATABASE_URL")
+    if dsn:
+        return psycopg2.connect(dsn)
+    return psycopg2.connect(
+        dbname=os.environ.get("DBNAME"),
+        user=os.environ.get("DB_USERNAME"),
+        password=os.environ.get("PASSWORD"),
+        host=os.environ.get("HOST"),
+        port=os.environ.get("DB_PORT"),
+        sslmode=os.environ.get("DB_SSLMODE", "require"),
+    )
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        m = re.match(r"^(\d{4})_(\w+)\.sql$", filename)
+        if not m:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+        migrations.append(Migration(
+            version=m.group(1),
+            name=m.group(2),
+            path=path,
+            sql=sql,
+            checksum=hashlib.sha256(sql.encode()).hexdigest(),
+            transactional=not sql.lstrip().startswith(NO_TRANSACTION_MARKER),
+        ))
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a migration on `;`. Comment lines are dropped; statements must not contain `;` in literals."""
+    body = "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+    return [s.strip() for s in body.split(";") if s.strip()]
+
+
+def ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                duration_ms INTEGER,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        ''')
+    conn.commit()
+
+
+def applied_migrations(conn) -> Dict[str, Dict]:
+    ensure_migrations_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+        rows = cur.fetchall()
+    conn.commit()
+    return {v: {"name": n, "checksum": c, "applied_at": a} for v, n, c, a in rows}
+
+
+def _invalid_indexes(conn) -> List[str]:
+    with conn.cursor() as cur:
+        cur.execute('''
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace
+        ''')
+        return [r[0] for r in cur.fetchall()]
+
+
+def apply_migration(conn, migration: Migration):
+    started = time.perf_counter()
+    if migration.transactional:
+        with conn.cursor() as cur:
+            cur.execute(migration.sql)
+    else:
+        # CREATE INDEX CONCURRENTLY refuses to run inside a transaction block.
+        conn.commit()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for statement in split_statements(migration.sql):
+                    cur.execute(statement)
+            invalid = _invalid_indexes(conn)
+        finally:
+            conn.autocommit = False
+        if invalid:
+            raise RuntimeError(f"{migration.version}_{migration.name} left invalid indexes {invalid}; "
+                               "DROP INDEX CONCURRENTLY them and run the migration again")
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    with conn.cursor() as cur:
+        cur.execute('''
+            INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+            VALUES (%s, %s, %s, %s)
+        ''', (migration.version, migration.name, migration.checksum, duration_ms))
+    conn.commit()
+    return duration_ms
+
+
+def migrate_up(conn, target: Optional[str] = None, verbose: bool = True, transactional_only: bool = False) -> List[str]:
+    """Apply pending migrations up to and including `target`. Returns the applied versions.
+
+    `transactional_only` skips the no-transaction (index) migrations; `bench` uses it for its baseline.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATE_LOCK_KEY,))
+    conn.commit()
+    try:
+        done = applied_migrations(conn)
+        applied = []
+        for migration in load_migrations():
+            if target and migration.version > target:
+                break
+            if migration.version in done:
+                if done[migration.version]["checksum"] != migration.checksum:
+                    print(f"Warning: {migration.version}_{migration.name} changed after it was applied")
+                continue
+            if transactional_only and not migration.transactional:
+                continue
+            if verbose:
+                print(f"Applying {migration.version}_{migration.name} ...")
+            duration_ms = apply_migration(conn, migration)
+            if verbose:
+                print(f"Applied {migration.version}_{migration.name} in {duration_ms} ms")
+            applied.append(migration.version)
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATE_LOCK_KEY,))
+        conn.commit()
+
+
+def print_status(conn):
+    done = applied_migrations(conn)
+    for migration in load_migrations():
+        row = done.get(migration.version)
+        if not row:
+            state = "pending"
+        elif row["checksum"] != migration.checksum:
+            state = f"applied {row['applied_at']:%Y-%m-%d %H:%M} (file changed since)"
+        else:
+            state = f"applied {row['applied_at']:%Y-%m-%d %H:%M}"
+        print(f"{migration.version}_{migration.name:<30} {state}")
+
+
+def _plan_nodes(plan: Dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain_hot_queries(conn, force_index: bool = False) -> List[Dict]:
+    """EXPLAIN every hot query and report whether it reads `jobs` through an index.
+
+    With `force_index` sequential scans are disabled, which checks that a usable index exists even
+    on a table small enough for the planner to prefer scanning it.
+    """
+    results = []
+    with conn.cursor() as cur:
+        if force_index:
+            cur.execute("SET LOCAL enable_seqscan = off")
+        for name, sql, params in HOT_QUERIES:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0][0]["Plan"] # type: ignore
+            nodes = list(_plan_nodes(plan))
+            indexes = [n["Index Name"] for n in nodes if "Index Name" in n]
+            seq_scans = [n for n in nodes if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == "jobs"]
+            results.append({
+                "query": name,
+                "uses_index": bool(indexes) and not seq_scans,
+                "indexes": indexes,
+                "plan": plan["Node Type"],
+                "cost": plan["Total Cost"],
+            })
+    conn.rollback()
+    return results
+
+
+def print_explain(results: List[Dict]) -> bool:
+    ok = True
+    for r in results:
+        mark = "ok  " if r["uses_index"] else "SEQ "
+        ok = ok and r["uses_index"]
+        print(f"{mark} {r['query']:<20} {r['plan']:<18} cost={r['cost']:<10} {', '.join(r['indexes']) or '-'}")
+    return ok
+
+
+def time_hot_queries(conn, runs: int = 20) -> Dict[str, Dict]:
+    timings = {}
+    with conn.cursor() as cur:
+        for name, sql, params in HOT_QUERIES:
+            samples = []
+            for i in range(runs + 2):
+                started = time.perf_counter()
+                cur.execute(sql, params)
+                cur.fetchall()
+                if i >= 2:
+                    samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            timings[name] = {
+                "p50_ms": round(statistics.median(samples), 2),
+                "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2),
+            }
+    conn.rollback()
+    return timings
+
+
+def seed_jobs(conn, rows: int):
+    """Fill `jobs` with synthetic rows shaped like production: inserted in created_at order over 31 days,
+    mostly scored, a thin recent tail still waiting for the scorer."""
+    with conn.cursor() as cur:
+        cur.execute('''
+            INSERT INTO jobs (
+                job_hash, title, company, location, url, salary, description, date_posted, tags,
+                source, search_keyword, scraped_at, status, ai_score, ai_analysis, created_at, scoring_state
+            )
+            SELECT md5(g::text),
+                   'Backend Engineer ' || g,
+                   'Company ' || (g %% 5000),
+                   'Taipei',
+                   'https://example.com/jobs/' || g,
+                   'Not specified',
+                   repeat('python postgres docker ', 8),
+                   'Unknown',
+                   '["python"]'::jsonb,
+                   CASE WHEN g %% 3 = 0 THEN 'RemoteOK' ELSE '104.com.tw' END,
+                   'python',
+                   '',
+                   CASE WHEN r.s < 0.85 THEN 'new' WHEN r.s < 0.95 THEN 'interested' ELSE 'applied' END,
+                   CASE WHEN g > %(rows)s * 0.98 THEN 0
+                        WHEN r.a < 0.05 THEN 1 + floor(r.t * 39)::int
+                        ELSE 40 + floor(r.t * 61)::int END,
+                   'seeded',
+                   NOW() - (%(rows)s - g) * INTERVAL '31 days' / %(rows)s,
+                   CASE WHEN g > %(rows)s * 0.98 THEN 'pending' ELSE 'done' END
+            FROM generate_series(1, %(rows)s) AS g,
+                 LATERAL (SELECT random() + g * 0 AS s, random() + g * 0 AS t, random() + g * 0 AS a) AS r
+        ''', {"rows": rows})
+        cur.execute("ANALYZE jobs")
+    conn.commit()
+
+
+def bench(conn, sizes: List[int], runs: int = 20) -> List[Dict]:
+    """Time the hot queries before and after the index migrations on a scratch schema.
+
+    Each size gets a fresh `migrate_bench` schema, so the real `jobs` table is never touched.
+    """
+    results = []
+    try:
+        for rows in sizes:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+                cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+                cur.execute(f"SET search_path TO {BENCH_SCHEMA}")
+            conn.commit()
+
+            migrate_up(conn, verbose=False, transactional_only=True)
+            started = time.perf_counter()
+            seed_jobs(conn, rows)
+            print(f"\n{rows:,} rows seeded in {time.perf_counter() - started:.1f}s")
+            before = time_hot_queries(conn, runs)
+
+            started = time.perf_counter()
+            migrate_up(conn, verbose=False)
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE jobs")
+            conn.commit()
+            print(f"indexes built in {time.perf_counter() - started:.1f}s")
+            after = time_hot_queries(conn, runs)
+            plans = {r["query"]: r for r in explain_hot_queries(conn)}
+
+            print(f"{'query':<20} {'before p50':>11} {'after p50':>10} {'after p95':>10} {'speedup':>8}  index")
+            for name, _, _ in HOT_QUERIES:
+                b, a, p = before[name], after[name], plans[name]
+                speedup = b["p50_ms"] / a["p50_ms"] if a["p50_ms"] else float("inf")
+                print(f"{name:<20} {b['p50_ms']:>9.2f}ms {a['p50_ms']:>8.2f}ms {a['p95_ms']:>8.2f}ms "
+                      f"{speedup:>7.1f}x  {', '.join(p['indexes']) if p['uses_index'] else 'SEQ SCAN'}")
+                results.append({"rows": rows, "query": name, "before": b, "after": a,
+                                "uses_index": p["uses_index"], "indexes": p["indexes"]})
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            cur.execute("SET search_path TO DEFAULT")
+        conn.commit()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Versioned schema migrations for the jobs database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    up = sub.add_parser("up", help="apply pending migrations")
+    up.add_argument("--to", dest="target", help="stop after this version")
+    sub.add_parser("status", help="list applied and pending migrations")
+    explain = sub.add_parser("explain", help="check that each hot query is served by an index")
+    explain.add_argument("--force-index", action="store_true", help="disable seq scans (for small tables)")
+    bench_cmd = sub.add_parser("bench", help="time hot queries before/after the indexes on synthetic data")
+    bench_cmd.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    bench_cmd.add_argument("--runs", type=int, default=20)
+    bench_cmd.add_argument("--output", help="write results as JSON")
+
+    args = parser.parse_args(argv)
+    conn = connect()
+    try:
+        if args.command == "up":
+            applied = migrate_up(conn, target=args.target)
+            print(f"{len(applied)} migration(s) applied" if applied else "Database is up to date")
+        elif args.command == "status":
+            print_status(conn)
+        elif args.command == "explain":
+            if not print_explain(explain_hot_queries(conn, force_index=args.force_index)):
+                return 1
+        elif args.command == "bench":
+            results = bench(conn, args.rows, args.runs)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    json.dump(results, f, indent=2)
+            if not all(r["uses_index"] for r in results):
+                return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
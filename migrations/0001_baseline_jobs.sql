@@ -0,0 +1,20 @@
+-- Baseline: the jobs table as created by hand on Supabase. A no-op on existing databases.
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    job_hash TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    company TEXT,
+    location TEXT,
+    url TEXT,
+    salary TEXT,
+    description TEXT,
+    date_posted TEXT,
+    tags JSONB DEFAULT '[]'::jsonb,
+    source TEXT,
+    search_keyword TEXT,
+    scraped_at TEXT,
+    status TEXT DEFAULT 'new',
+    ai_score INTEGER DEFAULT 0,
+    ai_analysis TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,20 @@
+-- migrate: no-transaction
+-- Indexes for the hot read paths. Built CONCURRENTLY so the scraper and dashboard keep writing.
+
+-- job_agent.get_unscored_jobs: status = 'new' AND ai_score = 0 ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_unscored_created_idx
+    ON jobs (created_at DESC)
+    WHERE status = 'new' AND ai_score = 0;
+
+-- get_jobs_by_score, dashboard cards sorted by score: ai_score range ORDER BY ai_score, created_at
+-- cleanup_job.py: the ai_score < 40 arm of the OR
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_score_created_idx
+    ON jobs (ai_score DESC, created_at DESC);
+
+-- dashboard cards sorted by date, cleanup_job.py: the created_at < cutoff arm of the OR
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_created_idx
+    ON jobs (created_at DESC);
+
+-- get_all_jobs, iter_jobs, export: status = %s ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_status_created_idx
+    ON jobs (status, created_at DESC);
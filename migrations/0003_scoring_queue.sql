@@ -0,0 +1,9 @@
+-- Scoring work queue: scorers claim rows with FOR UPDATE SKIP LOCKED instead of polling ai_score = 0.
+-- pending -> in_progress (leased via claimed_at) -> done, or dead after too many failed attempts.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS scoring_state TEXT NOT NULL DEFAULT 'pending';
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS scoring_attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS last_scoring_error TEXT;
+
+UPDATE jobs SET scoring_state = 'done' WHERE ai_score <> 0 AND scoring_state = 'pending';
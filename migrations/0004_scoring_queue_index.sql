@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- JobDatabase.claim_unscored_jobs: pending rows newest first, plus in_progress rows whose lease ran out.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS jobs_scoring_queue_idx
+    ON jobs (created_at DESC)
+    WHERE status = 'new' AND scoring_state IN ('pending', 'in_progress');
+
+-- Replaced by jobs_scoring_queue_idx; nothing polls ai_score = 0 any more.
+DROP INDEX CONCURRENTLY IF EXISTS jobs_unscored_created_idx;
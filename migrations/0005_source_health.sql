@@ -0,0 +1,18 @@
+-- Per-source scrape health and circuit breaker, shared by every scraper process and shown on the dashboard.
+-- closed -> open after repeated failures -> half_open (one probe keyword) after the cool-down -> closed or open.
+CREATE TABLE IF NOT EXISTS source_health (
+    source TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'closed',
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    runs INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    success_rate REAL NOT NULL DEFAULT 1,
+    avg_latency REAL,
+    cards_per_page REAL,
+    last_jobs INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    last_success_at TIMESTAMPTZ,
+    last_failure_at TIMESTAMPTZ,
+    opened_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,24 @@
+-- One row per scrape or scoring run, written by run_history.RunRecorder and read by the dashboard's trends tab.
+-- stages maps a pipeline stage (scrape, save, score) to the seconds the run spent in it.
+CREATE TABLE IF NOT EXISTS runs (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    host TEXT,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ NOT NULL,
+    duration REAL NOT NULL,
+    stages JSONB NOT NULL DEFAULT '{}',
+    scraped INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    scored INTEGER NOT NULL DEFAULT 0,
+    llm_failures INTEGER NOT NULL DEFAULT 0,
+    input_tokens BIGINT NOT NULL DEFAULT 0,
+    output_tokens BIGINT NOT NULL DEFAULT 0,
+    errors JSONB NOT NULL DEFAULT '[]'
+);
+
+-- The trends tab always asks for a time range, optionally for one kind of run.
+CREATE INDEX IF NOT EXISTS runs_started_at_idx ON runs (started_at DESC);
+CREATE INDEX IF NOT EXISTS runs_kind_started_at_idx ON runs (kind, started_at DESC);
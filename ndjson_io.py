@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import gzip
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+READ_CHUNK = 1 << 16
+
+
+def detect_compression(path: str, compression: Optional[str] = None) -> Optional[str]:
+    if compression:
+        return None if compression == "none" else compression
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst") or path.endswith(".zstd"):
+        return "zstd"
+    return None
+
+
+def open_text(path: str, mode: str = "rt", compression: Optional[str] = None):
+    """Open `path` as a UTF-8 text stream, transparently (de)compressing gzip or zstd."""
+    compression = detect_compression(path, compression)
+    if "t" not in mode:
+        mode += "t"
+    if compression == "gzip":
+        return gzip.open(path, mode, encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.open(path, mode, encoding="utf-8")
+    if compression:
+        raise ValueError(f"Unknown compression: {compression}")
+    return open(path, mode, encoding="utf-8")
+
+
+class NDJSONWriter:
+    """Writes one JSON document per line as records arrive, so memory does not grow with the output."""
+
+    def __init__(self, path: str, compression: Optional[str] = None, append: bool = False):
+        self.path = path
+        self.count = 0
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._f = open_text(path, "at" if append else "wt", compression)
+
+    def write(self, record: Dict):
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str))
+        self._f.write("\n")
+        self.count += 1
+
+    def write_many(self, records: Iterable[Dict]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_ndjson(records: Iterable[Dict], path: str, compression: Optional[str] = None) -> int:
+    with NDJSONWriter(path, compression=compression) as w:
+        return w.write_many(records)
+
+
+def iter_ndjson(path: str, compression: Optional[str] = None) -> Iterator[Dict]:
+    with open_text(path, "rt", compression) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_json_array(path: str, compression: Optional[str] = None, chunk_size: int = READ_CHUNK) -> Iterator[Dict]:
+    """Lazily yield the objects of a top-level JSON array, e.g. an old `json.dump(indent=2)` export."""
+    decoder = json.JSONDecoder()
+    with open_text(path, "rt", compression) as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    if started:
+                        raise ValueError(f"{path}: unterminated JSON array")
+                    return
+                buf = buf[pos:] + f.read(chunk_size)
+                pos = 0
+                eof = pos >= len(buf)
+                continue
+
+            ch = buf[pos]
+            if not started:
+                if ch != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if ch == ",":
+                pos += 1
+                continue
+            if ch == "]":
+                return
+
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # A number cut by the chunk boundary decodes as a shorter one (`22` of `223`, `1` of `1e-07`);
+                # only a following delimiter proves the value is complete.
+                delimited = end < len(buf) and buf[end] in ",] \t\r\n"
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                obj, end, delimited = None, len(buf), False
+            if not delimited and end < len(buf) and eof:
+                raise ValueError(f"{path}: unexpected {buf[end]!r} after an array element")
+            if not delimited and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield obj
+            pos = end
+            if pos > chunk_size:
+                buf = buf[pos:]
+                pos = 0
+
+
+def iter_records(path: str, compression: Optional[str] = None) -> Iterator[Dict]:
+    """Read either NDJSON or a JSON array dump, deciding from the first non-blank character."""
+    with open_text(path, "rt", compression) as f:
+        head = f.read(64).lstrip()
+    if head.startswith("["):
+        return iter_json_array(path, compression)
+    return iter_ndjson(path, compression)
+
+
+def convert_json_to_ndjson(src: str, dst: str, compression: Optional[str] = None) -> int:
+    return write_ndjson(iter_json_array(src), dst, compression=compression)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("usage: python ndjson_io.py convert <src.json> <dst.jsonl[.gz|.zst]>")
+        sys.exit(2)
+
+    src, dst = sys.argv[2], sys.argv[3]
+    n = convert_json_to_ndjson(src, dst)
+    print(f"Converted {n} records: {src} ({os.path.getsize(src)} bytes) -> {dst} ({os.path.getsize(dst)} bytes)")
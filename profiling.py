@@ -0,0 +1,210 @@
+import os
+import io
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import functools
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app_logging import get_logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+# cprofile: exact call counts and times of the profiled thread; sample: stacks of every thread (browsers,
+# source threads) as collapsed-stack flamegraph input; both: the two side by side.
+PROFILE_MODE = os.getenv("PROFILE_MODE", "both")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_RETENTION_DAYS = float(os.getenv("PROFILE_RETENTION_DAYS", "7"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "300"))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))
+
+log = get_logger(__name__)
+
+# cProfile hooks are per thread, so each thread profiles its outermost profiled() only (a run scoring its
+# jobs, or concurrent callbacks on the event loop, stay inside the first profile). The sampler sees every
+# thread, so only one runs per process.
+_local = threading.local()
+_sampling = threading.Lock()
+_enabled = PROFILE_ENABLED
+
+
+def enable(directory: Optional[str] = None):
+    """Turn profiling on for this process and for worker processes it spawns later (--profile)."""
+    global _enabled, PROFILE_DIR
+    _enabled = True
+    os.environ["PROFILE_ENABLED"] = "1"
+    if directory:
+        PROFILE_DIR = directory
+        os.environ["PROFILE_DIR"] = directory
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    os.environ["PROFILE_ENABLED"] = "0"
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of every thread but its own, counted as collapsed stacks (`root;...;leaf count`)."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(f"thread:{names.get(ident, ident)}")
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def purge(directory: Optional[str] = None, retention_days: float = PROFILE_RETENTION_DAYS,
+          max_files: int = PROFILE_MAX_FILES) -> int:
+    """Delete profile files older than the retention, then the oldest beyond `max_files`."""
+    directory = directory or PROFILE_DIR
+    try:
+        files = sorted((os.path.join(directory, f) for f in os.listdir(directory)), key=os.path.getmtime)
+    except OSError:
+        return 0
+    cutoff = time.time() - retention_days * 86400
+    doomed = [f for f in files if os.path.getmtime(f) < cutoff]
+    keep = [f for f in files if f not in doomed]
+    doomed += keep[:max(len(keep) - max_files, 0)]
+    for path in doomed:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(doomed)
+
+
+class profiled:
+    """cProfile and/or sample one run or callback when profiling is on; otherwise a no-op.
+
+        with profiled("scrape"): ...
+
+        @profiled("callback:refresh_all")
+        async def refresh_all(...): ...
+
+    Writes `<name>-<timestamp>-<pid>` .prof (pstats, e.g. for snakeviz), .txt (top functions by cumulative
+    time) and .collapsed (flamegraph.pl / speedscope input) into PROFILE_DIR. For async callbacks cProfile also
+    counts whatever else ran on the event loop meanwhile; threads started inside are only in the .collapsed.
+    """
+
+    def __init__(self, name: str, mode: str = PROFILE_MODE):
+        self.name = name
+        self.mode = mode
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._started = 0.0
+        self._owner = False
+        self.paths: List[str] = []
+
+    def __enter__(self):
+        if not _enabled or getattr(_local, "active", False):
+            return self
+        _local.active = self._owner = True
+        self._started = time.perf_counter()
+        if self.mode in ("sample", "both") and _sampling.acquire(blocking=False):
+            self._sampler = StackSampler()
+            self._sampler.start()
+        if self.mode in ("cprofile", "both"):
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._owner:
+            return False
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+            if self._sampler is not None:
+                self._sampler.stop()
+            if self._profile is not None or self._sampler is not None:
+                self._write(time.perf_counter() - self._started)
+        except Exception as e:
+            log.warning("Could not write profile of %s: %s", self.name, e)
+        finally:
+            if self._sampler is not None:
+                _sampling.release()
+            _local.active = self._owner = False
+        return False
+
+    def _write(self, elapsed: float):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.name)
+        base = os.path.join(PROFILE_DIR, f"{safe}-{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}")
+        if self._profile is not None:
+            self._profile.dump_stats(base + ".prof")
+            out = io.StringIO()
+            out.write(f"{self.name}: {elapsed:.2f}s wall\n\n")
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(out.getvalue())
+            self.paths += [base + ".prof", base + ".txt"]
+        if self._sampler is not None:
+            with open(base + ".collapsed", "w", encoding="utf-8") as f:
+                f.write(self._sampler.collapsed())
+            self.paths.append(base + ".collapsed")
+        purge()
+        log.info("Profiled %s (%.1fs): %s", self.name, elapsed, ", ".join(os.path.basename(p) for p in self.paths))
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with profiled(self.name, self.mode):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiled(self.name, self.mode):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def recent_profiles(limit: int = 50) -> List[Dict]:
+    try:
+        files = sorted(os.listdir(PROFILE_DIR), key=lambda f: os.path.getmtime(os.path.join(PROFILE_DIR, f)), reverse=True)
+    except OSError:
+        return []
+    return [{"file": f, "bytes": os.path.getsize(os.path.join(PROFILE_DIR, f))} for f in files[:limit]]
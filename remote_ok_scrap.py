@@ -4,6 +4,11 @@ import json
 from datetime import datetime
 import time
 import re
+from ndjson_io import write_ndjson
+from profiling import profiled
+from app_logging import get_logger
+
+log = get_logger(__name__)
 
 class RemoteOkScraper:
     def __init__(self) -> None:
@@ -37,8 +42,9 @@ class RemoteOkScraper:
                     return True
         return False
     
+    @profiled("remoteok_scrape_jobs")
     def scrape_jobs(self, keywords=None, min_keywords_match=2,junior_only=True, require_skill_match = True):
-        print("scraping remoteok ...")
+        log.info("scraping remoteok ...")
         
         try:
             response = requests.get(self.base_url, headers=self.headers, timeout=15)
@@ -153,17 +159,23 @@ class RemoteOkScraper:
                     }
                     filtered_jobs.append(job_info)
                     
-            print(f"Found {len(filtered_jobs)} relevant jobs from RemoteOK")
+            log.info("Found %d relevant jobs from RemoteOK", len(filtered_jobs))
             return filtered_jobs
         
         except Exception as e:
-            print(f"Error scraping RemoteOK: {e}")
-            return []
+            # Let the caller see the failure; an empty list would look like a quiet day.
+            log.error("Error scraping RemoteOK: %s", e)
+            raise
     
     def save_to_json(self,jobs, filename='remoteok_jobs.json'):
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(jobs, f, indent=2, ensure_ascii= False)
-        print(f"Saved {len(jobs)} jobs to {filename}")
+        log.info("Saved %d jobs to %s", len(jobs), filename)
+
+    def save_to_ndjson(self, jobs, filename='remoteok_jobs.jsonl.gz'):
+        count = write_ndjson(jobs, filename)
+        log.info("Saved %d jobs to %s", count, filename)
+        return count
         
 
 if __name__ == "__main__":
@@ -178,8 +190,8 @@ if __name__ == "__main__":
         print(f"   Tags: {', '.join(job['tags'][:5])}")
         print(f"   URL: {job['url']}\n")
         
-    scraper.save_to_json(jobs)
+    scraper.save_to_ndjson(jobs)
     
     print(f"\n Total jobs found: {len(jobs)}")
-    print("Check 'remoteok_jobs.json' for full results")
+    print("Check 'remoteok_jobs.jsonl.gz' for full results")
         
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+import time
+import socket
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from metrics import registry, STAGE_SECONDS
+from app_logging import get_logger
+
+RUN_HISTORY_ENABLED = os.getenv("RUN_HISTORY_ENABLED", "1") == "1"
+RUN_COUNTS = ("scraped", "inserted", "duplicates", "scored", "llm_failures", "input_tokens", "output_tokens")
+# Registered by job_agent; read here by name so recording a scrape run does not import the LLM stack.
+LLM_TOKENS_METRIC = "job_agent_llm_tokens_total"
+LLM_ERRORS_METRIC = "job_agent_llm_errors_total"
+
+log = get_logger(__name__)
+
+
+def _counter_delta(before: Dict, after: Dict, name: str) -> Dict[str, float]:
+    old, new = before.get(name, {}), after.get(name, {})
+    return {key: value - old.get(key, 0) for key, value in new.items() if value != old.get(key, 0)}
+
+
+def _stage_delta(before: Dict, after: Dict) -> Dict[str, float]:
+    old, new = before.get(STAGE_SECONDS.name, {}), after.get(STAGE_SECONDS.name, {})
+    stages = {}
+    for key, s in new.items():
+        seconds = s["sum"] - old.get(key, {}).get("sum", 0)
+        if s["count"] > old.get(key, {}).get("count", 0):
+            stages[key.split("=", 1)[-1]] = round(seconds, 3)
+    return stages
+
+
+class RunRecorder:
+    """Write one run of a runner into the `runs` table when it finishes.
+
+        with RunRecorder("scrape", db) as run:
+            ...
+            run.add(inserted=new, duplicates=dup)
+
+    Counts come from the runner through add(); stage seconds, LLM tokens and LLM failures are what this
+    process's metrics gained during the run, so two runs overlapping in one process share them.
+    A failed insert is logged and never fails the run.
+    """
+
+    def __init__(self, kind: str, db=None, enabled: bool = RUN_HISTORY_ENABLED):
+        self.kind = kind
+        self.db = db
+        self.enabled = enabled
+        self.status = "ok"
+        self.counts = dict.fromkeys(RUN_COUNTS, 0)
+        self.errors: List[str] = []
+        self.started_at: Optional[datetime] = None
+        self._started = 0.0
+        self._before: Dict = {}
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] += int(value or 0)
+
+    def error(self, message: str):
+        self.errors.append(str(message)[:500])
+
+    def start(self) -> "RunRecorder":
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._before = registry.snapshot()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.status = "error"
+            self.error(f"{exc_type.__name__}: {exc}")
+        self.finish()
+        return False
+
+    def row(self) -> Dict:
+        after = registry.snapshot()
+        tokens = _counter_delta(self._before, after, LLM_TOKENS_METRIC)
+        by_direction = {"input": 0.0, "output": 0.0}
+        for key, value in tokens.items():
+            labels = dict(part.split("=", 1) for part in key.split(",") if "=" in part)
+            if labels.get("direction") in by_direction:
+                by_direction[labels["direction"]] += value
+        self.add(input_tokens=by_direction["input"], output_tokens=by_direction["output"],
+                 llm_failures=sum(_counter_delta(self._before, after, LLM_ERRORS_METRIC).values()))
+        return {
+            "kind": self.kind,
+            "status": self.status,
+            "host": socket.gethostname(),
+            "started_at": self.started_at,
+            "finished_at": datetime.now(timezone.utc),
+            "duration": round(time.perf_counter() - self._started, 3),
+            "stages": _stage_delta(self._before, after),
+            **self.counts,
+            "errors": self.errors,
+        }
+
+    def finish(self) -> Optional[int]:
+        if not self.enabled or self.started_at is None:
+            return None
+        try:
+            row = self.row()
+            if self.db is None:
+                from jobdb import JobDatabase
+                self.db = JobDatabase()
+            run_id = self.db.record_run(row)
+            log.info("Recorded %s run %s: %s in %.1fs", self.kind, run_id, row["status"], row["duration"])
+            return run_id
+        except Exception as e:
+            log.warning("Could not record %s run: %s", self.kind, e)
+            return None
@@ -0,0 +1,250 @@
+import os
+import time
+import socket
+import threading
+from datetime import datetime
+from typing import Optional
+
+import psycopg2
+from dotenv import load_dotenv
+
+from app_logging import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+load_dotenv()
+
+log = get_logger(__name__)
+
+RUN_LOCK_BACKEND = os.getenv("RUN_LOCK_BACKEND", "auto")
+RUN_LOCK_DIR = os.getenv("RUN_LOCK_DIR", os.path.join(os.getenv("DATA_DIR", "/tmp/data"), "locks"))
+RUN_LOCK_HEARTBEAT_SECONDS = float(os.getenv("RUN_LOCK_HEARTBEAT_SECONDS", "15"))
+# TCP keepalive settings for the lock connection: a holder whose host vanishes loses the lock after
+# roughly idle + interval * count seconds instead of whenever the server notices on its own.
+RUN_LOCK_KEEPALIVE_IDLE = int(os.getenv("RUN_LOCK_KEEPALIVE_IDLE", "20"))
+RUN_LOCK_KEEPALIVE_INTERVAL = int(os.getenv("RUN_LOCK_KEEPALIVE_INTERVAL", "10"))
+RUN_LOCK_KEEPALIVE_COUNT = int(os.getenv("RUN_LOCK_KEEPALIVE_COUNT", "3"))
+
+ADVISORY_NAMESPACE = 20_240_613  # first key of pg_try_advisory_lock(int, int); the second is hashtext(name)
+
+
+class LockHeld(Exception):
+    pass
+
+
+class RunLock:
+    """Named, non-reentrant lock around one pipeline stage.
+
+    Different names never block each other, so e.g. cleanup can run while a scrape is in progress.
+    `lost` is set if the lock can no longer be guaranteed (the lock connection died mid-run).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.lost = threading.Event()
+        self.held = False
+
+    def _try_acquire(self) -> bool:
+        raise NotImplementedError
+
+    def _release(self):
+        raise NotImplementedError
+
+    def holder(self) -> Optional[str]:
+        """Best-effort description of whoever holds the lock now."""
+        return None
+
+    def acquire(self, timeout: float = 0, poll_interval: float = 1.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._try_acquire():
+                self.held = True
+                self.lost.clear()
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self._release()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise LockHeld(f"run lock '{self.name}' is held by {self.holder() or 'another process'}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FileRunLock(RunLock):
+    """`fcntl.flock` on RUN_LOCK_DIR/<name>.lock.
+
+    The kernel drops the lock the moment the holder exits, however it exits, so there is no stale lock
+    to time out. Only covers processes that share the filesystem (one host or one volume).
+    """
+
+    def __init__(self, name: str, directory: str = RUN_LOCK_DIR):
+        super().__init__(name)
+        if fcntl is None:
+            raise RuntimeError("file run locks need fcntl; use RUN_LOCK_BACKEND=postgres")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.lock")
+        self._fd: Optional[int] = None
+
+    def _try_acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB) # type: ignore
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{self.owner} since {datetime.now().isoformat(timespec='seconds')}\n".encode())
+        self._fd = fd
+        return True
+
+    def _release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN) # type: ignore
+            os.close(self._fd)
+            self._fd = None
+
+    def holder(self) -> Optional[str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+
+class PostgresRunLock(RunLock):
+    """Session-level advisory lock held on a dedicated connection.
+
+    Postgres releases the lock when the session ends, so a crashed holder frees it immediately and a
+    vanished host frees it once TCP keepalives give up. A heartbeat thread pings the connection to keep
+    it from being reaped as idle and sets `lost` if it breaks.
+    Needs a session-mode connection: a transaction-mode pooler (Supabase :6543) cannot hold session locks.
+    """
+
+    def __init__(self, name: str, dsn: Optional[str] = None, heartbeat_seconds: float = RUN_LOCK_HEARTBEAT_SECONDS):
+        super().__init__(name)
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.heartbeat_seconds = heartbeat_seconds
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def _connect(self):
+        kwargs = dict(
+            application_name=f"run_lock:{self.name}:{self.owner}"[:63],
+            keepalives=1,
+            keepalives_idle=RUN_LOCK_KEEPALIVE_IDLE,
+            keepalives_interval=RUN_LOCK_KEEPALIVE_INTERVAL,
+            keepalives_count=RUN_LOCK_KEEPALIVE_COUNT,
+            connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "3")),
+        )
+        if self.dsn:
+            conn = psycopg2.connect(self.dsn, **kwargs)
+        else:
+            conn = psycopg2.connect(
+                dbname=os.environ.get("DBNAME"),
+                user=os.environ.get("DB_USERNAME"),
+                password=os.environ.get("PASSWORD"),
+                host=os.environ.get("HOST"),
+                port=os.environ.get("DB_PORT"),
+                sslmode=os.environ.get("DB_SSLMODE", "require"),
+                **kwargs,
+            )
+        conn.autocommit = True
+        return conn
+
+    def _try_acquire(self) -> bool:
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s))", (ADVISORY_NAMESPACE, self.name))
+                got = cur.fetchone()[0] # type: ignore
+        except Exception:
+            conn.close()
+            raise
+        if not got:
+            conn.close()
+            return False
+
+        self._conn = conn
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name=f"run-lock-{self.name}", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                with self._conn_lock:
+                    with self._conn.cursor() as cur: # type: ignore
+                        cur.execute("SELECT 1")
+            except Exception as e:
+                log.error("Run lock '%s' lost: %s", self.name, e)
+                self.lost.set()
+                return
+
+    def _release(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(5)
+            self._heartbeat = None
+        with self._conn_lock:
+            if self._conn is not None:
+                try:
+                    with self._conn.cursor() as cur:
+                        cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s))", (ADVISORY_NAMESPACE, self.name))
+                except Exception:
+                    pass  # closing the session releases it anyway
+                finally:
+                    self._conn.close()
+                    self._conn = None
+
+    def holder(self) -> Optional[str]:
+        try:
+            conn = self._connect()
+        except Exception:
+            return None
+        try:
+            with conn.cursor() as cur:
+                cur.execute('''
+                    SELECT a.application_name, a.client_addr, a.backend_start
+                    FROM pg_locks l
+                    JOIN pg_stat_activity a ON a.pid = l.pid
+                    WHERE l.locktype = 'advisory' AND l.granted
+                      AND l.classid = %s::int::oid AND l.objid = hashtext(%s)::oid AND l.objsubid = 2
+                ''', (ADVISORY_NAMESPACE, self.name))
+                row = cur.fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        app, addr, started = row
+        return f"{app or 'unknown'} from {addr or 'local'} since {started:%Y-%m-%d %H:%M:%S}"
+
+
+def run_lock(name: str, backend: str = RUN_LOCK_BACKEND) -> RunLock:
+    """Build the lock for a pipeline stage.
+
+    `auto` picks Postgres whenever a database is configured, because that is what the GitHub Actions
+    runner and the docker scheduler share; otherwise it falls back to a local file lock.
+    """
+    if backend == "auto":
+        backend = "postgres" if (os.getenv("DATABASE_URL") or os.getenv("HOST")) else "file"
+    if backend == "postgres":
+        return PostgresRunLock(name)
+    if backend == "file":
+        return FileRunLock(name)
+    raise ValueError(f"unknown RUN_LOCK_BACKEND {backend!r}")
@@ -1,14 +1,41 @@
 import os
+import argparse
+import profiling
 from job_agent import JobMatcherAgent
+from llm_backends import LLM_BACKEND
 from jobdb import JobDatabase
+from run_history import RunRecorder
+from metrics import stage, write_run_summary
+from app_logging import get_logger
 
-def main():
-    print("Starting AI job scorer...")
-    print("="*60)
+log = get_logger("run_scorer")
+
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "10"))
+SCORE_MAX_BATCHES = int(os.getenv("SCORE_MAX_BATCHES", "20"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score unscored jobs in the database with the LLM")
+    parser.add_argument("--profile", action="store_true", default=profiling.enabled(),
+                        help="write cProfile and flamegraph profiles of the run into PROFILE_DIR")
+    parser.add_argument("--requeue-dead", action="store_true",
+                        help="give dead-lettered jobs a fresh set of scoring attempts before scoring")
+    parser.add_argument("--requeue-only", action="store_true", help="with --requeue-dead: requeue, then exit")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+    log.info("Starting AI job scorer...")
+
+    db = JobDatabase()
+    if args.requeue_dead:
+        log.info("Requeued %d dead-lettered jobs", db.requeue_dead_jobs())
+    log.info("Scoring queue: %s", db.scoring_queue_depth())
+    if args.requeue_only:
+        db.close()
+        return
     
     api_key = os.getenv('GOOGLE_API_KEY')
-    if not api_key:
-        print("GOOGLE_API_KEY not set!")
+    if LLM_BACKEND in ("gemini", "record") and not api_key:
+        log.error("GOOGLE_API_KEY not set!")
         exit(1)
         
     user_profile = {
@@ -29,13 +56,15 @@ def main():
         }
     }
     
-    db = JobDatabase()
     scorer = JobMatcherAgent(user_profile=user_profile)
     scorer.db = db
 
-    total_scored = scorer.process_all_jobs(batch_size=10, max_batches=20)
+    with RunRecorder("score", db) as run, stage("score"):
+        total_scored = scorer.process_all_jobs(batch_size=SCORE_BATCH_SIZE, max_batches=SCORE_MAX_BATCHES)
+        run.add(scored=total_scored)
     
-    print(f"\nScoring complete! Scored {total_scored} jobs")
+    log.info("Scoring complete! Scored %d jobs", total_scored)
+    write_run_summary("score", {"scored": total_scored})
     
     db.close()
     
@@ -1,40 +1,60 @@
 import os
-from yilingsi_scraper import Job104Scraper
+import argparse
+from sources import registry, print_source_stats
+from checkpoints import SCRAPE_RESUME
 from jobdb import JobDatabase
+from source_health import SourceHealth
+from run_history import RunRecorder
+from run_lock import run_lock, LockHeld
+import profiling
+from profiling import profiled
+from metrics import stage, write_run_summary
+from app_logging import get_logger
 
-def main():
-    print("Starting job scraper...")
-    print("="*60)
-    
-    db = JobDatabase()
-    
-    all_jobs=[]
+log = get_logger("run_scraper")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape every enabled source into the jobs database")
+    parser.add_argument("--resume", action="store_true", default=SCRAPE_RESUME,
+                        help="skip keywords and pages the last unfinished run already saved")
+    parser.add_argument("--profile", action="store_true", default=profiling.enabled(),
+                        help="write cProfile and flamegraph profiles of the run into PROFILE_DIR")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+    log.info("Starting job scraper...")
     
-    print("\nScraping 104.com.tw...")
     try:
-        scraper_104 = Job104Scraper(headless=True)
-        job104_keywords = [
-            "AI工程師 實習",
-            "前端工程師 實習", 
-            "後端工程師 實習",
-            "機器學習 實習",
-            "軟體工程師 實習"
-        ]
-        job104_jobs = scraper_104.scrape_jobs(job104_keywords, max_pages=2)
-        all_jobs.extend(job104_jobs)
-        scraper_104.close()
-        print(f"104.com.tw: {len(job104_jobs)} jobs")
-    except Exception as e:
-        print(f"104 scraping failed: {e}")
-        
-    print(f"\nSaving {len(all_jobs)} jobs to Supabase...")
-    new_jobs, duplicates = db.save_jobs(all_jobs)
+        with run_lock("scrape"):
+            scrape(resume=args.resume)
+    except LockHeld as e:
+        log.warning("Skipping: %s", e)
+
+@profiled("scrape")
+def scrape(resume=False):
+    db = JobDatabase()
+    new_jobs = duplicates = 0
+
+    # Saved as each page or source completes, so a crash only loses the pages in flight.
+    def save(jobs):
+        nonlocal new_jobs, duplicates
+        with stage("save"):
+            new, dup = db.save_jobs(jobs)
+        new_jobs += new
+        duplicates += dup
     
-    print(f"\n{'='*60}")
-    print(f"Scraping complete!")
-    print(f"New jobs: {new_jobs}")
-    print(f"Duplicates: {duplicates}")
-    print(f"{'='*60}")
+    log.info("Scraping all enabled sources...")
+    with RunRecorder("scrape", db) as run:
+        with stage("scrape"):
+            source_stats = registry.run_checkpointed(save, resume=resume, health=SourceHealth(db))
+        print_source_stats(source_stats)
+        run.add(scraped=sum(st["count"] for st in source_stats.values()), inserted=new_jobs, duplicates=duplicates)
+        for name, st in source_stats.items():
+            if st["error"]:
+                run.error(f"{name}: {st['error']}")
+
+    log.info("Scraping complete! New jobs: %d, duplicates: %d", new_jobs, duplicates)
+    write_run_summary("scrape", {"new_jobs": new_jobs, "duplicates": duplicates, "sources": source_stats})
     
     db.close()
     
@@ -1,28 +1,34 @@
 import os
 import time
 import json
-import traceback
-import sqlite3
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.executors.pool import ThreadPoolExecutor
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
-import threading
-from yilingsi_scraper import Job104Scraper
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+from psycopg2.extras import RealDictCursor
+from sources import registry, Job104Source
+from checkpoints import SCRAPE_RESUME
+from keyword_schedule import ALL_KEYWORDS, SCRAPE_ADAPTIVE, YieldTracker
+from source_health import SourceHealth
+from run_history import RunRecorder
+from run_lock import run_lock
+from memory_watch import MemoryWatchdog
+from profiling import profiled
+from metrics import stage, write_run_summary
+from app_logging import get_logger
 from job_agent import JobMatcherAgent, JobDatabase
 
 SCHEDULE_CRON = {"hour" : 2, "minute" : 30}
 JOB_ID = "daily_scrape_and_score"
-LOCKFILE = "/tmp/job_scheduler.lock"
-LOG_PATH = "scheduler.log"
+# Adaptive mode: one interval job per source and keyword, ids "scrape:<source>:<keyword>".
+KEYWORD_JOB_PREFIX = "scrape:"
 
 JOBSTORE_DB = "sqlite:///apscheduler_jobs.sqlite"
 
 SCORING_BATCH_SIZE=6
 SCORING_MAX_BATCHES=10
 SCRAPE_HEADLESS=True
+# The scheduler has always walked 4 result pages of 104; the nightly runner uses SCRAPE_104_MAX_PAGES (2).
+SCRAPE_104_PAGES = 4
 
 CLEANER_MIN_SCORE = 40    
 CLEANER_MAX_AGE_DAYS = 30      
@@ -31,134 +37,114 @@ CLEANER_ACTION = "archive"
 if os.getenv("SCRAPE_HEADLESS") == "0":
     SCRAPE_HEADLESS = False
     
-_log_lock = threading.Lock()
+log = get_logger("scheduler")
 
-def scheduler_log(msg:str):
-    with _log_lock:
-        ts = datetime.now().isoformat(timespec="seconds")
-        line = f"[{ts}] {msg}"
-        print(line)
-        try:
-            with open(LOG_PATH, "a" , encoding="utf-8") as f:
-                f.write(line + "\n")
-        except Exception:
-            pass
-
-def _acquire_lock() -> bool:
-    try:
-        if os.path.exists(LOCKFILE):
-            age = time.time() - os.path.getmtime(LOCKFILE)
-            
-            if age > 60 * 60 * 6:
-                scheduler_log("Stale lock detected, removing")
-                os.remove(LOCKFILE)
-            else:
-                return False
-            
-        with open(LOCKFILE, "w") as f:
-            f.write(str(os.getpid()))
-        return True
-    
-    except Exception as e:
-        scheduler_log(f"Lock acquire error: {e}")
-        return False
+def _yield_key(source: str, job: Dict) -> str:
+    # Only 104 is searched per keyword; other sources are scraped as a whole.
+    return (job.get("search_keyword") or ALL_KEYWORDS) if source == Job104Source.name else ALL_KEYWORDS
 
-def _release_lock():
-    try:
-        if os.path.exists(LOCKFILE):
-            os.remove(LOCKFILE)
-    except Exception as e:
-        scheduler_log(f"Lock release error: {e}")
-        
-        
-def upsert_jobs_into_db(db: 'JobDatabase', jobs: List[Dict]) -> Dict:
-    conn = sqlite3.connect(db.db_name)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    
-    inserted = 0
-    skipped = 0
-    inserted_ids=[]
-    
-    for job in jobs:
-        url = job.get("url", "") or ""
-        title = (job.get("title") or "").strip()
-        company = (job.get("company") or "").strip()
-        if url:
-            cur.execute("SELECT id FROM jobs WHERE url = ? LIMIT 1", (url,))
-            if cur.fetchone():
-                skipped += 1
-                continue
-        cur.execute("SELECT id FROM jobs WHERE title = ? AND company = ? LIMIT 1", (title, company))
-        if cur.fetchone():
-            skipped += 1
-            continue
-        
-        try:
-            cur.execute("""
-                INSERT INTO jobs (title, company, location, url, salary, description, date_posted, search_keyword, source, scraped_at, ai_score, ai_analysis, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, '', 'new')
-            """, (
-                job.get("title"), job.get("company"), job.get("location"),
-                job.get("url"), job.get("salary"), job.get("description"),
-                job.get("date_posted"), job.get("search_keyword"), job.get("source"),
-                job.get("scraped_at")
-            ))
-            inserted += 1
-            inserted_ids.append(cur.lastrowid)
-        except Exception as e:
-            scheduler_log(f"DB insert error for job {title[:40]}: {e}")
-            continue
 
-    conn.commit()
-    conn.close()
-    return {"inserted": inserted, "skipped": skipped, "inserted_ids": inserted_ids}
-
-
-def run_scrape_and_score(keywords: List[str], user_profile: Dict,headless:bool = SCRAPE_HEADLESS):
-    scheduler_log("Starting scheduled run")
-    if not _acquire_lock():
-        scheduler_log("Another run is in progress; exiting this invocation.")
+@profiled("run_scrape_and_score")
+def run_scrape_and_score(keywords: List[str], user_profile: Dict,headless:bool = SCRAPE_HEADLESS, resume: bool = SCRAPE_RESUME,
+                         only: Optional[List[str]] = None, kind: str = "scheduled"):
+    log.info("Starting scheduled run")
+    lock = run_lock("scrape")
+    if not lock.acquire():
+        log.info("Another run is scraping (%s); exiting this invocation.", lock.holder() or 'unknown holder')
         return {"status": "skipped", "reason": "already_running"}
 
     
     start_ts = time.time()
-    scraper = None
     agent = None
+    result: Dict[str, Any] = {}
+    run = RunRecorder(kind).start()
     
     try:
         agent = JobMatcherAgent(user_profile=user_profile)
+        run.db = agent.db
         
-        scraper = Job104Scraper(headless=headless)
-        scheduler_log(f"Scraper started (headless={headless})")
+        sources = registry.create(only=only, options={Job104Source.name: {"headless": headless, "max_pages": SCRAPE_104_PAGES}})
+        log.info("Scraping sources: %s (headless=%s)", ', '.join(s.name for s in sources), headless)
+
+        upsert_stats = {"inserted": 0, "skipped": 0}
+        scraped_by_key: Dict[tuple, int] = defaultdict(int)
+        new_by_key: Dict[tuple, int] = defaultdict(int)
 
-        scraped = scraper.scrape_jobs(keywords)
-        scheduler_log(f"Scraped {len(scraped)} raw jobs")
+        def save(jobs):
+            groups: Dict[tuple, List[Dict]] = defaultdict(list)
+            for job in jobs:
+                groups[(job.get("source"), _yield_key(job.get("source"), job))].append(job)
+            for key, group in groups.items():
+                with stage("save"):
+                    new, dup = agent.db.save_jobs(group)
+                upsert_stats["inserted"] += new
+                upsert_stats["skipped"] += dup
+                scraped_by_key[key] += len(group)
+                new_by_key[key] += new
 
-        upsert_stats = upsert_jobs_into_db(agent.db, scraped)
-        scheduler_log(f"DB upsert: inserted {upsert_stats['inserted']}, skipped {upsert_stats['skipped']}")
+        with stage("scrape"):
+            source_stats = registry.run_checkpointed(save, keywords={Job104Source.name: keywords}, sources=sources, resume=resume,
+                                                     health=SourceHealth(agent.db))
+        for name, st in source_stats.items():
+            log.info("Source %s: %s, %d jobs in %ss (%s)", name, st['status'], st['count'], st['latency'],
+                     st['error'] or "no errors")
+        log.info("Scraped %d raw jobs", sum(st['count'] for st in source_stats.values()))
+        log.info("DB upsert: inserted %d, skipped %d", upsert_stats['inserted'], upsert_stats['skipped'])
+        run.add(scraped=sum(st['count'] for st in source_stats.values()), inserted=upsert_stats['inserted'],
+                duplicates=upsert_stats['skipped'])
+        for name, st in source_stats.items():
+            if st['error']:
+                run.error(f"{name}: {st['error']}")
+        record_yield(sources, source_stats, keywords, scraped_by_key, new_by_key)
+        if lock.lost.is_set():
+            log.warning("Scrape lock was lost during the run; another run may have overlapped")
+        # Scoring claims rows itself, so it does not need the scrape lock.
+        lock.release()
 
-        scored_total = agent.process_all_jobs(batch_size=SCORING_BATCH_SIZE, max_batches=SCORING_MAX_BATCHES)
-        scheduler_log(f"Scoring completed; total scored in this run: {scored_total}")
+        with stage("score"):
+            scored_total = agent.process_all_jobs(batch_size=SCORING_BATCH_SIZE, max_batches=SCORING_MAX_BATCHES)
+        log.info("Scoring completed; total scored in this run: %s", scored_total)
+        run.add(scored=scored_total)
 
         duration = time.time() - start_ts
-        scheduler_log(f"Scheduled run completed in {duration:.1f}s")
+        log.info("Scheduled run completed in %.1fs", duration)
         
-        return {"status": "ok", "inserted": upsert_stats['inserted'], "skipped": upsert_stats['skipped'], "scored": scored_total}
+        result = {"status": "ok", "inserted": upsert_stats['inserted'], "skipped": upsert_stats['skipped'], "scored": scored_total}
+        return result
     
     except Exception as e:
-        scheduler_log(f"Run failed with exception: {e}")
-        scheduler_log(traceback.format_exc())
+        log.exception("Run failed with exception: %s", e)
         
-        return {"status": "error", "error": str(e)}
+        result = {"status": "error", "error": str(e)}
+        run.error(f"{type(e).__name__}: {e}")
+        return result
     
     finally:
-        try:
-            if scraper:
-                scraper.close()
-        except Exception:
-            pass
-        _release_lock()
+        lock.release()
+        run.status = result.get("status", "error")
+        run.finish()
+        write_run_summary("scheduled", result)
+
+def record_yield(sources, source_stats: Dict[str, Dict], keywords: List[str], scraped: Dict[tuple, int], new: Dict[tuple, int]):
+    """Feed the adaptive keyword schedule with the new jobs every completed source and keyword produced."""
+    try:
+        tracker = YieldTracker()
+        for source in sources:
+            if source_stats.get(source.name, {}).get("status") != "ok":
+                continue
+            kws = (keywords or source.default_keywords) if source.name == Job104Source.name else [ALL_KEYWORDS]
+            for kw in kws:
+                tracker.record(source.name, kw, new.get((source.name, kw), 0), scraped.get((source.name, kw), 0))
+        tracker.purge()
+    except Exception as e:
+        log.warning("Could not record keyword yield: %s", e)
+
+
+def run_keyword_scrape(source: str, keyword: str, user_profile: Dict, headless: bool = SCRAPE_HEADLESS):
+    """One adaptive-schedule job: scrape a single keyword of one source, then score."""
+    return run_scrape_and_score([] if keyword == ALL_KEYWORDS else [keyword], user_profile, headless, only=[source],
+                                kind="keyword")
+
 
 def _parse_date_posted_to_date(s: str):
     if not s or not isinstance(s, str):
@@ -175,119 +161,183 @@ def _parse_date_posted_to_date(s: str):
     return None
 
 
+def is_stale(row: Dict, min_score: int, cutoff_date) -> bool:
+    """Whether the cleaner removes a job: scored below `min_score`, or posted (else scraped) by `cutoff_date`."""
+    score = row["ai_score"] or 0
+    # Unscored jobs (0) are still waiting in the scoring queue, not low matches.
+    if 0 < score < min_score:
+        return True
+
+    parsed = _parse_date_posted_to_date(row["date_posted"] or "")
+    if parsed:
+        return parsed <= cutoff_date
+    try:
+        scraped_at = row["scraped_at"] or ""
+        return bool(scraped_at) and datetime.fromisoformat(scraped_at).date() <= cutoff_date
+    except Exception:
+        return False
+
+
 def clean_database(db:'JobDatabase', min_score:int =CLEANER_MIN_SCORE, max_age_days:int = CLEANER_MAX_AGE_DAYS, action: str = CLEANER_ACTION) -> Dict[str,Any]:
     stats = {"checked": 0, "archived": 0, "deleted": 0, "skipped": 0}
     cutoff_date = datetime.now().date() - timedelta(days=int(max_age_days))
-    conn  =sqlite3.connect(db.db_name)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    
-    cur.execute("SELECT id, ai_score, date_posted, scraped_at, status FROM jobs WHERE status IS NULL OR status != 'archived'")
-    rows = cur.fetchall()
-    
-    to_archive: List[int] = []
-    to_delete: List[int] = []
-    
-    for r in rows:
-        stats["checked"] += 1
-        jid = r["id"]
-        score = r["ai_score"] if r["ai_score"] is not None else 0
-        date_posted = r.get("date_posted") or ""
-        scraped_at = r.get("scraped_at") or ""
-        
-        low_score = (score < min_score)
-        
-        old = False
-        
-        parsed = _parse_date_posted_to_date(date_posted)
-        if parsed:
-            old = (parsed <= cutoff_date)
-        else:
-            try:
-                sa = None
-                if scraped_at:
-                    sa = datetime.fromisoformat(scraped_at).date()
-                if sa:
-                    old = (sa <= cutoff_date)
-            except Exception:
-                old = False
-        
-        if low_score or old:
-            if action == "archive":
-                to_archive.append(jid)
-            elif action == "delete":
-                to_delete.append(jid)
-            else:
-                stats["skipped"] += 1
-    try:
-        if to_archive:
-            now_iso = datetime.now().isoformat()
-            try:
-                cur.execute("ALTER TABLE jobs ADD COLUMN archived_at TEXT")
-            except Exception:
-                pass
-            cur.executemany("INSERT INTO archived_jobs SELECT * FROM jobs WHERE id IN (?,?,...)", [(now_iso, i) for i in to_archive])
-            stats["archived"] = len(to_archive)
-        if to_delete:
-            cur.executemany("DELETE FROM jobs WHERE id IN (?,?,...)", [(i,) for i in to_delete])
-            stats["deleted"] = len(to_delete)
-        
-        conn.commit()
-    finally:
-        conn.close()
-        
+
+    with db.connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("SELECT id, ai_score, date_posted, scraped_at FROM jobs WHERE status IS NULL OR status != 'archived'")
+        rows = cur.fetchall()
+
+        to_archive: List[int] = []
+        to_delete: List[int] = []
+
+        for r in rows:
+            stats["checked"] += 1
+            if is_stale(r, min_score, cutoff_date):
+                if action == "archive":
+                    to_archive.append(r["id"])
+                elif action == "delete":
+                    to_delete.append(r["id"])
+                else:
+                    stats["skipped"] += 1
+
+        try:
+            if to_archive:
+                cur.execute("UPDATE jobs SET status = 'archived' WHERE id = ANY(%s)", (to_archive,))
+                stats["archived"] = cur.rowcount
+            if to_delete:
+                cur.execute("DELETE FROM jobs WHERE id = ANY(%s)", (to_delete,))
+                stats["deleted"] = cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    log.info("DB cleaner: %s", stats)
     return stats
 
 
-def run_clean_database(db_name, min_score, max_age_days, action):
-    db = JobDatabase(db_name)
-    return clean_database(db, min_score, max_age_days, action)
+def run_clean_database(min_score, max_age_days, action):
+    lock = run_lock("cleanup")
+    if not lock.acquire():
+        log.info("Cleanup already running (%s); skipping.", lock.holder() or 'unknown holder')
+        return {"status": "skipped", "reason": "already_running"}
+    db = None
+    try:
+        db = JobDatabase()
+        return clean_database(db, min_score, max_age_days, action)
+    finally:
+        if db is not None:
+            db.close()
+        lock.release()
 
 
 class SchedulerManager:
     def __init__(self, agent:'JobMatcherAgent' , keywords:List[str], jobstore_db: str =JOBSTORE_DB):
-        executors = {"default": ThreadPoolExecutor(5)}
+        # APScheduler pulls in SQLAlchemy; only the long-running scheduler process needs it.
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from apscheduler.executors.pool import ThreadPoolExecutor
+        from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+        from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+
+        from isolated_jobs import ISOLATE_JOBS, IsolatedExecutor
+
+        # Keyword scrapes share the scrape lock and a browser, so they queue on their own single worker.
+        if ISOLATE_JOBS:
+            executors = {"default": IsolatedExecutor(2), "scrape": IsolatedExecutor(1)}
+        else:
+            executors = {"default": ThreadPoolExecutor(5), "scrape": ThreadPoolExecutor(1)}
         jobstores = {"default" : SQLAlchemyJobStore(jobstore_db)}
         self.scheduler = BackgroundScheduler(executors=executors, jobstores=jobstores)
         self.agent = agent
         self.user_profile=agent.user_profile
         self.keywords= keywords
         self._job = None
+        self.adaptive = SCRAPE_ADAPTIVE
+        self.tracker = YieldTracker() if self.adaptive else None
         self.scheduler.add_listener(self._event_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
         
     def _event_listener(self, event):
         if event.exception:
-            scheduler_log(f"Job error: {event.exception}")
+            log.error("Job error: %s", event.exception)
         else:
-            scheduler_log("Job executed successfully.")
+            log.info("Job executed successfully.")
+            if event.job_id.startswith(KEYWORD_JOB_PREFIX) and (event.retval or {}).get("status") == "ok":
+                self._reschedule_keyword(event.job_id)
+
+    def _reschedule_keyword(self, job_id: str):
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            return
+        hours = self.tracker.interval_hours(job.kwargs["source"], job.kwargs["keyword"])
+        if job.trigger.interval != timedelta(hours=hours):
+            self.scheduler.reschedule_job(job_id, trigger="interval", hours=hours)
+            log.info("%s now runs every %.1fh", job_id, hours)
+
+    def _schedule_keywords(self):
+        """One interval job per 104 keyword and per other source, paced by its recorded yield.
+
+        Jobs already in the job store keep their next run time; jobs for keywords no longer configured are removed.
+        """
+        wanted = {}
+        for source in registry.create():
+            for kw in (self.keywords if source.name == Job104Source.name else [ALL_KEYWORDS]):
+                wanted[f"{KEYWORD_JOB_PREFIX}{source.name}:{kw}"] = (source.name, kw)
+
+        for job in self.scheduler.get_jobs():
+            if job.id == JOB_ID or (job.id.startswith(KEYWORD_JOB_PREFIX) and job.id not in wanted):
+                job.remove()
+
+        now = datetime.now()
+        for job_id, (source, kw) in wanted.items():
+            if self.scheduler.get_job(job_id):
+                continue
+            self.scheduler.add_job(
+                func=run_keyword_scrape,
+                trigger="interval",
+                id=job_id,
+                kwargs={"source": source, "keyword": kw, "user_profile": self.user_profile, "headless": SCRAPE_HEADLESS},
+                hours=self.tracker.interval_hours(source, kw),
+                next_run_time=max(datetime.fromtimestamp(self.tracker.next_due(source, kw)), now),
+                executor="scrape",
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=3600,
+            )
+        log.info("Scheduled %d adaptive scrape jobs", len(wanted))
             
     def start(self):
         if not self.scheduler.running:
             self.scheduler.start()
             
-            self._job = self.scheduler.add_job(
-                func=run_scrape_and_score,
-                trigger='cron',
-                id=JOB_ID,
-                kwargs={"keywords": self.keywords, "user_profile": self.user_profile, "headless": SCRAPE_HEADLESS},
-                replace_existing=True,
-                max_instances=1,
-                hour=SCHEDULE_CRON["hour"],
-                minute=SCHEDULE_CRON["minute"],
-            )
-            scheduler_log("Scheduler started and job scheduled.")
+            if self.adaptive:
+                self._schedule_keywords()
+            else:
+                for job in self.scheduler.get_jobs():
+                    if job.id.startswith(KEYWORD_JOB_PREFIX):
+                        job.remove()
+                self._job = self.scheduler.add_job(
+                    func=run_scrape_and_score,
+                    trigger='cron',
+                    id=JOB_ID,
+                    kwargs={"keywords": self.keywords, "user_profile": self.user_profile, "headless": SCRAPE_HEADLESS},
+                    replace_existing=True,
+                    max_instances=1,
+                    hour=SCHEDULE_CRON["hour"],
+                    minute=SCHEDULE_CRON["minute"],
+                )
+            log.info("Scheduler started and job scheduled.")
             
             self._cleaner_job = self.scheduler.add_job(
                 func=run_clean_database,
                 trigger='cron',
                 id=f"{JOB_ID}_db_cleaner",
                 replace_existing=True,
-                kwargs={"db_name": self.agent.db.db_name,"min_score": CLEANER_MIN_SCORE,"max_age_days": CLEANER_MAX_AGE_DAYS,"action": CLEANER_ACTION},
+                kwargs={"min_score": CLEANER_MIN_SCORE,"max_age_days": CLEANER_MAX_AGE_DAYS,"action": CLEANER_ACTION},
                 max_instances=1,
                 hour=3,
                 minute=30
             )
-            scheduler_log("DB cleaner scheduled daily at 03:30")
+            log.info("DB cleaner scheduled daily at 03:30")
             return True
         return False
 
@@ -298,16 +348,24 @@ class SchedulerManager:
             except Exception:
                 pass
             self.scheduler.shutdown(wait=False)
-            scheduler_log("Scheduler stopped.")
+            log.info("Scheduler stopped.")
             return True
         return False
     
     def status(self):
-        return {
+        status = {
             "running": self.scheduler.running,
             "job": (self._job.id if self._job else None),
             "next_run_time": str(self._job.next_run_time) if self._job else None
         }
+        if self.adaptive:
+            status["keywords"] = [
+                {"job": job.id, "every_hours": round(job.trigger.interval.total_seconds() / 3600, 1),
+                 "next_run_time": str(job.next_run_time)}
+                for job in self.scheduler.get_jobs() if job.id.startswith(KEYWORD_JOB_PREFIX)
+            ]
+            status["yield"] = self.tracker.summary()
+        return status
         
 if __name__ == "__main__":    
     user_profile = {
@@ -319,11 +377,16 @@ if __name__ == "__main__":
     keywords =  ["AI工程師 實習", "前端工程師 實習", "後端工程師 實習", "機器學習 實習"]
     mgr = SchedulerManager(agent=agent, keywords=keywords)
     mgr.start()
-    scheduler_log("SchedulerManager is running. Press Ctrl-C to exit.")
+    watchdog = MemoryWatchdog().start()
+    log.info("SchedulerManager is running. Press Ctrl-C to exit.")
     try:
-        while True:
+        while not watchdog.recycle.is_set():
             time.sleep(1)
+        # Over MEMORY_RECYCLE_MB: stop cleanly and let the supervisor start a fresh process.
+        mgr.stop()
+        log.info("Exiting to recycle memory.")
+        raise SystemExit(75)
     except KeyboardInterrupt:
         mgr.stop()
-        scheduler_log("Exiting.")
+        log.info("Exiting.")
         
\ No newline at end of file
@@ -0,0 +1,128 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from metrics import registry
+from app_logging import get_logger
+
+SOURCE_BREAKER_THRESHOLD = int(os.getenv("SOURCE_BREAKER_THRESHOLD", "3"))
+SOURCE_BREAKER_COOLDOWN_MINUTES = float(os.getenv("SOURCE_BREAKER_COOLDOWN_MINUTES", "360"))
+# Weight of the latest run in the smoothed success rate, latency and cards per page.
+SOURCE_HEALTH_ALPHA = float(os.getenv("SOURCE_HEALTH_ALPHA", "0.3"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+# What admit() tells the runner to do with a source.
+RUN, PROBE, SKIP = "run", "probe", "skip"
+
+log = get_logger(__name__)
+
+SOURCE_BREAKER_STATE = registry.gauge("job_agent_source_breaker_state", "Circuit breaker per source: 0 closed, 1 half open, 2 open.")
+SOURCE_BREAKER_TRIPS = registry.counter("job_agent_source_breaker_trips_total", "Times a source's circuit breaker opened.")
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _smooth(old: Optional[float], new: float, alpha: float) -> float:
+    return new if old is None else alpha * new + (1 - alpha) * old
+
+
+def run_failed(stats: Dict, run_stats: Optional[Dict] = None) -> Optional[str]:
+    """Why a finished source run counts as a failure, or None if it was healthy.
+
+    Pages fetched without a single result card mean the markup changed or we are being blocked, even when
+    the source itself reported no error.
+    """
+    if stats.get("status") != "ok":
+        return stats.get("error") or stats.get("status") or "failed"
+    run_stats = run_stats or {}
+    if run_stats.get("pages") and not run_stats.get("cards"):
+        return f"no result cards on {run_stats['pages']} pages"
+    return None
+
+
+class SourceHealth:
+    """Per-source health and circuit breaker, kept in the `source_health` table.
+
+    After SOURCE_BREAKER_THRESHOLD failed runs in a row the breaker opens and the source is skipped. Once the
+    cool-down has passed it runs once with a single keyword (half open): success closes the breaker, failure
+    opens it for another cool-down. Storage errors never stop a scrape; the source just runs.
+    """
+
+    def __init__(self, db, threshold: int = SOURCE_BREAKER_THRESHOLD,
+                 cooldown_minutes: float = SOURCE_BREAKER_COOLDOWN_MINUTES, alpha: float = SOURCE_HEALTH_ALPHA):
+        self.db = db
+        self.threshold = threshold
+        self.cooldown = timedelta(minutes=cooldown_minutes)
+        self.alpha = alpha
+
+    def _load(self, source: str) -> Dict:
+        return self.db.get_source_health().get(source) or {
+            "source": source, "state": CLOSED, "consecutive_failures": 0, "runs": 0, "failures": 0,
+            "success_rate": 1.0, "avg_latency": None, "cards_per_page": None, "last_jobs": 0,
+        }
+
+    def _save(self, row: Dict):
+        self.db.save_source_health(row)
+        SOURCE_BREAKER_STATE.set(_STATE_VALUE[row["state"]], source=row["source"])
+
+    def reopens_at(self, row: Dict) -> Optional[datetime]:
+        if row.get("state") != OPEN or not row.get("opened_at"):
+            return None
+        return row["opened_at"] + self.cooldown
+
+    def admit(self, source: str) -> str:
+        """RUN, PROBE (run one keyword to test the source) or SKIP (breaker open, cool-down not over)."""
+        try:
+            row = self._load(source)
+            if row["state"] == CLOSED:
+                return RUN
+            reopens = self.reopens_at(row)
+            if reopens and datetime.now(timezone.utc) < reopens:
+                log.warning("Skipping %s: circuit open until %s (%s)", source, f"{reopens:%Y-%m-%d %H:%M}", row.get("last_error"))
+                return SKIP
+            row["state"] = HALF_OPEN
+            self._save(row)
+            log.info("Probing %s with one keyword before resuming it", source)
+            return PROBE
+        except Exception as e:
+            log.warning("Source health unavailable, running %s: %s", source, e)
+            return RUN
+
+    def record(self, source: str, stats: Dict, run_stats: Optional[Dict] = None, probe: bool = False):
+        """Fold one finished run (the registry's per-source stats) into the source's health and breaker."""
+        try:
+            row = self._load(source)
+            run_stats = run_stats or {}
+            now = datetime.now(timezone.utc)
+            error = run_failed(stats, run_stats)
+
+            row["runs"] += 1
+            row["last_jobs"] = stats.get("count", 0)
+            row["success_rate"] = _smooth(row["success_rate"], 0.0 if error else 1.0, self.alpha)
+            if stats.get("latency") is not None:
+                row["avg_latency"] = _smooth(row.get("avg_latency"), stats["latency"], self.alpha)
+            if run_stats.get("pages"):
+                row["cards_per_page"] = _smooth(row.get("cards_per_page"), run_stats["cards"] / run_stats["pages"], self.alpha)
+
+            if error is None:
+                if row["state"] != CLOSED:
+                    log.info("%s recovered, closing its circuit", source)
+                row.update(state=CLOSED, consecutive_failures=0, last_success_at=now, opened_at=None)
+            else:
+                row["failures"] += 1
+                row["consecutive_failures"] += 1
+                row.update(last_error=str(error)[:500], last_failure_at=now)
+                if probe or row["consecutive_failures"] >= self.threshold:
+                    if row["state"] != OPEN:
+                        SOURCE_BREAKER_TRIPS.inc(source=source)
+                    row.update(state=OPEN, opened_at=now)
+                    log.warning("%s failed %d runs in a row (%s); circuit open for %s",
+                                source, row["consecutive_failures"], error, self.cooldown)
+            self._save(row)
+        except Exception as e:
+            log.warning("Could not record health of %s: %s", source, e)
+
+    def summary(self) -> Dict[str, Dict]:
+        rows = self.db.get_source_health()
+        for row in rows.values():
+            row["reopens_at"] = self.reopens_at(row)
+        return rows
@@ -0,0 +1,363 @@
+import os
+import time
+import queue
+import threading
+import importlib
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import metrics
+from app_logging import get_logger
+from checkpoints import SOURCE_UNIT, CheckpointStore, UnitDone, run_key
+from source_health import PROBE, SKIP
+
+DEFAULT_SOURCE_TIMEOUT = 900
+
+# Comma separated source names; empty means every registered source that is enabled by default.
+SCRAPE_SOURCES = os.getenv("SCRAPE_SOURCES", "")
+# Comma separated module names imported before a run so they can register extra sources.
+SCRAPE_SOURCE_MODULES = os.getenv("SCRAPE_SOURCE_MODULES", "")
+
+_DONE = object()
+
+log = get_logger(__name__)
+
+SOURCE_SECONDS = metrics.registry.histogram("job_agent_source_seconds", "Time from run start until a source finished or timed out.")
+SOURCE_JOBS = metrics.registry.counter("job_agent_source_jobs_total", "Jobs yielded per source.")
+
+
+def _env_list(value: str) -> List[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+class JobSource:
+    """Base class for a job board. Subclasses yield job dicts in the shape `JobDatabase.save_jobs` expects."""
+
+    name = "base"
+    description = ""
+    default_keywords: List[str] = []
+    timeout = DEFAULT_SOURCE_TIMEOUT
+    enabled_by_default = True
+
+    def __init__(self, timeout: Optional[float] = None, **options):
+        self.timeout = float(os.getenv(f"SOURCE_TIMEOUT_{self.env_name}", timeout or self.timeout))
+        self.options = options
+        # Units finished earlier in a resumed run. Sources that checkpoint below the whole-source level skip
+        # these, and yield UnitDone after each unit when `checkpoints` is set.
+        self.completed_units: Set[str] = set()
+        self.checkpoints = False
+        # Filled in by fetch for the health model: {"pages": fetched, "cards": result cards seen on them}.
+        self.run_stats: Dict = {}
+        # Set by stop(); long-running fetches check it between units of work.
+        self.stopped = threading.Event()
+
+    @property
+    def env_name(self) -> str:
+        return "".join(c if c.isalnum() else "_" for c in self.name).upper()
+
+    def fetch(self, keywords: List[str]) -> Iterator[Dict]:
+        raise NotImplementedError
+
+    def stop(self):
+        """Called from the consuming thread when the source timed out or the run ended before it did.
+
+        Sources that hold a browser or other resources override this to release them, so the worker thread
+        stops instead of scraping on in the background.
+        """
+        self.stopped.set()
+
+    def metadata(self) -> Dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "timeout": self.timeout,
+            "default_keywords": list(self.default_keywords),
+        }
+
+
+class SourceRegistry:
+    def __init__(self):
+        self._sources: Dict[str, type] = {}
+
+    def register(self, source_cls):
+        self._sources[source_cls.name] = source_cls
+        return source_cls
+
+    def names(self) -> List[str]:
+        return list(self._sources)
+
+    def load_plugins(self, modules: Optional[List[str]] = None):
+        for mod in modules if modules is not None else _env_list(SCRAPE_SOURCE_MODULES):
+            try:
+                importlib.import_module(mod)
+            except Exception as e:
+                log.error("Could not load source module %s: %s", mod, e)
+
+    def create(self, only: Optional[List[str]] = None, options: Optional[Dict[str, Dict]] = None) -> List[JobSource]:
+        self.load_plugins()
+        options = options or {}
+        wanted = only or _env_list(SCRAPE_SOURCES)
+        sources = []
+        for name, cls in self._sources.items():
+            if wanted and name not in wanted:
+                continue
+            if not wanted and not cls.enabled_by_default:
+                continue
+            try:
+                sources.append(cls(**options.get(name, {})))
+            except Exception as e:
+                log.error("Could not create source %s: %s", name, e)
+        for name in wanted:
+            if name not in self._sources:
+                log.warning("Unknown source '%s', available: %s", name, ', '.join(self._sources))
+        return sources
+
+    def iter_jobs(self, keywords: Optional[Dict[str, List[str]]] = None, sources: Optional[List[JobSource]] = None,
+                  stats: Optional[Dict[str, Dict]] = None, health=None) -> Iterator[Dict]:
+        """Run every source in its own thread and yield jobs as they arrive.
+
+        `keywords` maps source name to its keyword list; sources missing from it use their defaults.
+        Each source gets its own deadline, so the run takes as long as the slowest source (bounded by its timeout).
+        `stats` is filled in with per-source status, count, latency and error.
+        With a `health` (SourceHealth), sources whose circuit is open are skipped and every run is recorded.
+        """
+        for _, item in self._iter_items(keywords, sources, stats, health):
+            if not isinstance(item, UnitDone):
+                yield item # type: ignore
+
+    def _iter_items(self, keywords: Optional[Dict[str, List[str]]] = None, sources: Optional[List[JobSource]] = None,
+                    stats: Optional[Dict[str, Dict]] = None, health=None) -> Iterator[Tuple[str, object]]:
+        """(source name, job or UnitDone) pairs; a source that finishes cleanly ends with UnitDone(SOURCE_UNIT)."""
+        sources = sources if sources is not None else self.create()
+        keywords = keywords or {}
+        stats = stats if stats is not None else {}
+        out: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+        cancel: Dict[str, threading.Event] = {}
+        deadlines: Dict[str, float] = {}
+        by_name = {source.name: source for source in sources}
+        probes = set()
+        started = time.time()
+
+        def finished(name: str):
+            if health is not None:
+                health.record(name, stats[name], by_name[name].run_stats, probe=name in probes)
+
+        def worker(source: JobSource, kws: List[str], stop: threading.Event):
+            gen = None
+            try:
+                gen = source.fetch(kws)
+                for job in gen:
+                    if stop.is_set():
+                        break
+                    if not isinstance(job, UnitDone):
+                        job.setdefault("source", source.name)
+                    out.put((source.name, job))
+            except Exception as e:
+                stats[source.name]["error"] = str(e)
+            finally:
+                if gen is not None and hasattr(gen, "close"):
+                    try:
+                        gen.close()
+                    except Exception:
+                        pass
+                out.put((source.name, _DONE))
+
+        for source in sources:
+            kws = keywords.get(source.name) or list(source.default_keywords)
+            decision = health.admit(source.name) if health is not None else None
+            if decision == SKIP:
+                stats[source.name] = {"status": "circuit_open", "count": 0, "latency": None, "error": None, "keywords": 0}
+                continue
+            if decision == PROBE:
+                kws = kws[:1]
+                probes.add(source.name)
+            stats[source.name] = {"status": "running", "count": 0, "latency": None, "error": None, "keywords": len(kws)}
+            cancel[source.name] = threading.Event()
+            deadlines[source.name] = started + source.timeout
+            threading.Thread(
+                target=worker, args=(source, kws, cancel[source.name]),
+                name=f"source-{source.name}", daemon=True,
+            ).start()
+
+        active = set(deadlines)
+        try:
+            while active:
+                wait = max(0.0, min(deadlines[n] for n in active) - time.time())
+                try:
+                    name, item = out.get(timeout=wait)
+                except queue.Empty:
+                    name, item = None, None
+                now = time.time()
+
+                for n in [n for n in active if deadlines[n] <= now]:
+                    active.discard(n)
+                    cancel[n].set()
+                    _stop_source(by_name[n])
+                    stats[n].update(status="timeout", latency=round(now - started, 3))
+                    SOURCE_SECONDS.observe(now - started, source=n, status="timeout")
+                    log.warning("Source %s timed out after %.1fs", n, now - started)
+                    finished(n)
+
+                if name is None or name not in active:
+                    continue
+                if item is _DONE:
+                    active.discard(name)
+                    stats[name].update(status="error" if stats[name]["error"] else "ok", latency=round(now - started, 3))
+                    SOURCE_SECONDS.observe(now - started, source=name, status=stats[name]["status"])
+                    finished(name)
+                    if stats[name]["status"] == "ok":
+                        yield name, UnitDone(SOURCE_UNIT)
+                    continue
+                if isinstance(item, UnitDone):
+                    yield name, item
+                    continue
+
+                stats[name]["count"] += 1
+                SOURCE_JOBS.inc(source=name)
+                yield name, item
+        finally:
+            for stop in cancel.values():
+                stop.set()
+            # The consumer stopped early (a crash, or it closed the generator): nothing reads these any more.
+            for n in active:
+                _stop_source(by_name[n])
+
+    def run(self, keywords: Optional[Dict[str, List[str]]] = None,
+            sources: Optional[List[JobSource]] = None, health=None) -> Tuple[List[Dict], Dict[str, Dict]]:
+        stats: Dict[str, Dict] = {}
+        jobs = list(self.iter_jobs(keywords=keywords, sources=sources, stats=stats, health=health))
+        return jobs, stats
+
+    def run_checkpointed(self, save: Callable[[List[Dict]], object], keywords: Optional[Dict[str, List[str]]] = None,
+                         sources: Optional[List[JobSource]] = None, resume: bool = False,
+                         store: Optional[CheckpointStore] = None, health=None) -> Dict[str, Dict]:
+        """Like `run`, but every finished unit (a 104 result page, a whole source) goes to `save` straight away
+        and is recorded in `store`. With `resume`, units recorded by the latest unfinished run over the same
+        sources and keywords are skipped.
+
+        Returns the per-source stats, plus `resumed_units` for sources that skipped work.
+        """
+        store = store or CheckpointStore()
+        sources = sources if sources is not None else self.create()
+        key = run_key({s.name: (keywords or {}).get(s.name) or list(s.default_keywords) for s in sources})
+        run_id = store.start_run(resume, key)
+        done = store.completed(run_id) if resume else {}
+        stats: Dict[str, Dict] = {}
+
+        todo = []
+        for source in sources:
+            units = done.get(source.name, set())
+            if SOURCE_UNIT in units:
+                log.info("Skipping %s, already finished in run %s", source.name, run_id)
+                stats[source.name] = {"status": "resumed", "count": 0, "latency": None, "error": None}
+                continue
+            source.completed_units = units
+            source.checkpoints = True
+            todo.append(source)
+
+        pending: Dict[str, List[Dict]] = {}
+        for name, item in self._iter_items(keywords, todo, stats, health):
+            if isinstance(item, UnitDone):
+                jobs = pending.pop(name, [])
+                if jobs:
+                    save(jobs)
+                store.mark(run_id, name, item.unit, len(jobs))
+            else:
+                pending.setdefault(name, []).append(item) # type: ignore
+
+        # Jobs from sources that failed or timed out mid-unit are kept, but the unit stays open for --resume.
+        for name, jobs in pending.items():
+            save(jobs)
+        for source in todo:
+            if source.completed_units:
+                stats[source.name]["resumed_units"] = len(source.completed_units)
+        if all(s["status"] in ("ok", "resumed", "circuit_open") for s in stats.values()):
+            store.finish_run(run_id)
+        store.purge()
+        log.info("Scrape run %s: %s", run_id, store.summary(run_id))
+        return stats
+
+
+def _stop_source(source: JobSource):
+    try:
+        source.stop()
+    except Exception as e:
+        log.warning("Could not stop source %s: %s", source.name, e)
+
+
+registry = SourceRegistry()
+
+
+def print_source_stats(stats: Dict[str, Dict]):
+    for name, s in stats.items():
+        latency = f"{s['latency']:.1f}s" if s.get("latency") is not None else "-"
+        line = f"  {name}: {s['status']}, {s['count']} jobs in {latency}"
+        if s.get("error"):
+            line += f" ({s['error']})"
+        log.info(line)
+
+
+@registry.register
+class Job104Source(JobSource):
+    name = "104.com.tw"
+    description = "104 job bank search, scraped with Selenium"
+    default_keywords = [
+        "AI工程師 實習",
+        "前端工程師 實習",
+        "後端工程師 實習",
+        "機器學習 實習",
+        "軟體工程師 實習"
+    ]
+
+    def fetch(self, keywords: List[str]) -> Iterator[Dict]:
+        from yilingsi_scraper import Job104Scraper, SCRAPE_104_MAX_PAGES, SCRAPE_104_WORKERS
+
+        headless = self.options.get("headless", os.getenv("SCRAPE_HEADLESS") != "0")
+        scraper = self._scraper = Job104Scraper(headless=headless, known=self.known_jobs(),
+                                                workers=self.options.get("workers", SCRAPE_104_WORKERS))
+        if self.stopped.is_set():
+            scraper.close()
+            return
+        try:
+            yield from scraper.iter_jobs(keywords, max_pages=self.options.get("max_pages", SCRAPE_104_MAX_PAGES),
+                                         page_caps=self.options.get("page_caps"),
+                                         skip_units=self.completed_units, checkpoints=self.checkpoints)
+        finally:
+            self.run_stats = {"pages": scraper.pages_fetched, "cards": scraper.cards_seen}
+            scraper.close()
+
+    def stop(self):
+        super().stop()
+        # Quitting the browsers fails the pages in flight, and iter_jobs queues no more once closed.
+        scraper = getattr(self, "_scraper", None)
+        if scraper is not None:
+            scraper.close()
+
+    def known_jobs(self):
+        """URLs already stored for this source, so the scraper can skip them; None if unavailable."""
+        from known_jobs import KNOWN_JOBS_ENABLED, load_known_jobs
+
+        if not self.options.get("skip_known", KNOWN_JOBS_ENABLED):
+            return None
+        from jobdb import JobDatabase
+
+        db = JobDatabase()
+        try:
+            return load_known_jobs(db, source=self.name)
+        except Exception as e:
+            log.warning("Could not load known jobs, scraping everything: %s", e)
+            return None
+        finally:
+            db.close()
+
+
+@registry.register
+class RemoteOkSource(JobSource):
+    name = "RemoteOK"
+    description = "remoteok.com public JSON API"
+    timeout = 60
+    default_keywords = ['AI Engineer', 'Frontend', 'Backend', 'Machine Learning', 'Python', 'React', 'Junior', 'intern']
+
+    def fetch(self, keywords: List[str]) -> Iterator[Dict]:
+        from remote_ok_scrap import RemoteOkScraper
+
+        yield from RemoteOkScraper().scrape_jobs(keywords=keywords, min_keywords_match=self.options.get("min_keywords_match", 2))
@@ -0,0 +1,126 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_jobdb import StatsCache
+from benchmarks.fixtures import synthetic_jobs
+from benchmarks.sqlite_db import AsyncSqliteJobDatabase, SqliteJobDatabase
+
+# A Postgres DSN the tests may wipe a scratch schema in; without it only the SQLite stand-in runs.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def databases(request, monkeypatch):
+    """(sync JobDatabase for claims, async database under test) on an empty jobs table."""
+    if request.param == "sqlite":
+        db = SqliteJobDatabase(":memory:")
+        yield db, AsyncSqliteJobDatabase(db)
+        db.close()
+        return
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from async_jobdb import AsyncJobDatabase
+    from benchmarks.run import PG_SCHEMA, _postgres_database
+
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    db = _postgres_database(0)
+    dsn = TEST_DATABASE_URL + ("&" if "?" in TEST_DATABASE_URL else "?") + f"search_path={PG_SCHEMA}"
+    yield db, AsyncJobDatabase(dsn=dsn, max_size=4)
+    db.close()
+
+
+def _jobs(count):
+    return synthetic_jobs(count, prefix="async")
+
+
+def test_save_jobs_bulk_counts_duplicates(databases):
+    _, adb = databases
+    jobs = _jobs(3)
+
+    async def run():
+        try:
+            first = await adb.save_jobs_bulk(jobs + jobs[:1])
+            again = await adb.save_jobs_bulk(jobs)
+            return first, again, await adb.get_stats()
+        finally:
+            await adb.close()
+
+    first, again, stats = asyncio.run(run())
+    assert first == (3, 1)
+    assert again == (0, 3)
+    assert stats["total"] == stats["new"] == 3
+
+
+def test_scores_are_saved_only_under_the_lease(databases):
+    db, adb = databases
+
+    async def save():
+        await adb.save_jobs_bulk(_jobs(4))
+
+    asyncio.run(save())
+    claimed = db.claim_unscored_jobs(limit=3, worker="w1")
+    ids = [job["id"] for job in claimed]
+
+    async def run():
+        try:
+            saved = await adb.update_job_scores([{"id": ids[0], "score": 80, "analysis": "a"},
+                                                 {"id": ids[1], "score": 20, "analysis": "b"}], worker="w1")
+            repeated = await adb.update_job_scores([{"id": ids[0], "score": 10, "analysis": "c"}], worker="w1")
+            other = await adb.update_job_score(ids[2], 50, "d", worker="w2")
+            mine = await adb.update_job_score(ids[2], 50, "d", worker="w1")
+            return (saved, repeated, other, mine, await adb.get_job(ids[0]), await adb.get_score_stats(),
+                    await adb.get_scoring_queue_depth(), await adb.list_jobs(1, 100, 10))
+        finally:
+            await adb.close()
+
+    saved, repeated, other, mine, job, stats, queue, listed = asyncio.run(run())
+    assert (saved, repeated, other, mine) == (2, 0, False, True)
+    assert (job["ai_score"], job["ai_analysis"], job["scoring_state"]) == (80, "a", "done")
+    assert (stats["total"], stats["scored"], stats["high"], stats["medium"], stats["low"]) == (4, 3, 1, 1, 1)
+    assert stats["avg"] == 50.0
+    assert queue == {"done": 3, "pending": 1}
+    assert [j["ai_score"] for j in listed] == [80, 50, 20]
+
+
+def test_stats_cache_shares_one_query_per_ttl():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(calls)}
+
+    async def run(cache):
+        burst = await asyncio.gather(*(cache.get("k", fetch) for _ in range(10)))
+        return burst, await cache.get("k", fetch)
+
+    burst, later = asyncio.run(run(StatsCache(ttl=60)))
+    assert burst == [{"n": 1}] * 10 and later == {"n": 1}
+    assert len(calls) == 1
+
+    calls.clear()
+    asyncio.run(run(StatsCache(ttl=0)))
+    assert len(calls) == 11
+
+
+def test_stats_cache_does_not_keep_failures():
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("db down")
+        return {"ok": True}
+
+    async def run():
+        cache = StatsCache(ttl=60)
+        with pytest.raises(RuntimeError):
+            await cache.get("k", fetch)
+        return await cache.get("k", fetch)
+
+    assert asyncio.run(run()) == {"ok": True}
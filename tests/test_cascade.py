@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import asyncio
+from datetime import datetime, timedelta
+
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_agent import JobMatcherAgent
+from llm_backends import SyntheticBackend, _ai_message
+from benchmarks.run import PROFILE
+from benchmarks.fixtures import synthetic_jobs
+from benchmarks.sqlite_db import AsyncSqliteJobDatabase, SqliteJobDatabase
+from scheduler import is_stale
+
+
+class TriageReply:
+    """Answers every triage prompt with the same id -> score object."""
+
+    model = "triage-stub"
+    chat_model = None
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def invoke(self, messages, stage: str = "full"):
+        assert stage == "triage"
+        return _ai_message(json.dumps(self.scores), 10, 10)
+
+
+def _agent(triage_scores):
+    agent = JobMatcherAgent.__new__(JobMatcherAgent)
+    agent.user_profile = PROFILE
+    agent.llm = SyntheticBackend()
+    agent.triage_llm = TriageReply(triage_scores)
+    return agent
+
+
+def test_triage_scores_are_clamped_to_0_100():
+    jobs = [dict(job, id=i) for i, job in enumerate(synthetic_jobs(3), 1)]
+
+    assert _agent({"1": 150, "2": -5, "3": 40}).triage_jobs_batch(jobs) == {1: 100, 2: 0, 3: 40}
+
+
+def test_screened_jobs_count_as_scored_and_get_cleaned():
+    db = SqliteJobDatabase(":memory:")
+    # Posted "Unknown" and scraped now: only a low score makes these stale.
+    db.save_jobs_bulk([dict(job, date_posted="Unknown") for job in synthetic_jobs(4, prefix="cascade")])
+    jobs = db.claim_unscored_jobs(limit=4)
+    ids = [job["id"] for job in jobs]
+    # Two jobs triaged 0, one out of range below, one sent to full scoring.
+    scores = _agent({str(ids[0]): 0, str(ids[1]): 0, str(ids[2]): -5, str(ids[3]): 90}).score_jobs_cascade(
+        jobs, threshold=30)
+
+    screened = [s for s in scores if s["analysis"].startswith("Screened out by triage")]
+    assert len(screened) == 3
+    assert all(1 <= s["score"] < 30 for s in screened)
+    assert all(db.update_job_score(s["id"], s["score"], s["analysis"]) for s in scores)
+
+    stats = asyncio.run(AsyncSqliteJobDatabase(db).get_score_stats())
+    assert stats["scored"] == 4
+    assert stats["low"] >= 3
+
+    cutoff = datetime.now().date() - timedelta(days=30)
+    with db.connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("SELECT id, ai_score, date_posted, scraped_at FROM jobs")
+        stale = {row["id"] for row in cur.fetchall() if is_stale(row, 40, cutoff)}
+    assert {s["id"] for s in screened} <= stale
+    db.close()
@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoints import CheckpointStore, UnitDone, run_key
+from sources import JobSource, SourceRegistry
+
+
+class PagedSource(JobSource):
+    """One job per keyword, checkpointed per keyword; fails on keywords listed in `fail_on`."""
+
+    name = "paged"
+    default_keywords = ["a", "b"]
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.fetched = []
+
+    def fetch(self, keywords):
+        for kw in keywords:
+            if kw in self.completed_units:
+                continue
+            if kw in self.options.get("fail_on", ()):
+                raise RuntimeError(f"blocked on {kw}")
+            self.fetched.append(kw)
+            yield {"title": kw, "url": f"https://example.com/{kw}"}
+            if self.checkpoints:
+                yield UnitDone(kw)
+
+
+def _run(store, keywords, resume, **options):
+    registry = SourceRegistry()
+    registry.register(PagedSource)
+    source = PagedSource(**options)
+    saved = []
+    stats = registry.run_checkpointed(saved.extend, keywords={"paged": keywords}, sources=[source],
+                                      resume=resume, store=store)
+    return source, saved, stats
+
+
+def test_resume_skips_units_of_the_unfinished_run(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+
+    _, saved, stats = _run(store, ["a", "b"], resume=True, fail_on={"b"})
+    assert [j["title"] for j in saved] == ["a"]
+    assert stats["paged"]["status"] == "error"
+
+    source, saved, stats = _run(store, ["a", "b"], resume=True)
+    assert source.fetched == ["b"]
+    assert stats["paged"]["status"] == "ok"
+    assert stats["paged"]["resumed_units"] == 1
+
+
+def test_finished_run_is_not_resumed(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    _run(store, ["a", "b"], resume=True)
+
+    source, _, stats = _run(store, ["a", "b"], resume=True)
+
+    assert source.fetched == ["a", "b"]
+    assert stats["paged"]["status"] == "ok"
+
+
+def test_resume_is_scoped_to_the_same_keywords(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    _run(store, ["a"], resume=True, fail_on={"a"})
+
+    # Another keyword's unfinished run must not be picked up.
+    source, _, _ = _run(store, ["b"], resume=True)
+    assert source.fetched == ["b"]
+
+    source, _, _ = _run(store, ["a"], resume=True)
+    assert source.fetched == ["a"]
+
+
+def test_run_key_is_order_independent():
+    assert run_key({"x": ["b", "a"], "y": []}) == run_key({"y": [], "x": ["a", "b"]}) == "x=a|b;y"
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest_queue import IngestQueue
+
+JOBS = [{"title": "Python Backend Intern", "url": "https://example.com/1"}]
+
+
+def test_expired_lease_is_redelivered_until_max_attempts(tmp_path):
+    queue = IngestQueue(str(tmp_path / "queue.sqlite"), max_attempts=3)
+    batch_id, _ = queue.enqueue(JOBS)
+
+    # A negative lease has already run out when the next claim comes: the worker "died" every time.
+    for _ in range(3):
+        assert queue.claim(lease_seconds=-1) == (batch_id, JOBS)
+
+    assert queue.claim(lease_seconds=-1) is None
+    assert queue.depth() == {"dead": 1}
+
+
+def test_live_lease_is_not_redelivered(tmp_path):
+    queue = IngestQueue(str(tmp_path / "queue.sqlite"))
+    queue.enqueue(JOBS)
+
+    assert queue.claim() is not None
+    assert queue.claim() is None
+    assert queue.depth() == {"in_progress": 1}
+
+
+def test_nack_retries_then_dead_letters(tmp_path):
+    queue = IngestQueue(str(tmp_path / "queue.sqlite"), max_attempts=2)
+    batch_id, duplicate = queue.enqueue(JOBS, key="k")
+    assert queue.enqueue(JOBS, key="k") == (batch_id, True)
+    assert not duplicate
+
+    for _ in range(2):
+        claimed, _ = queue.claim()
+        queue.nack(claimed, "boom")
+
+    assert queue.claim() is None
+    assert queue.depth() == {"dead": 1}
@@ -0,0 +1,36 @@
+import os
+import sys
+import multiprocessing
+from multiprocessing.connection import Pipe
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import isolated_jobs
+from isolated_jobs import run_isolated
+
+
+class LatePoll:
+    """Receiving end whose waiting polls always time out, as when the result lands just after each one."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def poll(self, timeout=0.0):
+        return self.conn.poll(0) if timeout == 0 else False
+
+    def recv(self):
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.close()
+
+
+def test_result_sent_just_before_exit_is_not_lost(monkeypatch):
+    def pipe(duplex=True):
+        receiver, sender = Pipe(duplex)
+        return LatePoll(receiver), sender
+
+    monkeypatch.setattr(multiprocessing.get_context("spawn"), "Pipe", pipe)
+    monkeypatch.setattr(isolated_jobs, "JOB_POLL_SECONDS", 0.01)
+
+    assert run_isolated(sum, args=([1, 2, 3],), name="sum") == 6
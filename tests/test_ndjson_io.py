@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ndjson_io import iter_json_array, iter_ndjson, iter_records, write_ndjson
+
+RECORDS = [
+    1, 22, 333, 4444, -55555, 6.25, 1e-07, 123456789012345678901234567890,
+    True, False, None, "", "a,b]c", "long string " * 20,
+    {"id": 1, "title": "Python Backend Intern", "tags": ["python", "intern"], "score": 87.5},
+    {"nested": {"deep": [1, [2, [3]]]}, "unicode": "實習 工程師"},
+    [], {}, [10, 200, 3000],
+]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 64, 4096])
+def test_json_array_round_trip_across_chunk_boundaries(tmp_path, chunk_size, indent):
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(RECORDS, ensure_ascii=False, indent=indent), encoding="utf-8")
+
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3])
+def test_json_array_of_numbers_is_not_split(tmp_path, chunk_size):
+    numbers = list(range(0, 100000, 7))
+    path = tmp_path / "numbers.json"
+    path.write_text(json.dumps(numbers), encoding="utf-8")
+
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == numbers
+
+
+def test_json_array_errors(tmp_path):
+    unterminated = tmp_path / "unterminated.json"
+    unterminated.write_text("[1, 2", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(unterminated), chunk_size=2))
+
+    not_array = tmp_path / "object.json"
+    not_array.write_text('{"a": 1}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(not_array)))
+
+
+@pytest.mark.parametrize("name", ["jobs.jsonl", "jobs.jsonl.gz"])
+def test_ndjson_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    records = [r for r in RECORDS if isinstance(r, dict)]
+
+    assert write_ndjson(records, path) == len(records)
+    assert list(iter_ndjson(path)) == records
+    assert list(iter_records(path)) == records
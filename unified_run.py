@@ -1,6 +1,7 @@
-import json
+from typing import Dict, List, Optional
 from jobdb import JobDatabase
-from yilingsi_scraper import Job104Scraper
+from sources import registry, print_source_stats
+from ndjson_io import write_ndjson
 
 # class JobDatabase:
 #     def __init__(self, db_name="jobs.db"):
@@ -142,35 +143,14 @@ from yilingsi_scraper import Job104Scraper
 class UnifiedJobScrapper:
     def __init__(self):
         self.db = JobDatabase()
-        self.job104 = Job104Scraper()
         
-    def scrape_all(self, include_104=True):
-        all_jobs = []
+    def scrape_all(self, only: Optional[List[str]] = None, keywords: Optional[Dict[str, List[str]]] = None):
+        print("\n" + "="*50)
+        print("Scraping from all enabled sources...")
+        print("="*50)
         
-        if include_104:
-            print("\n" + "="*50)
-            print("Scraping from 104...")
-            print("="*50)
-            
-            try:
-                self.job104 = Job104Scraper(headless=True)
-                
-                job104_keywords = [
-                    "AI工程師 實習",
-                    "前端工程師 實習", 
-                    "後端工程師 實習",
-                    "機器學習 實習",
-                    "軟體工程師 實習"
-                ]
-                
-                job104_jobs = self.job104.scrape_jobs(job104_keywords, max_pages=4)
-                all_jobs.extend(job104_jobs)
-            except Exception as e:
-                print(f"error scraping 104 : {e}")
-            
-            finally:
-                if self.job104:
-                    self.job104.close()
+        all_jobs, source_stats = registry.run(keywords=keywords, sources=registry.create(only=only))
+        print_source_stats(source_stats)
         
         print("\n" + "="*50)
         print("Saving to database...")
@@ -188,13 +168,11 @@ class UnifiedJobScrapper:
         return all_jobs
     
     
-    def export_to_json(self, filename="all_jobs.json"):
-        jobs = self.db.get_all_jobs(status='new', limit=1000)
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(jobs, f, indent=2, ensure_ascii=False)
+    def export_to_ndjson(self, filename="all_jobs.jsonl.gz", status: Optional[str] = 'new', limit: Optional[int] = None):
+        count = write_ndjson(self.db.iter_jobs(status=status, limit=limit), filename)
         
-        print(f"\n Exported {len(jobs)} jobs to {filename}")
+        print(f"\n Exported {count} jobs to {filename}")
+        return count
         
 
 if __name__ == "__main__":
@@ -203,9 +181,9 @@ if __name__ == "__main__":
     
     scraper = UnifiedJobScrapper()
     
-    jobs = scraper.scrape_all(include_104=True)
+    jobs = scraper.scrape_all()
     
-    scraper.export_to_json()
+    scraper.export_to_ndjson()
     
     print("\n" + "="*50)
     print("Preview of latest jobs:")
@@ -223,4 +201,4 @@ if __name__ == "__main__":
     
     print("\n✅ Scraping complete!")
     print(f"💡 Check 'jobs.db' for full database")
-    print(f"💡 Check 'all_jobs.json' for JSON export")
\ No newline at end of file
+    print(f"💡 Check 'all_jobs.jsonl.gz' for the NDJSON export")
\ No newline at end of file
@@ -6,22 +6,107 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException
 import time
 import json
+import queue
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlencode
 import os
 from selenium.webdriver.chrome.service import Service
+from ndjson_io import write_ndjson, iter_ndjson
+from metrics import registry, timed
+from app_logging import get_logger
+from known_jobs import SeenSet, normalize_url
+from checkpoints import UnitDone
 
 
 RECYCLER_SELECTOR = ("#app > div > div.container.jb-container.container-sidebar--rwd.main.pt-1.pt-md-5"
                      " > div > div.col.main > div.job > div.vue-recycle-scroller.ready.page-mode.direction-vertical.recycle-scroller")
 ITEM_WRAPPER_SEL = RECYCLER_SELECTOR + " > div.vue-recycle-scroller__item-wrapper"
 CARD_CHILD_SEL = ITEM_WRAPPER_SEL + " > div"
+# 104 renders one of these instead of the result list when a search (or a page past its end) has no jobs.
+NO_RESULTS_SELECTOR = "div.job-list-empty, div.search-empty, .vue-recycle-scroller ~ div.empty"
+NO_RESULTS_TEXTS = ("查無符合", "找不到符合", "沒有符合")
 
 MAX_SCROLLS = 60
 SCROLL_PAUSE = 0.35
 SNAPSHOT_DIR = "snapshots"
+# Results are newest first: after this many known jobs in a row the rest of the list was seen on earlier runs.
+SCRAPE_STOP_AFTER_KNOWN = int(os.getenv("SCRAPE_STOP_AFTER_KNOWN", "20"))
+# Browsers fetching result pages in parallel; each one is a Chrome process, so keep this small.
+SCRAPE_104_WORKERS = int(os.getenv("SCRAPE_104_WORKERS", "2"))
+SCRAPE_104_MAX_PAGES = int(os.getenv("SCRAPE_104_MAX_PAGES", "2"))
+# Per-keyword overrides of the page cap, e.g. "AI工程師 實習=8,機器學習 實習=2".
+SCRAPE_104_PAGE_CAPS = {
+    kw.strip(): int(cap) for kw, _, cap in
+    (item.rpartition("=") for item in os.getenv("SCRAPE_104_PAGE_CAPS", "").split(",") if "=" in item)
+}
+# A page without a result list means changed markup or a block page; give up on the run after this many in a row.
+SCRAPE_MAX_BLOCKED_PAGES = int(os.getenv("SCRAPE_MAX_BLOCKED_PAGES", "2"))
+# Snapshots saved per browser per run; the first one or two show the problem, the rest only fill the disk.
+SCRAPE_SNAPSHOT_LIMIT = int(os.getenv("SCRAPE_SNAPSHOT_LIMIT", "2"))
+SCRAPE_104_LOCATION = os.getenv("SCRAPE_104_LOCATION", "台灣")
+SCRAPE_104_JOB_TYPE = os.getenv("SCRAPE_104_JOB_TYPE", "實習")
+
+JOB_TYPE_PARAMS = {
+    "實習": {"ro": "0", "jobsource": "intern"},
+    "全職": {"ro": "1"},
+    "兼職": {"ro": "2"},
+}
+# 104 filters by area code; a location given as codes ("6001001000,6001002000") is passed through as is.
+AREA_CODES = {
+    "台北市": "6001001000",
+    "新北市": "6001002000",
+}
+
+log = get_logger(__name__)
+
+SCRAPE_KEYWORD_SECONDS = registry.histogram("job_agent_scrape_keyword_seconds", "Time spent on one 104 search keyword.")
+SCRAPE_PAGE_SECONDS = registry.histogram("job_agent_scrape_page_seconds", "Time to load and extract one 104 result page.")
+SCRAPE_PAGES = registry.counter("job_agent_scrape_pages_total", "104 result pages fetched, by outcome.")
+COLLECT_CARDS_SECONDS = registry.histogram("job_agent_collect_cards_seconds", "Time to scroll through and collect result cards.")
+CARD_SCROLLS = registry.counter("job_agent_card_scrolls_total", "Scroll steps taken to reveal virtualised result cards.")
+EXTRACT_JOB_SECONDS = registry.histogram("job_agent_extract_job_seconds", "Time to extract one job from a result card.")
+SCRAPED_JOBS = registry.counter("job_agent_scraped_jobs_total", "Jobs extracted from 104 search results.")
+EXTRACT_ERRORS = registry.counter("job_agent_extract_errors_total", "Result cards that failed to extract.")
+KNOWN_CARDS_SKIPPED = registry.counter("job_agent_known_cards_skipped_total",
+                                       "Result cards skipped before extraction, by reason (db: stored earlier, run: seen this run).")
+EARLY_STOPS = registry.counter("job_agent_scrape_early_stops_total", "Keywords that stopped scrolling on a run of known jobs.")
+
+
+def card_url(card):
+    try:
+        title_anchor = card.find_element(By.CSS_SELECTOR, "div.info > div > div.info-job.text-break.mb-2 a")
+        return title_anchor.get_attribute("href") or ""
+    except Exception:
+        try:
+            a = card.find_element(By.TAG_NAME, "a")
+            return a.get_attribute("href") or ""
+        except Exception:
+            return ""
+
+
+class ScrapeBlocked(Exception):
+    """A result page loaded without the result list."""
+
+
+def _no_results_shown(self):
+    """Whether the loaded page is 104's empty-result page rather than a block page or changed markup."""
+    try:
+        if self.driver.find_elements(By.CSS_SELECTOR, NO_RESULTS_SELECTOR):
+            return True
+        source = self.driver.page_source
+    except Exception:
+        return False
+    return any(text in source for text in NO_RESULTS_TEXTS)
 
 
 def _save_snapshot(self, name_prefix="snapshot"):
+    saved = getattr(self, "snapshots_saved", 0)
+    if saved >= SCRAPE_SNAPSHOT_LIMIT:
+        log.debug("Snapshot limit reached, not saving %s", name_prefix)
+        return
+    self.snapshots_saved = saved + 1
     os.makedirs(SNAPSHOT_DIR, exist_ok=True)
     ts = int(time.time())
     html_path = os.path.join(SNAPSHOT_DIR, f"{name_prefix}_{ts}.html")
@@ -30,20 +115,29 @@ def _save_snapshot(self, name_prefix="snapshot"):
         with open(html_path, "w", encoding="utf-8") as f:
             f.write(self.driver.page_source[:1000000])
     except Exception as e:
-        print("Failed to save HTML snapshot:", e)
+        log.warning("Failed to save HTML snapshot: %s", e)
     try:
         self.driver.save_screenshot(png_path)
     except Exception as e:
-        print("Failed to save screenshot:", e)
-    print(f"Saved snapshot: {html_path}, screenshot: {png_path}")
+        log.warning("Failed to save screenshot: %s", e)
+    log.info("Saved snapshot: %s, screenshot: %s", html_path, png_path)
 
 
-def collect_vrt_cards(self, max_scrolls=MAX_SCROLLS, scroll_pause=SCROLL_PAUSE):
+@timed(COLLECT_CARDS_SECONDS)
+def collect_vrt_cards(self, max_scrolls=MAX_SCROLLS, scroll_pause=SCROLL_PAUSE, stop_after_known=SCRAPE_STOP_AFTER_KNOWN):
+    """Scroll the virtualised result list and return the cards worth extracting.
+
+    Cards whose URL is in `self.known` (stored earlier) or `self.run_seen` (another keyword this run) are
+    skipped, and scrolling stops once `stop_after_known` known cards come in a row.
+    Sets `self.cards_on_page` to the number of cards seen, 0 when 104 shows its empty-result page, or None
+    when there was no result list.
+    """
+    self.cards_on_page = None
     try:
         recycler = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, RECYCLER_SELECTOR)))
     except TimeoutException:
-        print("Recycler element not found with CSS selector; saving snapshot for inspection.")
-        _save_snapshot(self, "no_recycler")
+        if _no_results_shown(self):
+            self.cards_on_page = 0
         return []
 
     try:
@@ -52,14 +146,18 @@ def collect_vrt_cards(self, max_scrolls=MAX_SCROLLS, scroll_pause=SCROLL_PAUSE):
         try:
             wrapper = self.driver.find_element(By.CSS_SELECTOR, ITEM_WRAPPER_SEL)
         except Exception:
-            print("Item wrapper not found inside recycler.")
+            log.warning("Item wrapper not found inside recycler.")
             _save_snapshot(self, "no_wrapper")
             return []
     
     seen = set()
     cards=[]
+    known = getattr(self, "known", None)
+    run_seen = getattr(self, "run_seen", None)
+    known_streak = 0
     
     def harvest():
+        nonlocal known_streak
         elems = wrapper.find_elements(By.CSS_SELECTOR,  CARD_CHILD_SEL)
         if not elems:
             elems = self.driver.find_elements(By.CSS_SELECTOR, CARD_CHILD_SEL)
@@ -79,14 +177,30 @@ def collect_vrt_cards(self, max_scrolls=MAX_SCROLLS, scroll_pause=SCROLL_PAUSE):
                     fid = f"pyid:{id(el)}"
             if fid not in seen:
                 seen.add(fid)
-                cards.append(el)
                 new_found += 1
+                url = normalize_url(card_url(el)) if known is not None or run_seen is not None else ""
+                if url and known is not None and url in known:
+                    known_streak += 1
+                    KNOWN_CARDS_SKIPPED.inc(reason="db")
+                    continue
+                known_streak = 0
+                if url and run_seen is not None and not run_seen.add_new(url):
+                    KNOWN_CARDS_SKIPPED.inc(reason="run")
+                    continue
+                cards.append(el)
         return new_found
+
+    def reached_known():
+        if stop_after_known and known_streak >= stop_after_known:
+            EARLY_STOPS.inc()
+            log.info("Stopping after %d known jobs in a row", known_streak)
+            return True
+        return False
     
     harvest()
     
     scrolls_done = 0
-    for _ in range(max_scrolls):
+    for _ in range(0 if reached_known() else max_scrolls):
         try:
             self.driver.execute_script(
                 "const sc = arguments[0]; sc.scrollTop = sc.scrollTop + Math.max(sc.clientHeight, 600);",
@@ -104,6 +218,8 @@ def collect_vrt_cards(self, max_scrolls=MAX_SCROLLS, scroll_pause=SCROLL_PAUSE):
         time.sleep(scroll_pause)
         new = harvest()
         scrolls_done += 1
+        if reached_known():
+            break
 
         if new == 0:
             time.sleep(0.25)
@@ -119,13 +235,25 @@ def collect_vrt_cards(self, max_scrolls=MAX_SCROLLS, scroll_pause=SCROLL_PAUSE):
         except Exception:
             pass
 
-    print(f"collect_virtualized_cards: collected {len(cards)} cards after {scrolls_done} scrolls")
+    self.cards_on_page = len(seen)
+    CARD_SCROLLS.inc(scrolls_done)
+    log.info("collect_virtualized_cards: collected %d cards after %d scrolls", len(cards), scrolls_done)
     return cards
         
 
 class Job104Scraper:
-    def __init__(self, headless=True) -> None:
+    def __init__(self, headless=True, known=None, workers=SCRAPE_104_WORKERS, run_seen=None) -> None:
         self.base_url = "https://www.104.com.tw/jobs/search/"
+        self.headless = headless
+        # `known`: normalised URLs stored on earlier runs (anything with `in`); `run_seen`: URLs found this run.
+        self.known = known
+        self.run_seen = run_seen if run_seen is not None else SeenSet()
+        self.workers = max(workers, 1)
+        self.extra_scrapers = []
+        self.pages_fetched = 0
+        self.cards_seen = 0
+        # Set by close(), possibly from another thread; iter_jobs queues no more pages after that.
+        self.stopped = threading.Event()
         self.setup_driver(headless)
         
     def setup_driver(self, headless):
@@ -150,68 +278,191 @@ class Job104Scraper:
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             self.wait = WebDriverWait(self.driver, 15)
             
-            print("Successfully started Chrome in GitHub Actions")
+            log.info("Successfully started Chrome in GitHub Actions")
             
         except Exception as e:
-            print(f"Chrome driver start failed: {e}")
+            log.warning("Chrome driver start failed: %s", e)
             try:
                 self.driver = webdriver.Chrome(options=chrome_options)
                 self.wait = WebDriverWait(self.driver, 15)
-                print("Successfully started Chrome with fallback method")
+                log.info("Successfully started Chrome with fallback method")
             except Exception as e2:
-                print(f"Fallback also failed: {e2}")
+                log.error("Fallback also failed: %s", e2)
                 raise
        
         
-    def build_search_url(self, keywords, location="台灣", job_type="實習"):
-        keyword_encoded = keywords.replace(" ", "+")
-        url  =f"{self.base_url}?ro=0&keyword={keyword_encoded}&jobsource=intern&order=1"
-        return url
+    def build_search_url(self, keywords, location=SCRAPE_104_LOCATION, job_type=SCRAPE_104_JOB_TYPE, page=1):
+        params = dict(JOB_TYPE_PARAMS.get(job_type, {"ro": "0"}))
+        params["keyword"] = keywords
+        area = AREA_CODES.get(location) or (location if location and location.replace(",", "").isdigit() else None)
+        if area:
+            params["area"] = area
+        params["order"] = "1"
+        if page > 1:
+            params["page"] = str(page)
+        return f"{self.base_url}?{urlencode(params)}"
     
-    def scrape_jobs(self, keywords_list, max_pages=4):
-        all_jobs = []
-        for keyword in keywords_list:
-            print(f"\n Searching for: {keyword}")
-            search_url = self.build_search_url(keyword)
-            try:
-                self.driver.get(search_url)
-            except Exception as e:
-                print("Driver.get failed:", e)
-                continue
+    def scrape_jobs(self, keywords_list, max_pages=SCRAPE_104_MAX_PAGES, page_caps=None):
+        all_jobs = list(self.iter_jobs(keywords_list, max_pages=max_pages, page_caps=page_caps))
+        log.info("Total jobs scraped: %d", len(all_jobs))
+        return all_jobs
 
-            time.sleep(1.0) 
+    def open_page(self, url):
+        self.driver.get(url)
+        time.sleep(1.0) 
 
-            try:
-                for sel in ["button#onetrust-accept-btn-handler", "button.cookie-accept", "button[aria-label*='close']"]:
-                    try:
-                        b = self.driver.find_element(By.CSS_SELECTOR, sel)
-                        if b and b.is_displayed():
-                            b.click()
-                            time.sleep(0.4)
-                    except Exception:
-                        continue
-            except Exception:
-                pass
+        try:
+            for sel in ["button#onetrust-accept-btn-handler", "button.cookie-accept", "button[aria-label*='close']"]:
+                try:
+                    b = self.driver.find_element(By.CSS_SELECTOR, sel)
+                    if b and b.is_displayed():
+                        b.click()
+                        time.sleep(0.4)
+                except Exception:
+                    continue
+        except Exception:
+            pass
+
+    def scrape_page(self, keyword, page=1):
+        """(jobs new to this run, their card count, all cards on the page); 0 new cards means nothing new.
 
+        Raises ScrapeBlocked when the first page has no result list at all; a later page without one is
+        past the end of the results (104 does not always render its empty-result marker there).
+        """
+        with timed(SCRAPE_PAGE_SECONDS):
+            self.open_page(self.build_search_url(keyword, page=page))
             cards = collect_vrt_cards(self)
-            if not cards:
-                print("No cards collected; snapshot saved for inspection.")
+            if self.cards_on_page is None:
+                if page == 1:
+                    log.warning("Recycler element not found with CSS selector; saving snapshot for inspection.")
+                    _save_snapshot(self, "no_recycler")
+                    raise ScrapeBlocked(f"no result list on page {page} of {keyword}")
+                log.info("No result list on page %d of %s, treating it as the end of the results", page, keyword)
+                return [], 0, 0
+            if not cards and page == 1 and self.known is None and not _no_results_shown(self):
+                log.warning("No cards collected; snapshot saved for inspection.")
                 _save_snapshot(self, f"no_cards_{keyword.replace(' ', '_')}")
-                continue
 
+            jobs = []
             for card in cards:
                 try:
                     job = self.extract_job_data(card, keyword)
-                    if job:
-                        all_jobs.append(job)
                 except Exception as e:
-                    print("extract error:", e)
+                    log.debug("extract error: %s", e)
+                    EXTRACT_ERRORS.inc()
                     continue
+                if job:
+                    SCRAPED_JOBS.inc(keyword=keyword)
+                    log.debug("Extracted: %s @ %s", job['title'], job['company'])
+                    jobs.append(job)
+        return jobs, len(cards), self.cards_on_page
 
-        print(f"\n Total jobs scraped: {len(all_jobs)}")
-        return all_jobs
+    def _scrapers(self):
+        """This scraper plus up to `workers - 1` more browsers, started on first use and kept until close()."""
+        while 1 + len(self.extra_scrapers) < self.workers:
+            try:
+                self.extra_scrapers.append(type(self)(self.headless, known=self.known, workers=1, run_seen=self.run_seen))
+            except Exception as e:
+                log.warning("Could not start another browser, continuing with %d: %s", 1 + len(self.extra_scrapers), e)
+                self.workers = 1 + len(self.extra_scrapers)
+        return [self] + self.extra_scrapers
+
+    @staticmethod
+    def page_unit(keyword, page):
+        return f"{keyword}#{page}"
+
+    def iter_jobs(self, keywords_list, max_pages=SCRAPE_104_MAX_PAGES, page_caps=None, skip_units=(), checkpoints=False):
+        """Fetch result pages with `?page=N`, spread over the worker browsers.
+
+        Pages of a keyword are fetched in parallel; no further pages are queued for it once a page has no
+        new jobs (end of the results, or everything on it is known) or its page cap is reached.
+        Keywords and pages in `skip_units` were finished by an earlier attempt of this run and are not fetched.
+        With `checkpoints`, UnitDone follows the jobs of each page and each finished keyword, including a
+        keyword whose pages were all skipped, so the next resume skips it as a whole.
+        """
+        caps = dict(SCRAPE_104_PAGE_CAPS if page_caps is None else page_caps)
+        caps = {kw: caps.get(kw, max_pages) for kw in keywords_list}
+        scrapers = self._scrapers()
+        idle = queue.Queue()
+        for s in scrapers:
+            idle.put(s)
+
+        def run(keyword, page):
+            s = idle.get()
+            try:
+                return s.scrape_page(keyword, page)
+            finally:
+                idle.put(s)
+
+        next_page = {kw: 1 for kw in keywords_list}
+        finished = {kw for kw in keywords_list if kw in skip_units}
+        failed = set()
+        blocked = 0
+        started = {}
+        in_flight = {}
+
+        for kw in keywords_list:
+            if kw not in finished and all(self.page_unit(kw, p) in skip_units for p in range(1, caps[kw] + 1)):
+                finished.add(kw)
+                if checkpoints:
+                    yield UnitDone(kw)
+
+        def schedule():
+            if self.stopped.is_set():
+                return
+            for kw in keywords_list:
+                while kw not in finished and next_page[kw] <= caps[kw] and len(in_flight) < len(scrapers):
+                    if self.page_unit(kw, next_page[kw]) in skip_units:
+                        next_page[kw] += 1
+                        continue
+                    if kw not in started:
+                        log.info("Searching for: %s", kw)
+                        started[kw] = time.perf_counter()
+                    in_flight[pool.submit(run, kw, next_page[kw])] = (kw, next_page[kw])
+                    next_page[kw] += 1
+
+        def keyword_done(kw):
+            done = kw in finished or next_page[kw] > caps[kw]
+            if done and kw in started and not any(k == kw for k, _ in in_flight.values()):
+                SCRAPE_KEYWORD_SECONDS.observe(time.perf_counter() - started.pop(kw), keyword=kw)
+                return True
+            return False
+
+        with ThreadPoolExecutor(max_workers=len(scrapers), thread_name_prefix="scrape104") as pool:
+            schedule()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kw, page = in_flight.pop(future)
+                    try:
+                        jobs, new_cards, seen = future.result()
+                    except Exception as e:
+                        log.error("Page %d of %s failed: %s", page, kw, e)
+                        SCRAPE_PAGES.inc(outcome="blocked" if isinstance(e, ScrapeBlocked) else "error")
+                        finished.add(kw)
+                        failed.add(kw)
+                        keyword_done(kw)
+                        blocked = blocked + 1 if isinstance(e, ScrapeBlocked) else blocked
+                        if blocked >= SCRAPE_MAX_BLOCKED_PAGES:
+                            raise ScrapeBlocked(f"{blocked} result pages in a row without a result list; "
+                                                f"104 changed its markup or is blocking us") from e
+                        continue
+                    blocked = 0
+                    self.pages_fetched += 1
+                    self.cards_seen += seen
+                    if not new_cards:
+                        log.info("No new jobs on page %d of %s, stopping", page, kw)
+                        finished.add(kw)
+                    SCRAPE_PAGES.inc(outcome="new" if new_cards else "empty")
+                    yield from jobs
+                    if checkpoints:
+                        yield UnitDone(self.page_unit(kw, page))
+                    if keyword_done(kw) and checkpoints and kw not in failed:
+                        yield UnitDone(kw)
+                schedule()
         
 
+    @timed(EXTRACT_JOB_SECONDS)
     def extract_job_data(self,card, search_keyword):
         def try_select_text(sel):
             try:
@@ -235,16 +486,7 @@ class Job104Scraper:
                 break
 
         
-        job_url = ""
-        try:
-            title_anchor = card.find_element(By.CSS_SELECTOR, "div.info > div > div.info-job.text-break.mb-2 a")
-            job_url = title_anchor.get_attribute("href") or ""
-        except Exception:
-            try:
-                a = card.find_element(By.TAG_NAME, "a")
-                job_url = a.get_attribute("href") or ""
-            except Exception:
-                job_url = ""
+        job_url = card_url(card)
         
         company_selectors = [
         "div.info > div > div.info-company.mb-1",
@@ -342,11 +584,22 @@ class Job104Scraper:
     def save_to_json(self, jobs, filename='104_jobs.json'):
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(jobs, f, indent=2, ensure_ascii=False)
-        print(f"Saved {len(jobs)} jobs to {filename}")
+        log.info("Saved %d jobs to %s", len(jobs), filename)
+
+    def save_to_ndjson(self, jobs, filename='104_jobs.jsonl.gz'):
+        count = write_ndjson(jobs, filename)
+        log.info("Saved %d jobs to %s", count, filename)
+        return count
 
     def close(self):
-        if hasattr(self, 'driver'):
-            self.driver.quit()
+        """Quit every browser of this scraper; safe to call again, and from another thread."""
+        self.stopped.set()
+        extra, self.extra_scrapers = self.extra_scrapers, []
+        for s in extra:
+            s.close()
+        driver = self.__dict__.pop('driver', None)
+        if driver is not None:
+            driver.quit()
         
 if __name__ == "__main__":
     scraper = Job104Scraper(headless=False)
@@ -359,18 +612,19 @@ if __name__ == "__main__":
             "機器學習 實習"
         ]
         
-        jobs = scraper.scrape_jobs(keywords, max_pages=4)
+        total = scraper.save_to_ndjson(scraper.iter_jobs(keywords, max_pages=4))
         
         print("\n" + "="*50)
-        for i, job in enumerate(jobs[:5], 1):
+        for i, job in enumerate(iter_ndjson('104_jobs.jsonl.gz'), 1):
+            if i > 5:
+                break
             print(f"{i}. {job['title']}")
             print(f"Company: {job['company']}")
             print(f"Location: {job['location']}")
             print(f"Salary: {job['salary']}")
             print(f"URL: {job['url']}\n")
-        scraper.save_to_json(jobs)
         
-        print(f"Scraping completed! Found {len(jobs)} internship positions")
+        print(f"Scraping completed! Found {total} internship positions")
     
     except Exception as e:
         print(f"error during scraping {e}")